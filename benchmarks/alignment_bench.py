@@ -0,0 +1,321 @@
+"""
+Benchmark dopasowania fragmentów (wstaw_entery_z_podwojna_weryfikacja).
+
+Transkrypcje są syntetyczne: w tekście rozdziału wybierane są równomiernie
+początki akapitów (to jest "prawda"), fragment to tekst od takiego
+początku - do kolejnej granicy, ale nie dłużej niż DLUGOSC_FRAGMENTU
+znaków (jak typowy plik MP3 w złotym podziale). Tekst każdego
+fragmentu psuty jest tak, jak psuje go Whisper:
+ - zgubione polskie znaki
+ - sklejone sąsiednie słowa
+ - przekręcone imiona i nazwy (odwrotność słowników z funkcje/slowniki)
+ - brak interpunkcji, myślników i enterów
+
+Dodatkowo scenariusz "złoty" bierze podział z
+temp/ROZDZIAŁ_VI_z_enterami(1).txt (ręcznie sprawdzony podział rozdziału VI).
+
+Raportowane: czas, przepustowość (znaki tekstu / s), średnie opóźnienie
+na fragment, szczytowa pamięć (tracemalloc, osobny przebieg) i trafność
+pozycji separatorów: dokładne, w promieniu 20 i 100 znaków, średni błąd.
+
+Użycie (z katalogu repozytorium):
+    python -m benchmarks.alignment_bench
+    python -m benchmarks.alignment_bench --szybki --json wyniki.json
+    python -m benchmarks.alignment_bench --tryb globalny --snap akapit
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import tracemalloc
+
+from funkcje import book_index
+from funkcje import boundaries
+from funkcje import metrics
+from funkcje import normalization
+from funkcje.division_mp3 import wstaw_entery_z_podwojna_weryfikacja
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+KSIAZKI = {
+    "w-pustyni-i-w-puszczy": ("w-pustyni-i-w-puszczy.txt", "proste"),
+    "o-krasnoludkach-i-sierotce-marysi": ("o-krasnoludkach-i-sierotce-marysi.txt", "z_tytulami"),
+}
+ZLOTY_ROZDZIAL = os.path.join(REPO, "temp", "ROZDZIAŁ_VI.txt")
+ZLOTY_PODZIAL = os.path.join(REPO, "temp", "ROZDZIAŁ_VI_z_enterami(1).txt")
+
+ROZMIARY = (1, 3, 8)            # liczba kolejnych rozdziałów w "rozdziale" testowym
+LICZBY_FRAGMENTOW = (10, 30, 60)
+DLUGOSC_FRAGMENTU = 800
+# Tempo syntetycznego lektora (znaki / ms) i jego wahania między fragmentami
+TEMPO_LEKTORA = 0.014
+WAHANIA_TEMPA = 0.15
+
+_DIAKRYTYKI = str.maketrans("ąćęłńóśźżĄĆĘŁŃÓŚŹŻ", "acelnoszzACELNOSZZ")
+_INTERPUNKCJA = re.compile(r"[.,;:!?—–\-\"'()…]+")
+
+
+# ---------------------------------------------------------------------------
+# Błędy w stylu Whisper
+# ---------------------------------------------------------------------------
+
+def odwrotny_slownik(book):
+    """{poprawne słowo: [błędne formy]} - tylko jednowyrazowe formy poprawne."""
+    odwrotny = {}
+    for zle, dobre in normalization.load_replacements(book).items():
+        if " " not in dobre and zle != dobre:
+            odwrotny.setdefault(dobre, []).append(zle)
+    return odwrotny
+
+
+def zepsuj(tekst, rng, odwrotny, skala=1.0):
+    """
+    Zamienia tekst fragmentu w "transkrypcję Whisper".
+
+    Args:
+        tekst (str): Oryginalny tekst fragmentu
+        rng (random.Random): Generator (powtarzalność)
+        odwrotny (dict): Wynik odwrotny_slownik
+        skala (float): Mnożnik prawdopodobieństw błędów
+    """
+    p_diakrytyki = 0.15 * skala
+    p_sklejenie = 0.03 * skala
+    p_imie = 0.6 * skala
+    p_interpunkcja = 0.7 * skala
+
+    slowa = []
+    for slowo in tekst.split():
+        klucz = _INTERPUNKCJA.sub("", slowo).lower().translate(_DIAKRYTYKI)
+        if klucz in odwrotny and rng.random() < p_imie:
+            slowo = rng.choice(odwrotny[klucz])
+        elif rng.random() < p_diakrytyki:
+            slowo = slowo.translate(_DIAKRYTYKI)
+        if rng.random() < p_interpunkcja:
+            slowo = _INTERPUNKCJA.sub("", slowo)
+        if slowo:
+            slowa.append(slowo)
+
+    wynik = []
+    for slowo in slowa:
+        if wynik and rng.random() < p_sklejenie:
+            wynik[-1] += slowo.lower()
+        else:
+            wynik.append(slowo)
+    return " ".join(wynik)
+
+
+# ---------------------------------------------------------------------------
+# Scenariusze
+# ---------------------------------------------------------------------------
+
+def poczatki_akapitow(text):
+    """Początki niepustych akapitów (pierwszy znak po enterze)."""
+    return [m.start() for m in re.finditer(r"(?:^|(?<=\n))[^\s]", text)]
+
+
+def podziel_na_fragmenty(text, liczba):
+    """Początki `liczba` fragmentów rozłożonych równomiernie, na początkach akapitów."""
+    akapity = poczatki_akapitow(text)
+    if not akapity:
+        return []
+    liczba = min(liczba, len(akapity))
+    granice = []
+    for k in range(liczba):
+        cel = akapity[0] + (len(text) - akapity[0]) * k // liczba
+        # pierwszy akapit nie wcześniej niż cel
+        pozycja = next((a for a in akapity if a >= cel), akapity[-1])
+        if not granice or pozycja > granice[-1]:
+            granice.append(pozycja)
+    return granice
+
+
+def frazy_z_granic(text, granice, rng, odwrotny, skala, dlugosc=None):
+    """
+    Syntetyczne wpisy jak z pobierz_frazy_z_mp3 - po jednym na granicę.
+    Czas nagrania obejmuje cały tekst do następnej granicy (czytany
+    w tempie TEMPO_LEKTORA +- WAHANIA_TEMPA), nawet gdy transkrypcja jest
+    ucięta do `dlugosc`.
+    """
+    frazy = []
+    for i, start in enumerate(granice):
+        koniec = granice[i + 1] if i + 1 < len(granice) else len(text)
+        dlugosc_ms = round((koniec - start) / (TEMPO_LEKTORA * rng.uniform(1 - WAHANIA_TEMPA, 1 + WAHANIA_TEMPA)))
+        if dlugosc and koniec - start > dlugosc:
+            # Ucięcie na końcu słowa
+            spacja = text.rfind(" ", start, start + dlugosc)
+            koniec = spacja if spacja > start else start + dlugosc
+        frazy.append({
+            'plik': f"{i + 1:03d}.mp3",
+            'transkrypcja': zepsuj(text[start:koniec], rng, odwrotny, skala),
+            'segments': [],
+            'start_ms': 0,
+            'end_ms': dlugosc_ms,
+        })
+    return frazy
+
+
+def scenariusze_ksiazek(rng, skala, rozmiary, liczby):
+    """Syntetyczne scenariusze z obu dołączonych książek."""
+    for nazwa, (plik, fmt) in KSIAZKI.items():
+        sciezka = os.path.join(REPO, plik)
+        if not os.path.exists(sciezka):
+            print(f"⚠️ Brak książki: {sciezka}")
+            continue
+        index = book_index.load_index(sciezka, fmt)
+        rozdzialy = [book_index.chapter_text(sciezka, index, ch) for ch in index["chapters"]]
+        odwrotny = odwrotny_slownik(sciezka)
+
+        for rozmiar in rozmiary:
+            if rozmiar > len(rozdzialy):
+                continue
+            text = "\n\n".join(rozdzialy[:rozmiar])
+            for liczba in liczby:
+                granice = podziel_na_fragmenty(text, liczba)
+                yield {
+                    "nazwa": f"{nazwa} x{rozmiar} / {len(granice)} fragm.",
+                    "book": sciezka,
+                    "text": text,
+                    "granice": granice,
+                    "frazy": frazy_z_granic(text, granice, rng, odwrotny, skala, DLUGOSC_FRAGMENTU),
+                }
+
+
+def scenariusz_zloty(rng, skala):
+    """Podział rozdziału VI z ręcznie sprawdzonego pliku."""
+    if not (os.path.exists(ZLOTY_ROZDZIAL) and os.path.exists(ZLOTY_PODZIAL)):
+        return None
+    with open(ZLOTY_ROZDZIAL, "r", encoding="utf-8") as f:
+        text = f.read()
+    with open(ZLOTY_PODZIAL, "r", encoding="utf-8") as f:
+        bloki = [b.strip() for b in re.split(r"\[\d+\]\s*>{5,}", f.read()) if b.strip()]
+
+    granice = []
+    for blok in bloki:
+        pozycja = text.find(blok[:80], granice[-1] if granice else 0)
+        if pozycja == -1:
+            print(f"⚠️ Złoty podział: nie znaleziono bloku \"{blok[:40]}...\"")
+            continue
+        granice.append(pozycja)
+
+    book = os.path.join(REPO, "w-pustyni-i-w-puszczy.txt")
+    return {
+        "nazwa": f"złoty ROZDZIAŁ VI / {len(granice)} fragm.",
+        "book": book,
+        "text": text,
+        "granice": granice,
+        "frazy": frazy_z_granic(text, granice, rng, odwrotny_slownik(book), skala),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Pomiar
+# ---------------------------------------------------------------------------
+
+def trafnosc(granice, fragmenty):
+    """Błędy pozycji separatorów względem prawdy (nieznalezione osobno)."""
+    bledy = []
+    for prawda, fragment in zip(granice, fragmenty):
+        if fragment.get('found'):
+            bledy.append(abs(fragment['pos_start'] - prawda))
+    n = len(granice)
+    return {
+        "znalezione": len(bledy),
+        "dokladne": sum(1 for b in bledy if b == 0),
+        "do_20": sum(1 for b in bledy if b <= 20),
+        "do_100": sum(1 for b in bledy if b <= 100),
+        "sredni_blad": round(sum(bledy) / len(bledy), 1) if bledy else None,
+        "wszystkie": n,
+    }
+
+
+def uruchom(scenariusz, tryb, snap, pamiec, uzyj_tempa=True):
+    def dopasuj():
+        return wstaw_entery_z_podwojna_weryfikacja(
+            scenariusz["text"], scenariusz["frazy"], text_file=None,
+            book=scenariusz["book"], tryb=tryb, snap=snap, uzyj_tempa=uzyj_tempa
+        )
+
+    metrics.reset()
+    start = time.perf_counter()
+    fragmenty = dopasuj()
+    czas = time.perf_counter() - start
+    liczniki = metrics.wyniki()["liczniki"]
+
+    szczyt = None
+    if pamiec:
+        tracemalloc.start()
+        dopasuj()
+        szczyt = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    n = max(1, len(scenariusz["frazy"]))
+    return {
+        "scenariusz": scenariusz["nazwa"],
+        "znaki": len(scenariusz["text"]),
+        "fragmenty": len(scenariusz["frazy"]),
+        "czas_s": round(czas, 3),
+        "znaki_na_s": round(len(scenariusz["text"]) / czas) if czas else None,
+        "ms_na_fragment": round(czas * 1000 / n, 1),
+        "szczyt_pamieci_mb": round(szczyt / 2**20, 1) if szczyt is not None else None,
+        "okna_ocenione": liczniki.get("okna_ocenione", 0),
+        "trafnosc": trafnosc(scenariusz["granice"], fragmenty),
+    }
+
+
+def wypisz(wynik):
+    t = wynik["trafnosc"]
+    pamiec = f"{wynik['szczyt_pamieci_mb']:>7.1f}MB" if wynik["szczyt_pamieci_mb"] is not None else "      -  "
+    blad = f"{t['sredni_blad']:>7.1f}" if t["sredni_blad"] is not None else "      -"
+    print(f"{wynik['scenariusz']:<52} {wynik['znaki']:>8} {wynik['czas_s']:>8.2f}s "
+          f"{wynik['ms_na_fragment']:>8.1f}ms {pamiec} "
+          f"{t['dokladne']:>3}/{t['do_20']:>3}/{t['do_100']:>3}/{t['wszystkie']:<3} {blad}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark dopasowania fragmentów")
+    parser.add_argument("--tryb", default="zachlanny", choices=("zachlanny", "globalny"),
+                        help="zachlanny - każdy fragment od końca poprzedniego; globalny - wszystkie naraz "
+                             "(ok. 1/3 szybciej, odporny na zgubiony fragment, ale w długich rozdziałach "
+                             "z wieloma fragmentami średni błąd bywa do 2x większy)")
+    parser.add_argument("--snap", default="pierwsza", choices=boundaries.TRYBY_DOSUWANIA)
+    parser.add_argument("--bledy", type=float, default=1.0, help="Skala częstości błędów Whisper")
+    parser.add_argument("--ziarno", type=int, default=1234)
+    parser.add_argument("--szybki", action="store_true", help="Tylko najmniejsze scenariusze")
+    parser.add_argument("--bez-pamieci", action="store_true", help="Bez przebiegu z tracemalloc")
+    parser.add_argument("--bez-tempa", action="store_true",
+                        help="Bez przewidywania pozycji z tempa lektora (funkcje.position_prior)")
+    parser.add_argument("--json", help="Zapisz wyniki do pliku JSON")
+    args = parser.parse_args(argv)
+
+    rozmiary, liczby = (ROZMIARY[:1], LICZBY_FRAGMENTOW[:2]) if args.szybki else (ROZMIARY, LICZBY_FRAGMENTOW)
+    rng = random.Random(args.ziarno)
+    metrics.ustaw_poziom(metrics.CICHY)
+
+    scenariusze = []
+    zloty = scenariusz_zloty(rng, args.bledy)
+    if zloty:
+        scenariusze.append(zloty)
+    scenariusze.extend(scenariusze_ksiazek(rng, args.bledy, rozmiary, liczby))
+
+    print(f"tryb={args.tryb} snap={args.snap} tempo={not args.bez_tempa} bledy={args.bledy} ziarno={args.ziarno}")
+    print(f"{'scenariusz':<52} {'znaki':>8} {'czas':>9} {'/fragm.':>10} {'pamięć':>9} "
+          f"{'dokł/20/100/n':<15} {'śr.błąd':>7}")
+    wyniki = []
+    for scenariusz in scenariusze:
+        wynik = uruchom(scenariusz, args.tryb, args.snap, not args.bez_pamieci, not args.bez_tempa)
+        wypisz(wynik)
+        wyniki.append(wynik)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"parametry": vars(args), "wyniki": wyniki}, f, ensure_ascii=False, indent=2)
+        print(f"📈 Zapisano: {args.json}")
+    return wyniki
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,92 @@
+"""
+Transkrypcja samych "kotwic" - początku (i opcjonalnie końca) fragmentu.
+
+Do umieszczenia separatora wystarczy początek fragmentu (ponowienie
+w dopasuj_fragment i tak tnie transkrypcję do 10 słów), więc w trybie
+kotwic Whisper dostaje tylko pierwsze `sekundy` sekund pliku, a przy
+`koniec` także ostatnie - ten tekst zawęża szukanie końca fragmentu.
+Dekodowany jest tylko ten zakres (silence.iter_probki z -ss/-t).
+
+Pełna transkrypcja (transkrybuj z trybem "pelna") zostaje dla
+fragmentów, których kotwica nie dała wyniku powyżej progu - patrz
+division_mp3.dopasuj_fragment. Pliki niewiele dłuższe od kotwic
+transkrybowane są od razu w całości.
+
+Wynik ma dodatkowe pole 'kotwica': {'sekundy', 'koniec': tekst końca
+albo None} - wyniki bez niego to pełne transkrypcje.
+"""
+
+import numpy as np
+
+from funkcje import metrics
+from funkcje import mp3_info
+from funkcje import silence
+from funkcje import vad as vad_mod
+
+
+def parametry(kotwica):
+    """
+    Parametry kotwic: None/0 - pełna transkrypcja, liczba - sekundy
+    początku, dict {'sekundy', 'koniec'} - także koniec pliku.
+    """
+    if not kotwica:
+        return None
+    if isinstance(kotwica, dict):
+        return {"sekundy": float(kotwica.get("sekundy", 8)), "koniec": bool(kotwica.get("koniec", False))}
+    return {"sekundy": float(kotwica), "koniec": False}
+
+
+def opcje_klucza(decode_options, vad, kotwica):
+    """Opcje do klucza cache - VAD i kotwice tylko, gdy są włączone."""
+    opcje = vad_mod.opcje_klucza(decode_options, vad)
+    p = parametry(kotwica)
+    if p:
+        opcje["kotwica"] = p
+    return opcje
+
+
+def _transkrybuj_zakres(model, sciezka, start_s, czas_s, language, options):
+    kawalki = list(silence.iter_probki(sciezka, start_s=start_s, czas_s=czas_s))
+    if not kawalki:
+        return "", []
+    audio = np.concatenate(kawalki).astype(np.float32) / 32768.0
+    wynik = model.transcribe(audio, language=language, **options)
+    segmenty = wynik.get("segments", [])
+    for seg in segmenty:
+        seg["start"] += start_s
+        seg["end"] += start_s
+    return wynik["text"].strip(), segmenty
+
+
+def transkrybuj(model, sciezka, language="pl", options=None, vad=None, kotwica=None):
+    """
+    Transkrypcja kotwic pliku albo (bez `kotwica`, dla krótkich plików
+    i gdy dekodowanie zawiedzie) pełna - funkcje.vad.transkrybuj.
+
+    Returns:
+        dict: {'text', 'segments'} i - w trybie kotwic - 'kotwica'
+    """
+    options = options or {}
+    p = parametry(kotwica)
+    dlugosc_ms = mp3_info.duration_ms(sciezka) if p else None
+    ile_kotwic = 2 if p and p["koniec"] else 1
+    # Kotwice mają sens, gdy pomijają wyraźną część pliku
+    if p is None or dlugosc_ms is None or dlugosc_ms < 1.5 * ile_kotwic * p["sekundy"] * 1000:
+        return vad_mod.transkrybuj(model, sciezka, language, options, vad)
+
+    dlugosc_s = dlugosc_ms / 1000
+    try:
+        with metrics.etap("transkrypcja_kotwic"):
+            tekst, segmenty = _transkrybuj_zakres(model, sciezka, 0, p["sekundy"], language, options)
+            koniec = None
+            if p["koniec"]:
+                koniec, segmenty_konca = _transkrybuj_zakres(
+                    model, sciezka, dlugosc_s - p["sekundy"], p["sekundy"], language, options
+                )
+                segmenty += segmenty_konca
+    except RuntimeError as e:
+        metrics.info(f"⚠️ Kotwice niedostępne ({e}) - transkrybuję całość")
+        return vad_mod.transkrybuj(model, sciezka, language, options, vad)
+
+    metrics.licz("kotwice_s_pominiete", round(dlugosc_s - ile_kotwic * p["sekundy"]))
+    return {"text": tekst, "segments": segmenty, "kotwica": {"sekundy": p["sekundy"], "koniec": koniec}}
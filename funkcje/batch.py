@@ -0,0 +1,340 @@
+"""
+Tryb wsadowy - cała książka w jednym uruchomieniu, bez pytań.
+
+Dla każdego rozdziału, który ma plik z czasami i folder MP3, wykonuje
+kolejno wszystkie etapy: pusty SRT z czasami, wycięcie rozdziału,
+podział na fragmenty (transkrypcja + dopasowanie) i gotowy SRT.
+
+Zasoby wczytywane są raz na całą książkę: indeks rozdziałów
+(book_index), model Whisper (division_mp3.wczytaj_model) i słownik
+normalizacji (normalization.get_normalizer).
+
+Oczekiwany układ danych wejściowych - nazwy z numerem rozdziału
+(rzymskim lub arabskim, np. "ROZDZIAŁ_VI", "VI", "6"):
+
+    czasy/ROZDZIAŁ_VI.txt      - czasy fragmentów (jak dla empty_srt)
+    mp3/ROZDZIAŁ_VI/*.mp3      - pliki MP3 fragmentów rozdziału
+    albo mp3/ROZDZIAŁ_VI.mp3   - jedno nagranie rozdziału, cięte bezstratnie
+                                 wg czasów (division_mp3.frazy_z_dlugiego_mp3);
+                                 bez pliku czasów - podział po ciszy (funkcje.silence)
+
+Wyniki trafiają do <wyjscie>/ROZDZIAŁ_VI/, a pomiary czasów i liczniki
+(funkcje.metrics) do <wyjscie>/metryki_<data>.json. Ponowne uruchomienie wykonuje
+tylko etapy, których wejścia lub parametry się zmieniły (manifest.json
+w folderze rozdziału, patrz funkcje.orchestrator); --wymus wykonuje
+wszystko od nowa.
+
+Użycie:
+    python -m funkcje.batch 1 czasy/ mp3/ --wyjscie wyniki/
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import argparse
+
+from funkcje import anchor_transcription
+from funkcje import book_index
+from funkcje import boundaries
+from funkcje import cut_chapter
+from funkcje import division_mp3
+from funkcje import empty_srt
+from funkcje import generate_srt
+from funkcje import metrics
+from funkcje import normalization
+from funkcje import orchestrator
+from funkcje import silence
+from funkcje import vad as vad_mod
+
+_RZYMSKIE = {"I": 1, "V": 5, "X": 10, "L": 50, "C": 100, "D": 500, "M": 1000}
+_NUMER = re.compile(r"^(?:ROZDZIA[ŁL][\s_-]*)?([IVXLCDM]+|\d+)$", re.IGNORECASE)
+
+
+def rzymska_na_int(roman):
+    """'XIV' -> 14"""
+    wynik = 0
+    for i, znak in enumerate(roman):
+        wartosc = _RZYMSKIE[znak]
+        if i + 1 < len(roman) and _RZYMSKIE[roman[i + 1]] > wartosc:
+            wynik -= wartosc
+        else:
+            wynik += wartosc
+    return wynik
+
+
+def numer_rozdzialu(nazwa):
+    """
+    Numer rozdziału z nazwy pliku/folderu ('ROZDZIAŁ_VI.txt', 'VI', '6')
+    albo None, jeśli nazwa nie wygląda na rozdział.
+    """
+    m = _NUMER.match(os.path.splitext(nazwa)[0].strip())
+    if not m:
+        return None
+    numer = m.group(1)
+    if numer.isdigit():
+        return int(numer)
+    return rzymska_na_int(numer.upper())
+
+
+def znajdz_ksiazke(book, fmt=None):
+    """
+    Zwraca (ścieżka, format) książki - klucz z cut_chapter.BOOKS albo
+    ścieżka do pliku (wtedy format domyślnie "proste").
+    """
+    if book in cut_chapter.BOOKS:
+        ksiazka = cut_chapter.BOOKS[book]
+        sciezka = ksiazka["file"]
+        if not os.path.exists(sciezka):
+            # Poza Colab - plik książki w katalogu repozytorium
+            repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            sciezka = os.path.join(repo, os.path.basename(sciezka))
+        return sciezka, fmt or ksiazka["format"]
+    return book, fmt or "proste"
+
+
+def zbierz_rozdzialy(czasy_dir, mp3_dir):
+    """
+    Paruje pliki czasów z folderami MP3 (albo pojedynczymi nagraniami
+    rozdziałów) po numerze rozdziału.
+
+    Nagranie rozdziału (.mp3) bez pliku czasów dostaje None - czasy
+    wyznaczy segmentacja po ciszy.
+
+    Returns:
+        dict: {numer: (plik czasów lub None, folder mp3 lub plik .mp3)}
+    """
+    czasy = {}
+    for nazwa in sorted(os.listdir(czasy_dir)):
+        numer = numer_rozdzialu(nazwa)
+        if numer is not None and nazwa.lower().endswith(".txt"):
+            czasy[numer] = os.path.join(czasy_dir, nazwa)
+
+    rozdzialy = {}
+    for nazwa in sorted(os.listdir(mp3_dir)):
+        sciezka = os.path.join(mp3_dir, nazwa)
+        numer = numer_rozdzialu(nazwa)
+        if numer is None or not (os.path.isdir(sciezka) or nazwa.lower().endswith(".mp3")):
+            continue
+        if numer not in czasy and os.path.isdir(sciezka):
+            print(f"⚠️ Rozdział {nazwa}: brak pliku z czasami - pomijam")
+            continue
+        rozdzialy[numer] = (czasy.get(numer), sciezka)
+    return dict(sorted(rozdzialy.items()))
+
+
+def przetworz_rozdzial(book_path, index, chapter, plik_czasow, mp3_folder, wyjscie, prog=35, tryb="zachlanny",
+                       snap="pierwsza", workers=1, model_name="base", language="pl", wymus=False, vad=False, kotwica=None):
+    """
+    Wszystkie etapy dla jednego rozdziału. Zwraca ścieżkę gotowego SRT.
+
+    Etapy wykonywane są przyrostowo (funkcje.orchestrator) - pomijane są
+    te, których wejścia i parametry nie zmieniły się od ostatniego razu.
+    """
+    nazwa = chapter["header"].replace(" ", "_")
+    folder = os.path.join(wyjscie, nazwa)
+    os.makedirs(folder, exist_ok=True)
+    manifest = orchestrator.load_manifest(folder)
+
+    srt_czasy = os.path.join(folder, "empty.srt")
+    text_file = os.path.join(folder, nazwa + ".txt")
+    frazy_json = os.path.join(folder, "frazy.json")
+    z_enterami = text_file.replace(".txt", "_z_enterami.txt")
+    fragmenty_json = os.path.join(folder, "fragmenty.json")
+    fragmenty_dir = os.path.join(folder, "fragmenty")
+    srt_file = os.path.join(folder, nazwa + ".srt")
+
+    # Jedno nagranie całego rozdziału zamiast folderu fragmentów
+    nagranie = mp3_folder if os.path.isfile(mp3_folder) else None
+
+    # Etap 0: czasy fragmentów z pauz w nagraniu (gdy nie ma pliku czasów)
+    if plik_czasow is None:
+        plik_czasow = os.path.join(folder, "czasy.txt")
+        orchestrator.etap(
+            manifest, "segmentacja", lambda: silence.segmentuj(nagranie, plik_czasow),
+            wejscia=[nagranie],
+            parametry={"prog_db": silence.PROG_DB, "min_cisza_ms": silence.MIN_CISZA_MS,
+                       "min_fragment_ms": silence.MIN_FRAGMENT_MS},
+            wyjscia=[plik_czasow], wymus=wymus,
+        )
+
+    # Etap 1: pusty SRT z czasami
+    orchestrator.etap(
+        manifest, "czasy", lambda: empty_srt.txt_to_srt(plik_czasow, srt_czasy),
+        wejscia=[plik_czasow], wyjscia=[srt_czasy], wymus=wymus,
+    )
+
+    # Etap 2: tekst rozdziału z indeksu książki
+    def wytnij():
+        with open(text_file, "w", encoding="utf-8") as f:
+            f.write(book_index.chapter_text(book_path, index, chapter))
+
+    orchestrator.etap(
+        manifest, "rozdzial", wytnij,
+        parametry={"ksiazka": index["sha256"], "format": index["format"],
+                   "zakres": [chapter["start"], chapter["end"]]},
+        wyjscia=[text_file], wymus=wymus,
+    )
+
+    # Etap 3: transkrypcja
+    def transkrybuj():
+        if nagranie:
+            frazy = division_mp3.frazy_z_dlugiego_mp3(
+                nagranie, empty_srt.wczytaj_czasy(plik_czasow), model_name=model_name, language=language, vad=vad
+            )
+        else:
+            frazy = division_mp3.pobierz_frazy_z_mp3(
+                text_file, model_name=model_name, language=language, workers=workers, mp3_folder=mp3_folder,
+                vad=vad, kotwica=kotwica
+            )
+        # Brak jakiejkolwiek transkrypcji (np. brak Whisper) - nie zapisujemy,
+        # żeby etap nie został uznany za aktualny
+        if frazy:
+            zapisz_json(frazy_json, frazy)
+
+    orchestrator.etap(
+        manifest, "transkrypcja", transkrybuj,
+        wejscia=[mp3_folder] + ([plik_czasow] if nagranie else []),
+        parametry={"model": model_name, "jezyk": language, "vad": vad_mod.parametry(vad),
+                   "kotwica": None if nagranie else anchor_transcription.parametry(kotwica)},
+        wyjscia=[frazy_json], wymus=wymus,
+    )
+
+    # Etap 4: dopasowanie - zależy też od słowników błędów Whisper
+    def dopasuj():
+        with open(text_file, "r", encoding="utf-8") as f:
+            text = f.read()
+        fragmenty = division_mp3.wstaw_entery_z_podwojna_weryfikacja(
+            text, wczytaj_json(frazy_json), prog, text_file, book=book_path, tryb=tryb, snap=snap,
+            pelna=division_mp3.pelna_transkrypcja(model_name, language, vad=vad) if kotwica else None
+        )
+        zapisz_json(fragmenty_json, fragmenty)
+
+    slowniki = [p for p in normalization.replacement_paths(book_path) if os.path.exists(p)]
+    orchestrator.etap(
+        manifest, "dopasowanie", dopasuj,
+        wejscia=[text_file, frazy_json] + slowniki,
+        parametry=dict({"prog": prog, "tryb": tryb, "snap": snap},
+                       # Z kotwicami dopasowanie może dotranskrybować słabe fragmenty
+                       **({"model": model_name, "jezyk": language, "vad": vad_mod.parametry(vad)} if kotwica else {})),
+        wyjscia=[fragmenty_json, z_enterami], wymus=wymus,
+    )
+
+    if not os.path.exists(z_enterami):
+        print(f"⚠️ {chapter['header']}: nie dopasowano żadnego fragmentu - brak SRT")
+        return None
+
+    # Etap 5: fragmenty MP3
+    def kopiuj():
+        shutil.rmtree(fragmenty_dir, ignore_errors=True)
+        os.makedirs(fragmenty_dir)
+        division_mp3.utworz_fragmenty_mp3(nagranie, wczytaj_json(fragmenty_json), fragmenty_dir,
+                                          mp3_folder=None if nagranie else mp3_folder)
+
+    orchestrator.etap(
+        manifest, "fragmenty", kopiuj,
+        wejscia=[fragmenty_json, mp3_folder], wyjscia=[fragmenty_dir], wymus=wymus,
+    )
+
+    # Etap 6: SRT z tekstem
+    def srt():
+        wynik = generate_srt.polacz_srt(srt_czasy, z_enterami, folder)
+        if wynik != srt_file:
+            os.replace(wynik, srt_file)
+
+    orchestrator.etap(
+        manifest, "srt", srt,
+        wejscia=[srt_czasy, z_enterami], wyjscia=[srt_file], wymus=wymus,
+    )
+    return srt_file
+
+
+def zapisz_json(path, dane):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(dane, f, ensure_ascii=False, default=float)
+
+
+def wczytaj_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def run(book, czasy_dir, mp3_dir, wyjscie, fmt=None, prog=35, tryb="zachlanny", snap="pierwsza", workers=1,
+        model_name="base", language="pl", wymus=False, vad=False, kotwica=None):
+    """
+    Przetwarza wszystkie rozdziały książki, dla których są czasy i MP3.
+
+    Returns:
+        dict: {numer rozdziału: ścieżka SRT albo None (błąd)}
+    """
+    book_path, fmt = znajdz_ksiazke(book, fmt)
+    if not os.path.exists(book_path):
+        print(f"❌ Nie znaleziono pliku książki: {book_path}")
+        return {}
+
+    metrics.reset()
+    index = book_index.load_index(book_path, fmt)
+    chapters = index["chapters"]
+    rozdzialy = zbierz_rozdzialy(czasy_dir, mp3_dir)
+    print(f"📚 {os.path.basename(book_path)}: {len(chapters)} rozdziałów, do przetworzenia {len(rozdzialy)}")
+
+    wyniki = {}
+    for numer, (plik_czasow, mp3_folder) in rozdzialy.items():
+        if not (1 <= numer <= len(chapters)):
+            print(f"⚠️ Brak rozdziału nr {numer} w książce - pomijam")
+            continue
+        chapter = chapters[numer - 1]
+        metrics.info(f"\n{'#'*80}\n📖 {chapter['header']}\n{'#'*80}")
+        try:
+            wyniki[numer] = przetworz_rozdzial(
+                book_path, index, chapter, plik_czasow, mp3_folder, wyjscie,
+                prog=prog, tryb=tryb, snap=snap, workers=workers,
+                model_name=model_name, language=language, wymus=wymus, vad=vad, kotwica=kotwica
+            )
+        except Exception as e:
+            # Jeden zepsuty rozdział nie przerywa całej książki
+            print(f"❌ {chapter['header']}: {e}")
+            wyniki[numer] = None
+
+    gotowe = sum(1 for w in wyniki.values() if w)
+    print(f"\n✅ Gotowe rozdziały: {gotowe}/{len(rozdzialy)}")
+    metrics.podsumowanie()
+    metrics.eksportuj(os.path.join(wyjscie, time.strftime("metryki_%Y%m%d_%H%M%S.json")))
+    return wyniki
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="El Raphael - cała książka bez pytań")
+    parser.add_argument("book", help="Klucz książki z cut_chapter.BOOKS (1/2) albo ścieżka do pliku")
+    parser.add_argument("czasy", help="Folder z plikami czasów rozdziałów")
+    parser.add_argument("mp3", help="Folder z podfolderami MP3 (lub nagraniami .mp3) rozdziałów")
+    parser.add_argument("--wyjscie", default="wyniki", help="Folder wyników")
+    parser.add_argument("--format", dest="fmt", default=None, help="Format książki (proste / z_tytulami)")
+    parser.add_argument("--prog", type=int, default=35)
+    parser.add_argument("--tryb", default="zachlanny", choices=("zachlanny", "globalny"),
+                        help="zachlanny - każdy fragment od końca poprzedniego; globalny - wszystkie naraz "
+                             "(ok. 1/3 szybciej, odporny na zgubiony fragment, ale w długich rozdziałach "
+                             "z wieloma fragmentami średni błąd bywa do 2x większy)")
+    parser.add_argument("--snap", default="pierwsza", choices=boundaries.TRYBY_DOSUWANIA)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--model", default="base", help="Model Whisper")
+    parser.add_argument("--jezyk", default="pl")
+    parser.add_argument("--vad", action="store_true", help="Wytnij ciszę przed transkrypcją (funkcje.vad)")
+    parser.add_argument("--kotwica", type=float, default=None, metavar="SEKUNDY",
+                        help="Transkrybuj tylko początek fragmentów; pełna transkrypcja dla słabych dopasowań")
+    parser.add_argument("--kotwica-koniec", action="store_true", help="Z --kotwica: także koniec fragmentów")
+    parser.add_argument("--wymus", action="store_true", help="Wykonaj wszystkie etapy od nowa")
+    parser.add_argument("--gadatliwosc", type=int, choices=(0, 1, 2), default=None,
+                        help="0 - tylko błędy, 1 - podsumowania, 2 - każdy fragment")
+    args = parser.parse_args(argv)
+    if args.gadatliwosc is not None:
+        metrics.ustaw_poziom(args.gadatliwosc)
+    return run(args.book, args.czasy, args.mp3, args.wyjscie, fmt=args.fmt, prog=args.prog,
+               tryb=args.tryb, snap=args.snap, workers=args.workers,
+               model_name=args.model, language=args.jezyk, wymus=args.wymus, vad=args.vad,
+               kotwica={"sekundy": args.kotwica, "koniec": args.kotwica_koniec} if args.kotwica else None)
+
+
+if __name__ == "__main__":
+    main()
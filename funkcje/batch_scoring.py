@@ -0,0 +1,101 @@
+"""
+Wsadowa ocena okien dopasowania - wszystkie przesunięcia naraz.
+
+Wzór jest ten sam co w dotychczasowej pętli find_phrase_with_sliding_window:
+    partial_ratio * 0.7 + token_set_ratio * 0.3 + 10 za okno zaczynające się
+    od pierwszego słowa frazy
+a wyniki wracają jako tablica NumPy, więc najlepsze okno wybiera argmax
+(remis -> pierwsze, czyli najwcześniejsze).
+
+partial_ratio liczone jest dla całej partii naraz, z wynikami identycznymi
+z fuzz.partial_ratio: fuzzywuzzy dla każdego bloku zgodności okna liczy
+ratio frazy z odcinkiem okna zaczynającym się na wysokości bloku, a okna
+partii (sąsiednie początki słów wokół kandydata) nakładają się - te same
+odcinki tekstu rozdziału wracają w wielu oknach. Tu ratio każdego odcinka
+(pozycje w całym tekście) liczone jest raz na partię, a bloki zgodności
+liczy Levenshtein (C) bez obiektów SequenceMatcher. Bez python-Levenshtein
+(fuzzywuzzy liczy wtedy przez difflib) zostaje ocena okno po oknie.
+"""
+
+import numpy as np
+from fuzzywuzzy import fuzz, utils
+
+from funkcje import metrics
+
+try:
+    import Levenshtein
+except ImportError:
+    Levenshtein = None
+
+# Ile okien oceniać w jednej partii (ogranicza pamięć przy pełnym skanie)
+BATCH_SIZE = 1024
+
+
+def first_word_bonus(phrase_words, norm_text, starts):
+    """Tablica 0/1: czy okno na danej pozycji zaczyna się od pierwszego słowa frazy."""
+    first = phrase_words[0]
+    return np.fromiter((norm_text.startswith(first, i) for i in starts), dtype=bool, count=len(starts))
+
+
+def partial_ratios(phrase_norm, norm_text, starts, window_size):
+    """
+    fuzz.partial_ratio(phrase_norm, norm_text[i:i + window_size]) dla
+    wszystkich i ze `starts` - ratio wspólnych odcinków liczone raz.
+
+    Returns:
+        np.ndarray: Wyniki w kolejności `starts`
+    """
+    m = len(phrase_norm)
+    wyniki = np.empty(len(starts))
+    odcinki = {}        # (początek, koniec) w norm_text -> ratio
+    for k, i in enumerate(starts):
+        window = norm_text[i:i + window_size]
+        if Levenshtein is None or not phrase_norm or len(window) <= m:
+            # Przypadki brzegowe (puste, fraza nie krótsza od okna) - jak w fuzzywuzzy
+            wyniki[k] = fuzz.partial_ratio(phrase_norm, window)
+            continue
+        najlepszy = 0.0
+        bloki = Levenshtein.matching_blocks(Levenshtein.opcodes(phrase_norm, window), phrase_norm, window)
+        for b0, b1, _ in bloki:
+            poczatek = max(0, b1 - b0)
+            klucz = (i + poczatek, i + min(poczatek + m, len(window)))
+            r = odcinki.get(klucz)
+            if r is None:
+                r = odcinki[klucz] = Levenshtein.ratio(phrase_norm, norm_text[klucz[0]:klucz[1]])
+            najlepszy = max(najlepszy, r)
+        wyniki[k] = 100 if najlepszy > .995 else utils.intr(100 * najlepszy)
+    metrics.licz("odcinki_ratio", len(odcinki))
+    return wyniki
+
+
+def score_windows(phrase_norm, norm_text, starts, window_size):
+    """
+    Ocenia okna norm_text[i:i + window_size] dla wszystkich i ze `starts`.
+
+    Args:
+        phrase_norm (str): Znormalizowana fraza
+        norm_text (str): Znormalizowany tekst rozdziału
+        starts (sequence[int]): Pozycje początków okien
+        window_size (int): Długość okna
+
+    Returns:
+        np.ndarray: Wyniki w kolejności `starts`
+    """
+    starts = list(starts)
+    if not starts:
+        return np.zeros(0)
+    phrase_words = phrase_norm.split()
+    scores = np.empty(len(starts))
+
+    with metrics.etap("ocena_okien"):
+        for lo in range(0, len(starts), BATCH_SIZE):
+            part = starts[lo:lo + BATCH_SIZE]
+            partial = partial_ratios(phrase_norm, norm_text, part, window_size)
+            token = np.fromiter((fuzz.token_set_ratio(phrase_norm, norm_text[i:i + window_size]) for i in part),
+                                dtype=float, count=len(part))
+            scores[lo:lo + len(part)] = partial * 0.7 + token * 0.3
+            metrics.licz("wywolania_fuzz", len(part))
+
+        scores += 10 * first_word_bonus(phrase_words, norm_text, starts)
+    metrics.licz("okna_ocenione", len(starts))
+    return scores
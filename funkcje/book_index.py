@@ -0,0 +1,130 @@
+"""
+Trwały indeks rozdziałów książki w pliku obok książki (<książka>.index.json).
+
+Indeks zawiera bajtowe offsety rozdziałów i podrozdziałów, ich tytuły oraz
+hash zawartości pliku. Rozdział wycinany jest przez mmap - bez czytania
+i parsowania całej książki. Indeks budowany jest ponownie tylko wtedy,
+gdy zmieni się zawartość książki (najpierw porównujemy rozmiar i mtime,
+hash liczymy dopiero gdy te się różnią).
+
+Rozdziały wyszukuje strumieniowy chapter_tokenizer, więc budowa indeksu
+ma stałe zużycie pamięci także dla wielomegabajtowych wydań zbiorczych.
+Format książki to nazwa z chapter_tokenizer.FORMATY albo własny słownik
+wzorców nagłówków.
+"""
+
+import os
+import json
+import mmap
+import hashlib
+
+from funkcje import chapter_tokenizer
+
+INDEX_VERSION = 2
+
+
+def index_path(book_path):
+    """Ścieżka pliku indeksu obok książki."""
+    return os.path.splitext(book_path)[0] + ".index.json"
+
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """SHA-256 zawartości pliku, czytany kawałkami."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _parse(f, fmt):
+    """Składa rekordy z chapter_tokenizer w listę rozdziałów z podrozdziałami."""
+    chapters = []
+    subs = []
+    for rec in chapter_tokenizer.tokenize(f, fmt):
+        if rec["typ"] == "podrozdzial":
+            subs.append({k: rec[k] for k in ("roman", "title", "start", "end")})
+            continue
+        chapter = {k: rec[k] for k in ("header", "roman", "title", "start", "header_end", "end")}
+        chapter["subchapters"] = subs
+        subs = []
+        chapters.append(chapter)
+    return chapters
+
+
+def build_index(book_path, fmt):
+    """Buduje indeks książki i zapisuje go obok niej."""
+    fmt = chapter_tokenizer.get_format(fmt)
+    st = os.stat(book_path)
+    with open(book_path, "rb") as f:
+        chapters = _parse(f, fmt)
+
+    index = {
+        "version": INDEX_VERSION,
+        "format": fmt,
+        "size": st.st_size,
+        "mtime": st.st_mtime,
+        "sha256": file_hash(book_path),
+        "chapters": chapters,
+    }
+    tmp_path = index_path(book_path) + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(tmp_path, index_path(book_path))
+    except OSError as e:
+        # Katalog tylko do odczytu - indeks działa wtedy tylko w pamięci
+        print(f"⚠️ Nie udało się zapisać indeksu: {e}")
+    return index
+
+
+def load_index(book_path, fmt):
+    """
+    Zwraca indeks książki - z pliku, jeśli jest aktualny, w przeciwnym razie
+    buduje go od nowa.
+    """
+    path = index_path(book_path)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = None
+
+    fmt = chapter_tokenizer.get_format(fmt)
+    if index and index.get("version") == INDEX_VERSION and index.get("format") == fmt:
+        st = os.stat(book_path)
+        if index["size"] == st.st_size and index["mtime"] == st.st_mtime:
+            return index
+        # Zmienił się mtime (np. świeży git clone) - sprawdź zawartość
+        if index["size"] == st.st_size and index["sha256"] == file_hash(book_path):
+            index["mtime"] = st.st_mtime
+            try:
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(index, f, ensure_ascii=False)
+            except OSError:
+                pass
+            return index
+
+    print(f"🗂️ Buduję indeks rozdziałów: {os.path.basename(book_path)}")
+    return build_index(book_path, fmt)
+
+
+def read_range(book_path, start, end):
+    """Wycina fragment książki [start, end) (offsety bajtowe) przez mmap."""
+    if end <= start:
+        return ""
+    with open(book_path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return mm[start:end].decode("utf-8")
+
+
+def chapter_text(book_path, index, chapter):
+    """
+    Tekst rozdziału w takiej postaci, w jakiej zapisywał go cut_chapter:
+    dokładnie zakres rozdziału, a dla formatów z 'enter_po_naglowku'
+    nagłówek + '\\n' + reszta rozdziału.
+    """
+    if index["format"].get("enter_po_naglowku"):
+        header = read_range(book_path, chapter["start"], chapter["header_end"])
+        return header + "\n" + read_range(book_path, chapter["header_end"], chapter["end"])
+    return read_range(book_path, chapter["start"], chapter["end"])
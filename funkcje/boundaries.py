@@ -0,0 +1,108 @@
+"""
+Indeks granic tekstu rozdziału: początki akapitów, zdań i kwestii
+dialogowych oraz podwójne entery - liczony raz, przeszukiwany bisect.
+
+Dosuwanie dopasowania do granicy (snap_to_boundary) ma kilka trybów:
+ - "pierwsza" - pierwszy początek akapitu/zdania w oknie [-100, +50]
+                (dotychczasowe zachowanie)
+ - "zdanie"   - najbliższy początek zdania lub akapitu
+ - "akapit"   - najbliższy początek akapitu
+ - "dialog"   - najbliższy myślnik dialogowy (—) na początku linii
+"""
+
+import re
+from bisect import bisect_left
+
+TRYBY_DOSUWANIA = ("pierwsza", "zdanie", "akapit", "dialog")
+
+
+def build_boundary_index(text):
+    """
+    Zwraca posortowane listy pozycji:
+    {'akapity', 'zdania', 'dialogi', 'entery', 'po_kropce'}
+
+    'zdania' zawiera też początki akapitów (każdy akapit zaczyna zdanie),
+    'po_kropce' - tylko początki zdań wewnątrz akapitu.
+    """
+    akapity = []
+    for pos in [0] + [m.end() for m in re.finditer(r"\n", text)]:
+        if pos < len(text) and (text[pos].isupper() or text[pos] in '—"'):
+            akapity.append(pos)
+
+    zdania = []
+    for m in re.finditer(r"[.!?] (?=\S)", text):
+        if text[m.end()].isupper():
+            zdania.append(m.end())
+
+    dialogi = [m.end() - 1 for m in re.finditer(r"(?m)^[ \t]*—", text)]
+    # Z nakładaniem ("\n\n\n" to dwa wystąpienia) - jak str.find("\n\n", pos)
+    entery = [m.start() for m in re.finditer(r"\n(?=\n)", text)]
+
+    return {
+        'akapity': akapity,
+        'zdania': sorted(set(akapity) | set(zdania)),
+        'dialogi': dialogi,
+        'entery': entery,
+        'po_kropce': zdania,
+    }
+
+
+def _najblizsza(pozycje, pos, max_odleglosc):
+    i = bisect_left(pozycje, pos)
+    najlepsza = None
+    for k in (i - 1, i):
+        if 0 <= k < len(pozycje):
+            d = abs(pozycje[k] - pos)
+            if d <= max_odleglosc and (najlepsza is None or d < abs(najlepsza - pos)):
+                najlepsza = pozycje[k]
+    return najlepsza
+
+
+def snap_to_boundary(granice, pos, tryb="pierwsza", max_odleglosc=150):
+    """
+    Dosuwa pozycję dopasowania do granicy tekstu.
+
+    Args:
+        granice (dict): Wynik build_boundary_index
+        pos (int): Pozycja w tekście oryginalnym
+        tryb (str): Jeden z TRYBY_DOSUWANIA
+        max_odleglosc (int): Dla trybów innych niż "pierwsza" - maksymalne przesunięcie
+
+    Returns:
+        int: Nowa pozycja (albo `pos`, gdy w pobliżu nie ma granicy)
+    """
+    if tryb == "pierwsza":
+        # Jak dawna pętla po j z [pos-100, pos+50): akapit zaczyna się w j,
+        # zdanie w j+1 (j to spacja po kropce) - wygrywa mniejsze j
+        lo, hi = max(0, pos - 100), pos + 50
+        kandydaci = []
+        akapity = granice['akapity']
+        i = bisect_left(akapity, lo)
+        if i < len(akapity) and akapity[i] < hi:
+            kandydaci.append((akapity[i], akapity[i]))
+        po_kropce = granice['po_kropce']
+        i = bisect_left(po_kropce, lo + 1)
+        if i < len(po_kropce) and po_kropce[i] - 1 < hi:
+            kandydaci.append((po_kropce[i] - 1, po_kropce[i]))
+        return min(kandydaci)[1] if kandydaci else pos
+
+    if tryb == "zdanie":
+        pozycje = granice['zdania']
+    elif tryb == "akapit":
+        pozycje = granice['akapity']
+    elif tryb == "dialog":
+        pozycje = granice['dialogi']
+    else:
+        raise ValueError(f"Nieznany tryb dosuwania: {tryb} (dostępne: {', '.join(TRYBY_DOSUWANIA)})")
+
+    najblizsza = _najblizsza(pozycje, pos, max_odleglosc)
+    return pos if najblizsza is None else najblizsza
+
+
+def next_paragraph_break(granice, start, end):
+    """Pierwszy podwójny enter w [start, end) albo -1 (jak str.find)."""
+    entery = granice['entery']
+    i = bisect_left(entery, start)
+    if i < len(entery) and entery[i] + 2 <= end:
+        return entery[i]
+    return -1
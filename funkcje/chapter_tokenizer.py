@@ -0,0 +1,150 @@
+"""
+Strumieniowy tokenizer rozdziałów książki.
+
+Czyta plik kawałkami (stała pamięć niezależnie od rozmiaru książki),
+dzieli go na linie z offsetami bajtowymi i zwraca rekordy rozdziałów
+i podrozdziałów, gdy tylko znany jest ich koniec.
+
+Wzorce nagłówków są konfigurowalne per książka (FORMATY):
+ - "rozdzial"    - regex nagłówka rozdziału szukany w linii
+ - "tytul"       - czy tytuł rozdziału jest w następnej niepustej linii
+ - "podrozdzial" - regex linii z numerem podrozdziału (tytuł w następnej
+                   niepustej linii) albo None
+ - "enter_po_naglowku" - przy wycinaniu wstaw '\\n' po nagłówku (tak
+                   zapisywał rozdziały dawny re.split dla W pustyni...)
+"""
+
+import re
+
+FORMATY = {
+    "proste": {
+        "rozdzial": r"ROZDZIAŁ [IVXLCDM]+",
+        "tytul": False,
+        "podrozdzial": None,
+        "enter_po_naglowku": True,
+    },
+    "z_tytulami": {
+        "rozdzial": r"ROZDZIAŁ\s+[IVXLCDM]+",
+        "tytul": True,
+        "podrozdzial": r"[IVXLCDM]+",
+        "enter_po_naglowku": False,
+    },
+}
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def get_format(fmt):
+    """Zwraca konfigurację formatu - nazwę z FORMATY albo własny słownik."""
+    if isinstance(fmt, dict):
+        return fmt
+    if fmt not in FORMATY:
+        raise ValueError(f"Nieznany format książki: {fmt} (dostępne: {', '.join(FORMATY)})")
+    return FORMATY[fmt]
+
+
+def iter_lines(f, chunk_size=CHUNK_SIZE):
+    """
+    Czyta plik binarny kawałkami i zwraca linie z offsetami.
+
+    Yields:
+        tuple: (offset początku linii, bajty linii bez '\\n')
+    """
+    offset = 0
+    tail = b""
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        data = tail + chunk
+        start = 0
+        while True:
+            nl = data.find(b"\n", start)
+            if nl == -1:
+                break
+            yield offset + start, data[start:nl]
+            start = nl + 1
+        offset += start
+        tail = data[start:]
+    if tail:
+        yield offset, tail
+
+
+def tokenize(f, fmt):
+    """
+    Tokenizuje otwarty binarnie plik książki.
+
+    Yields:
+        dict: rekordy {'typ': 'rozdzial', 'numer', 'header', 'roman',
+              'title', 'start', 'header_end', 'end'} oraz
+              {'typ': 'podrozdzial', 'rozdzial', 'roman', 'title', 'start', 'end'}
+              - offsety bajtowe; rekord podrozdziału przychodzi przed
+              rekordem jego rozdziału (koniec rozdziału znany jest później)
+    """
+    fmt = get_format(fmt)
+    chapter_re = re.compile(fmt["rozdzial"].encode("utf-8"))
+    sub_re = re.compile(fmt["podrozdzial"].encode("utf-8")) if fmt.get("podrozdzial") else None
+    roman_re = re.compile(rb"[IVXLCDM]+\s*$")
+
+    chapter = None      # otwarty rozdział
+    sub = None          # otwarty podrozdział
+    czeka_na_tytul = None
+    numer = 0
+
+    for line_start, line in iter_lines(f):
+        m = chapter_re.search(line)
+
+        if czeka_na_tytul is not None and not m:
+            if line.strip():
+                czeka_na_tytul["title"] = line.decode("utf-8").strip()
+                czeka_na_tytul = None
+            continue
+        czeka_na_tytul = None
+
+        if m:
+            start = line_start + m.start()
+            if sub:
+                sub["end"] = start
+                yield sub
+                sub = None
+            if chapter:
+                chapter["end"] = start
+                yield chapter
+            numer += 1
+            header = m.group().decode("utf-8").strip()
+            roman = roman_re.search(m.group())
+            chapter = {
+                "typ": "rozdzial",
+                "numer": numer,
+                "header": header,
+                "roman": roman.group().decode("utf-8").strip() if roman else "",
+                "title": "",
+                "start": start,
+                "header_end": line_start + m.end(),
+            }
+            if fmt.get("tytul"):
+                czeka_na_tytul = chapter
+            continue
+
+        if chapter and sub_re and line[:1].strip() and sub_re.fullmatch(line.rstrip()):
+            # Podrozdział zaczyna się od '\n' kończącego poprzednią linię
+            start = line_start - 1
+            if sub:
+                sub["end"] = start
+                yield sub
+            sub = {
+                "typ": "podrozdzial",
+                "rozdzial": numer,
+                "roman": line.decode("utf-8").strip(),
+                "title": "",
+                "start": start,
+            }
+            czeka_na_tytul = sub
+
+    file_end = f.seek(0, 2)
+    if sub:
+        sub["end"] = file_end
+        yield sub
+    if chapter:
+        chapter["end"] = file_end
+        yield chapter
@@ -1,9 +1,32 @@
 import os
 import re
+import heapq
+import queue
+import threading
+import numpy as np
 from pydub import AudioSegment
-from fuzzywuzzy import fuzz
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from funkcje.ngram_index import build_ngram_index, find_candidates
+from funkcje.global_alignment import monotonic_alignment
+from funkcje.batch_scoring import score_windows
+from funkcje import position_prior
+from funkcje.boundaries import build_boundary_index, snap_to_boundary, next_paragraph_break
+from funkcje import normalization
+from funkcje import transcription_cache
+from funkcje import transcription_pool
+from funkcje import transcription_daemon
+from funkcje import anchor_transcription
+from funkcje import mp3_info
+from funkcje import mp3_split
+from funkcje import materialize
+from funkcje import empty_srt
+from funkcje import metrics
 
-def podziel_na_fragmenty_z_enterami(plik_mp3, text_file, output_folder="fragmenty", prog=50):
+def podziel_na_fragmenty_z_enterami(plik_mp3, text_file, output_folder="fragmenty", prog=50, book=None,
+                                    tryb="zachlanny", snap="pierwsza", mp3_folder=None, workers=1,
+                                    strumieniowo=False, czasy=None, dokladnie=False, kotwica=None,
+                                    model_name="base", language="pl", decode_options=None, uzyj_cache=True, vad=None):
     """
     Funkcja dzieli plik MP3 na fragmenty zgodnie z enterami w pliku tekstowym.
     
@@ -12,185 +35,234 @@ def podziel_na_fragmenty_z_enterami(plik_mp3, text_file, output_folder="fragment
         text_file (str): Ścieżka do pliku tekstowego z enterami
         output_folder (str): Folder docelowy dla fragmentów
         prog (int): Próg dopasowania (0-100)
+        book (str): Książka (nazwa lub ścieżka) - wybiera słownik zamienników
+        tryb (str): "zachlanny" lub "globalny" - patrz wstaw_entery_z_podwojna_weryfikacja
+        snap (str): Tryb dosuwania do granic tekstu - patrz funkcje.boundaries
+        mp3_folder (str): Folder z plikami MP3 (domyślnie "mp3" obok text_file)
+        workers (int): Liczba procesów transkrypcji - patrz pobierz_frazy_z_mp3
+        strumieniowo (bool): Dopasowuj fragmenty w trakcie transkrypcji
+                             (podziel_strumieniowo; tylko tryb zachłanny)
+        czasy (str): Plik z czasami fragmentów (jak dla empty_srt) - z nim
+                     `plik_mp3` (jedno nagranie całego rozdziału) jest
+                     transkrybowany raz i cięty bezstratnie na fragmenty
+        dokladnie (bool): Cięcie `plik_mp3` co do próbki (z dekodowaniem zakresu)
+        kotwica (int|dict): Transkrypcja tylko początków fragmentów, pełna
+                            dla słabych dopasowań (funkcje.anchor_transcription)
+        model_name, language, decode_options, uzyj_cache, vad: Transkrypcja
+                            Whisper - patrz pobierz_frazy_z_mp3; te same dla
+                            kotwic i dla pełnej transkrypcji słabych fragmentów
     """
+    transkrypcja = dict(model_name=model_name, language=language, decode_options=decode_options,
+                        uzyj_cache=uzyj_cache, vad=vad)
+
     # Wczytaj tekst
     with open(text_file, 'r', encoding='utf-8') as f:
         text = f.read()
     
-    # Pobierz frazy bezpośrednio z plików MP3
-    frazy = pobierz_frazy_z_mp3(text_file)
-    
-    # Wstaw entery z podwójną weryfikacją
-    fragmenty = wstaw_entery_z_podwojna_weryfikacja(text, frazy, prog, text_file)
-    
-    # Ładuj plik MP3 - jeśli jest przekazany
+    # Plik MP3 - jeśli jest przekazany (długość z nagłówków, bez dekodowania)
     if plik_mp3 and os.path.exists(plik_mp3):
-        audio = AudioSegment.from_mp3(plik_mp3)
+        metrics.info(f"🎵 Plik MP3: {plik_mp3} ({dlugosc_mp3_ms(plik_mp3) / 1000:.1f}s)")
     else:
-        audio = None
+        plik_mp3 = None
+    
+    if plik_mp3 and czasy:
+        # Jedno nagranie rozdziału - frazy z segmentów Whisper wg czasów
+        frazy = frazy_z_dlugiego_mp3(plik_mp3, empty_srt.wczytaj_czasy(czasy), **transkrypcja)
+        fragmenty = wstaw_entery_z_podwojna_weryfikacja(text, frazy, prog, text_file, book=book, tryb=tryb, snap=snap)
+    elif strumieniowo and tryb != "globalny":
+        # Dopasowanie równolegle z transkrypcją
+        fragmenty = list(podziel_strumieniowo(text, text_file, book=book, snap=snap, prog=prog,
+                                              mp3_folder=mp3_folder, workers=workers, kotwica=kotwica,
+                                              **transkrypcja))
+    else:
+        # Pobierz frazy bezpośrednio z plików MP3
+        frazy = pobierz_frazy_z_mp3(text_file, mp3_folder=mp3_folder, workers=workers, kotwica=kotwica,
+                                    **transkrypcja)
+        
+        # Wstaw entery z podwójną weryfikacją
+        fragmenty = wstaw_entery_z_podwojna_weryfikacja(text, frazy, prog, text_file, book=book, tryb=tryb, snap=snap,
+                                                        pelna=pelna_transkrypcja(**transkrypcja) if kotwica else None)
     
     # Utwórz folder wyjściowy
     os.makedirs(output_folder, exist_ok=True)
     
     # Wytnij i zapisz fragmenty
-    utworz_fragmenty_mp3(audio, fragmenty, output_folder)
+    utworz_fragmenty_mp3(plik_mp3 if czasy else None, fragmenty, output_folder, mp3_folder=mp3_folder,
+                         dokladnie=dokladnie)
     
     return fragmenty
 
 
-def normalize_for_matching(text):
+def normalize_for_matching(text, book=None):
     """
     ✅ ULEPSZONA normalizacja - bardziej agresywna
+
+    Deleguje do skompilowanego silnika z funkcje.normalization; `book`
+    wybiera słownik błędów Whisper (domyślnie W pustyni i w puszczy).
     """
-    text = text.lower()
-    
-    # Usuń myślniki
-    text = text.replace('—', ' ').replace('–', ' ').replace('-', ' ')
-    
-    # Usuń wszystkie znaki interpunkcyjne (zachowaj polskie znaki)
-    text = re.sub(r'[^\w\sąćęłńóśźżĄĆĘŁŃÓŚŹŻ]', ' ', text)
-    
-    # Normalizuj wielokrotne spacje
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    # ✅ ROZSZERZONE zamienniki - dodaj typowe błędy Whisper
-    replacements = {
-        # Błędy Whisper dla nazwisk
-        'roli są': 'rawlison',
-        'rolison': 'rawlison',
-        'rolyson': 'rawlison',
-        'panorolicon': 'pan rawlison',
-        'panrolyson': 'pan rawlison',
-        'kupantarkowski': 'pan tarkowski',
-        
-        # Błędy nazw miejsc
-        'lfhn': 'el fachen',
-        'elfhn': 'el fachen',
-        'medinet': 'medinet',
-        'medinę': 'medinet',
-        'medinu': 'medinet',
-        'elwasta': 'el wasta',
-        'el wasta': 'el wasta',
-        'elgarak': 'el gharak',
-        'el garak': 'el gharak',
-        'gara k': 'el gharak',
-        
-        # Błędy imion
-        'nel': 'nel',
-        'nell': 'nel',
-        'staś': 'stas',
-        'stać': 'stas',
-        'ustasia': 'stasia',
-        
-        # Błędy słów arabskich
-        'chami': 'chamis',
-        'hamis': 'chamis',
-        'hamiz': 'chamis',
-        'idr': 'idrys',
-        'idry': 'idrys',
-        'gebr': 'gebhr',
-        'geber': 'gebhr',
-        
-        # Czasowniki
-        'odpowiedział': 'powiedzial',
-        'rzekł': 'powiedzial',
-        'rzecze': 'powiedzial',
-        'ozwał się': 'powiedzial',
-        'odparł': 'powiedzial',
-        
-        # Inne częste formy
-        'więc': 'wiec',
-        'cóż': 'coz',
-        'jakże': 'jakze',
-        'żeby': 'zeby',
-        'gdyż': 'gdyz',
+    return normalization.normalize(normalization.get_normalizer(book), text)
+
+
+def normalize_with_offsets(text, book=None):
+    """
+    Normalizacja jak normalize_for_matching, ale w jednym przejściu po
+    tekście zwraca też tablicę offsetów: offsets[i] to pozycja w tekście
+    oryginalnym, z której pochodzi i-ty znak tekstu znormalizowanego.
+
+    Returns:
+        tuple: (znormalizowany tekst, array offsetów - niemalejąca)
+    """
+    return normalization.normalize_with_offsets(normalization.get_normalizer(book), text)
+
+
+def przygotuj_rozdzial(text, book=None):
+    """
+    Liczy raz na rozdział wszystko, czego potrzebuje wyszukiwanie fraz:
+    tekst znormalizowany, mapę offsetów, indeks n-gramów i indeks granic
+    zdań/akapitów.
+    """
+    normalizer = normalization.get_normalizer(book)
+    with metrics.etap("normalizacja"):
+        norm, offsets = normalization.normalize_with_offsets(normalizer, text)
+    with metrics.etap("indeksy"):
+        index = build_ngram_index(norm)
+        granice = build_boundary_index(text)
+    return {
+        'text': text,
+        'norm': norm,
+        'offsets': offsets,
+        'index': index,
+        'granice': granice,
+        'normalizer': normalizer,
     }
-    
-    for wrong, correct in replacements.items():
-        text = text.replace(wrong, correct)
-        
-    return text
 
 
-def find_phrase_with_sliding_window(original_text, search_phrase, start_offset=0, threshold=40):
+def score_candidates(rozdzial, phrase_norm, kandydaci, norm_start, window_size, promien=50, norm_end=None):
+    """
+    Ocenia okna zaczynające się od słów w promieniu `promien` wokół każdego
+    kandydata z indeksu n-gramów (początki okien w [norm_start, norm_end]).
+
+    Returns:
+        list[tuple]: (najlepsza pozycja, wynik) dla każdego kandydata
+                     - pozycje w tekście znormalizowanym
+    """
+    search_norm = rozdzial['norm']
+    word_starts = rozdzial['index']['word_starts']
+    max_start = len(search_norm) - len(phrase_norm)
+    if norm_end is not None:
+        max_start = min(max_start, norm_end)
+
+    pasma = []
+    for kandydat in kandydaci:
+        lo = bisect_left(word_starts, max(norm_start, kandydat - promien))
+        hi = bisect_right(word_starts, min(max_start, kandydat + promien))
+        pasma.append((lo, hi))
+
+    # ✅ Wszystkie okna wszystkich kandydatów oceniane jedną partią
+    pozycje = sorted({i for lo, hi in pasma for i in range(lo, hi)})
+    if not pozycje:
+        return []
+    starts = [word_starts[i] for i in pozycje]
+    scores = score_windows(phrase_norm, search_norm, starts, window_size)
+    ranga = {i: k for k, i in enumerate(pozycje)}
+
+    wyniki = []
+    for lo, hi in pasma:
+        if lo >= hi:
+            continue
+        k = ranga[lo] + int(np.argmax(scores[ranga[lo]:ranga[hi - 1] + 1]))
+        wyniki.append((starts[k], float(scores[k])))
+
+    return wyniki
+
+
+def find_phrase_with_sliding_window(original_text, search_phrase, start_offset=0, threshold=40, rozdzial=None,
+                                    snap="pierwsza", end_offset=None, przewidywana=None):
     """
     ✅ PRZEPISANA funkcja - lepsze dopasowanie + szukanie granic słów
+
+    `rozdzial` to wynik przygotuj_rozdzial(original_text) - liczony raz na
+    rozdział i współdzielony przez wszystkie frazy. Okna oceniane są tylko
+    wokół kandydatów z indeksu n-gramów; pełne przeszukanie zostaje jako
+    fallback, gdy indeks nic nie wytypuje. `snap` to tryb dosuwania do
+    granicy tekstu (funkcje.boundaries.TRYBY_DOSUWANIA). `end_offset`
+    ogranicza początek dopasowania z góry (pasmo z funkcje.position_prior),
+    a przy `przewidywana` remis ocen wygrywa pozycja bliższa przewidywanej
+    zamiast wcześniejszej.
     """
     if not search_phrase or len(search_phrase) < 3:
         return (None, None), 0
 
-    phrase_norm = normalize_for_matching(search_phrase)
+    if rozdzial is None:
+        rozdzial = przygotuj_rozdzial(original_text)
+
+    with metrics.etap("normalizacja"):
+        phrase_norm = normalization.normalize(rozdzial['normalizer'], search_phrase)
     phrase_words = phrase_norm.split()
     
     if len(phrase_words) == 0:
         return (None, None), 0
 
-    search_text = original_text[start_offset:]
-    search_norm = normalize_for_matching(search_text)
-    
-    if len(search_norm) == 0:
+    # Pozycje liczone w znormalizowanym CAŁYM rozdziale
+    search_norm = rozdzial['norm']
+    offsets = rozdzial['offsets']
+    norm_start = bisect_left(offsets, start_offset)
+    norm_end = bisect_left(offsets, end_offset) if end_offset is not None else None
+    if przewidywana is None:
+        odleglosc = lambda pos: pos
+    else:
+        norm_przewidywana = bisect_left(offsets, przewidywana)
+        odleglosc = lambda pos: abs(pos - norm_przewidywana)
+
+    if norm_start >= len(search_norm):
         return (None, None), 0
-    
+
     # ✅ Zwiększ okno dla lepszego dopasowania
     window_size = max(len(search_phrase) * 5, 500)
     step_size = 10  # Mniejszy krok = dokładniejsze szukanie
-    
+    max_start = len(search_norm) - len(phrase_norm)
+    if norm_end is not None:
+        max_start = min(max_start, norm_end)
+
     best_score = 0
     best_pos = None
-    
-    # ✅ Szukaj po znormalizowanym tekście
-    i = 0
-    max_start = len(search_norm) - len(phrase_norm)
-    
-    while i <= max_start:
-        window = search_norm[i:i + window_size]
-        
-        # Użyj różnych metod dopasowania
-        score_partial = fuzz.partial_ratio(phrase_norm, window)
-        score_token = fuzz.token_set_ratio(phrase_norm, window)
-        
-        # Średnia ważona
-        score = score_partial * 0.7 + score_token * 0.3
-        
-        # Bonus za dokładne dopasowanie początku
-        if window.startswith(phrase_words[0]):
-            score += 10
-        
-        if score > best_score:
+
+    # ✅ Oceniaj tylko okna wokół kandydatów z indeksu (remis -> wcześniejsza / bliższa przewidywanej)
+    with metrics.etap("kandydaci"):
+        kandydaci = find_candidates(rozdzial['index'], phrase_norm, start=norm_start,
+                                    end=None if norm_end is None else norm_end + 1)
+    for pos, score in score_candidates(rozdzial, phrase_norm, kandydaci, norm_start, window_size,
+                                       norm_end=norm_end):
+        if score > best_score or (score == best_score and best_pos is not None
+                                  and odleglosc(pos) < odleglosc(best_pos)):
             best_score = score
-            best_pos = i
-        
-        i += step_size
-    
-    if best_score < threshold:
-        return (None, None), best_score
+            best_pos = pos
+
+    if best_pos is None:
+        best_score = 0
+        metrics.licz("pelne_skany")
     
-    # ✅ Znajdź rzeczywistą pozycję w oryginalnym tekście
-    # Musimy przeliczyć pozycję ze znormalizowanego na oryginalny tekst
-    real_pos = map_normalized_to_original(search_text, search_norm, best_pos)
+        # ✅ Szukaj po znormalizowanym tekście - wszystkie okna naraz
+        starts = range(norm_start, max_start + 1, step_size)
+        if len(starts) > 0:
+            scores = score_windows(phrase_norm, search_norm, starts, window_size)
+            k = int(np.argmax(scores))
+            if scores[k] > 0:
+                best_score = float(scores[k])
+                best_pos = starts[k]
     
-    if real_pos is None:
+    if best_score < threshold:
         return (None, None), best_score
     
-    # ✅ Znajdź granicę słowa (początek zdania/akapitu)
-    real_start = start_offset + real_pos
-    
-    # Szukaj początku zdania (wielka litera po kropce/enterze)
-    for j in range(max(0, real_start - 100), real_start + 50):
-        if j >= len(original_text):
-            break
+    # ✅ Znajdź rzeczywistą pozycję w oryginalnym tekście - O(1) z mapy offsetów
+    with metrics.etap("mapowanie_offsetow"):
+        real_start = map_normalized_to_original(offsets, best_pos)
         
-        # Sprawdź czy to początek akapitu
-        if j == 0 or (j > 0 and original_text[j-1] == '\n'):
-            if original_text[j].isupper() or original_text[j] in '—"':
-                real_start = j
-                break
+        if real_start is None:
+            return (None, None), best_score
         
-        # Sprawdź czy to początek zdania
-        if j > 0 and original_text[j-1] in '.!?' and original_text[j] == ' ':
-            if j+1 < len(original_text) and original_text[j+1].isupper():
-                real_start = j + 1
-                break
+        # ✅ Znajdź granicę słowa (początek zdania/akapitu)
+        real_start = snap_to_boundary(rozdzial['granice'], real_start, snap)
     
     # Oszacuj długość na podstawie transkrypcji
     estimated_length = len(search_phrase) * 2  # Mnożnik bezpieczny
@@ -199,235 +271,821 @@ def find_phrase_with_sliding_window(original_text, search_phrase, start_offset=0
     return (real_start, real_end), best_score
 
 
-def map_normalized_to_original(original_text, normalized_text, norm_pos):
+def dopasuj_globalnie(rozdzial, frazy, threshold=35, top_k=3, snap="pierwsza", podloga=80):
+    """
+    Globalne dopasowanie wszystkich transkrypcji naraz.
+
+    Dla każdego fragmentu wybiera kandydatów z indeksu n-gramów (z całej
+    transkrypcji, a gdy ta nic nie wytypuje - z jej pierwszych 10 słów),
+    ocenia ich, a potem monotonic_alignment wybiera zestaw pozycji
+    rosnących zgodnie z kolejnością plików o największej łącznej ocenie
+    ponad `podloga`. Kandydaci są z całego rozdziału, więc każdy
+    dodatkowy to głównie przypadkowe okno - top_k=3 jest i tańsze,
+    i trafniejsze niż 8, a podłoga nie pozwala kilku słabym
+    dopasowaniom wypchnąć z ciągu jednego prawdziwego.
+
+    Returns:
+        list: Dla każdej frazy (pozycja w tekście oryginalnym, wynik) albo None
+    """
+    index = rozdzial['index']
+    kandydaci_fragmentow = []
+
+    for item in frazy:
+        transkrypcja = item['transkrypcja']
+        if len(transkrypcja.split()) < 3:
+            kandydaci_fragmentow.append([])
+            continue
+
+        with metrics.etap("normalizacja"):
+            phrase_norm = normalization.normalize(rozdzial['normalizer'], transkrypcja)
+        if not phrase_norm:
+            kandydaci_fragmentow.append([])
+            continue
+
+        window_size = max(len(transkrypcja) * 5, 500)
+        shorter = ' '.join(phrase_norm.split()[:10])
+        with metrics.etap("kandydaci"):
+            kandydaci = find_candidates(index, phrase_norm, top_k=top_k)
+            if not kandydaci:
+                kandydaci = find_candidates(index, shorter, top_k=top_k)
+
+        oceny = score_candidates(rozdzial, phrase_norm, sorted(set(kandydaci)), 0, window_size)
+        kandydaci_fragmentow.append([(pos, score) for pos, score in oceny if score >= threshold])
+
+    with metrics.etap("uszeregowanie_globalne"):
+        trafienia = monotonic_alignment(kandydaci_fragmentow, podloga=podloga)
+
+    wynik = []
+    for trafienie in trafienia:
+        if trafienie is None:
+            wynik.append(None)
+            continue
+        pos, score = trafienie
+        with metrics.etap("mapowanie_offsetow"):
+            real_start = snap_to_boundary(rozdzial['granice'], map_normalized_to_original(rozdzial['offsets'], pos), snap)
+        wynik.append((real_start, score))
+
+    return wynik
+
+
+def map_normalized_to_original(offsets, norm_pos):
     """
-    ✅ NOWA FUNKCJA: Mapuje pozycję ze znormalizowanego tekstu na oryginalny
+    ✅ Mapuje pozycję ze znormalizowanego tekstu na oryginalny.
+
+    `offsets` pochodzi z normalize_with_offsets - wyliczany raz na rozdział,
+    więc mapowanie to pojedynczy odczyt z tablicy.
     """
-    if norm_pos >= len(normalized_text):
+    if norm_pos is None or not (0 <= norm_pos < len(offsets)):
         return None
     
-    # Znajdź fragment znormalizowanego tekstu wokół pozycji
-    search_window = normalized_text[max(0, norm_pos-10):norm_pos+50]
-    
-    # Znormalizuj oryginalny tekst fragmentami i porównaj
-    best_match_pos = None
-    best_match_score = 0
-    
-    for i in range(len(original_text) - len(search_window)):
-        fragment = original_text[i:i+len(search_window)]
-        fragment_norm = normalize_for_matching(fragment)
-        
-        score = fuzz.ratio(search_window, fragment_norm)
-        
-        if score > best_match_score:
-            best_match_score = score
-            best_match_pos = i
-    
-    return best_match_pos
+    return offsets[norm_pos]
 
 
-def pobierz_frazy_z_mp3(text_file):
+def dlugosc_mp3_ms(sciezka):
     """
-    Skanuje folder temp/mp3 i transkrybuje pliki przez Whisper
+    Długość pliku MP3 w ms - z nagłówków ramek (Xing/VBRI/CBR), bez
+    dekodowania. Pełne dekodowanie przez pydub tylko gdy nagłówki zawiodą.
+    """
+    with metrics.etap("dlugosc_mp3"):
+        dlugosc = mp3_info.duration_ms(sciezka)
+        if dlugosc is None:
+            metrics.licz("bajty_dekodowane", os.path.getsize(sciezka))
+            dlugosc = len(AudioSegment.from_mp3(sciezka))
+    return dlugosc
+
+
+# Jeden model Whisper na proces, a jego dekoder (hooki kv-cache) nie jest
+# bezpieczny dla wątków - w trybie strumieniowym z kotwicami korzysta z niego
+# i wątek transkrypcji, i ponowienia pełnej transkrypcji w dopasowaniu.
+# Ładowanie i transcribe modelu w tym procesie tylko pod tą blokadą.
+_blokada_modelu = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def wczytaj_model(model_name="base"):
+    """
+    Model Whisper ładowany raz na proces - kolejne rozdziały (np. w trybie
+    wsadowym) korzystają z tego samego modelu.
     """
     import whisper
-    
-    base_dir = os.path.dirname(text_file)
-    mp3_folder = os.path.join(base_dir, "mp3")
+    metrics.info(f"🎤 Ładuję model Whisper...")
+    with metrics.etap("ladowanie_modelu"):
+        return whisper.load_model(model_name)
+
+
+def pobierz_frazy_z_mp3(text_file, model_name="base", language="pl", decode_options=None, uzyj_cache=True,
+                        workers=1, torch_threads=None, mp3_folder=None, vad=None, kotwica=None):
+    """
+    Skanuje folder temp/mp3 i transkrybuje pliki przez Whisper
+
+    Wyniki trafiają do trwałego cache (funkcje.transcription_cache) -
+    niezmienione pliki nie są transkrybowane ponownie, a model Whisper
+    ładowany jest dopiero przy pierwszym pliku spoza cache. Gdy działa
+    usługa transkrypcji (funkcje.transcription_daemon), pliki trafiają do
+    niej i model nie jest ładowany wcale.
+
+    Args:
+        text_file (str): Plik rozdziału - folder mp3 szukany obok niego
+        model_name (str): Nazwa modelu Whisper
+        language (str): Język transkrypcji
+        decode_options (dict): Dodatkowe opcje dla model.transcribe
+        uzyj_cache (bool): Czy korzystać z cache transkrypcji
+        workers (int): Liczba procesów transkrypcji (>1 = pula procesów,
+                       każdy z własnym modelem Whisper)
+        torch_threads (int): Wątki torch na proces (domyślnie rdzenie / workers)
+        mp3_folder (str): Folder z plikami MP3 (domyślnie "mp3" obok text_file)
+        vad (bool|dict): Wycięcie ciszy przed transkrypcją (funkcje.vad) -
+                         czasy segmentów zostają względem oryginalnych plików
+        kotwica (int|dict): Transkrybuj tylko pierwsze N sekund (i ew. ostatnie)
+                            każdego pliku (funkcje.anchor_transcription);
+                            frazy dostają wtedy 'kotwica' i 'sciezka'
+    """
+    return list(iter_frazy_z_mp3(text_file, model_name, language, decode_options, uzyj_cache,
+                                 workers, torch_threads, mp3_folder, vad, kotwica))
+
+
+def iter_frazy_z_mp3(text_file, model_name="base", language="pl", decode_options=None, uzyj_cache=True,
+                     workers=1, torch_threads=None, mp3_folder=None, vad=None, kotwica=None):
+    """
+    Jak pobierz_frazy_z_mp3, ale zwraca frazy po kolei (w kolejności plików),
+    gdy tylko są gotowe - wpisy z cache od razu, pozostałe zaraz po
+    transkrypcji (także z puli procesów).
+
+    Yields:
+        dict: {'plik', 'numer', 'transkrypcja', 'segments', 'start_ms', 'end_ms'}
+              - 'numer' to numer pliku (od 1), także gdy wcześniejsze pliki
+              pominięto (pusta transkrypcja), a 'pominiete_ms' (jeśli są)
+              - łączny czas pominiętych plików tuż przed nim
+    """
+    if mp3_folder is None:
+        mp3_folder = os.path.join(os.path.dirname(text_file), "mp3")
+    decode_options = decode_options or {}
     
     if not os.path.exists(mp3_folder):
         print(f"❌ Folder z plikami MP3 nie istnieje: {mp3_folder}")
-        return []
+        return
     
-    frazy = []
     pliki_mp3 = sorted([f for f in os.listdir(mp3_folder) if f.endswith('.mp3')])
     
-    print(f"📂 Znaleziono {len(pliki_mp3)} plików MP3")
-    print(f"🎤 Ładuję model Whisper...")
+    metrics.info(f"📂 Znaleziono {len(pliki_mp3)} plików MP3")
     
-    model = whisper.load_model("base")
+    model = None
+    z_cache = 0
+    zwrocone = 0
+    pominiete_ms = 0
+    klucze = {}
+    gotowe = {}
+    bledy = {}
     
-    for idx, plik in enumerate(pliki_mp3):
-        sciezka = os.path.join(mp3_folder, plik)
-        
-        try:
-            print(f"🎵 [{idx+1}/{len(pliki_mp3)}] Transkrybuję: {plik}")
-            
-            result = model.transcribe(sciezka, language="pl")
-            transkrypcja = result["text"].strip()
-            
-            if not transkrypcja:
-                print(f"   ⚠️  Pusta transkrypcja - POMIJAM")
+    if uzyj_cache:
+        for plik in pliki_mp3:
+            sciezka = os.path.join(mp3_folder, plik)
+            try:
+                klucze[plik] = transcription_cache.cache_key(
+                    sciezka, model_name, language, anchor_transcription.opcje_klucza(decode_options, vad, kotwica)
+                )
+            except OSError as e:
+                bledy[plik] = str(e)
                 continue
+            wynik = transcription_cache.load(klucze[plik])
+            if wynik is not None:
+                gotowe[plik] = wynik
+                z_cache += 1
+    
+    # ✅ Pula procesów dla plików spoza cache - wyniki odbierane leniwie,
+    # w kolejności plików, w miarę postępu pętli poniżej
+    brakujace = [p for p in pliki_mp3 if p not in gotowe and p not in bledy]
+    z_puli = None
+    if brakujace and transcription_daemon.dostepny():
+        # Działająca usługa ma model już w pamięci - bez ładowania u siebie
+        metrics.info(f"🎤 Transkrybuję {len(brakujace)} plików w usłudze transkrypcji...")
+        z_puli = transcription_daemon.transcribe(
+            [os.path.join(mp3_folder, p) for p in brakujace], model_name, language, decode_options,
+            vad=vad, kotwica=kotwica
+        )
+    elif workers > 1 and len(brakujace) > 1:
+        metrics.info(f"🎤 Transkrybuję {len(brakujace)} plików w {workers} procesach...")
+        z_puli = transcription_pool.transcribe_parallel(
+            [os.path.join(mp3_folder, p) for p in brakujace],
+            model_name, language, decode_options, workers, torch_threads, vad, kotwica
+        )
+    
+    try:
+        for idx, plik in enumerate(pliki_mp3):
+            sciezka = os.path.join(mp3_folder, plik)
             
-            audio = AudioSegment.from_mp3(sciezka)
-            dlugosc_ms = len(audio)
-            
-            print(f"   ✅ \"{transkrypcja[:60]}...\"")
-            
-            frazy.append({
-                'plik': plik,
-                'transkrypcja': transkrypcja,
-                'start_ms': 0,
-                'end_ms': dlugosc_ms
-            })
-            
+            try:
+                if plik in bledy:
+                    raise RuntimeError(bledy[plik])
+                
+                klucz = klucze.get(plik)
+                wynik = gotowe.get(plik)
+                
+                if wynik is not None:
+                    metrics.szczegoly(f"💾 [{idx+1}/{len(pliki_mp3)}] Z cache: {plik}")
+                elif z_puli is not None:
+                    with metrics.etap("transkrypcja"):
+                        _, wynik, blad = next(z_puli)
+                    if blad:
+                        raise RuntimeError(blad)
+                    metrics.licz("bajty_dekodowane", os.path.getsize(sciezka))
+                    if klucz:
+                        wynik = transcription_cache.save(klucz, wynik)
+                    metrics.szczegoly(f"🎵 [{idx+1}/{len(pliki_mp3)}] Zatranskrybowano: {plik}")
+                else:
+                    metrics.szczegoly(f"🎵 [{idx+1}/{len(pliki_mp3)}] Transkrybuję: {plik}")
+                    with _blokada_modelu, metrics.etap("transkrypcja"):
+                        if model is None:
+                            model = wczytaj_model(model_name)
+                        wynik = anchor_transcription.transkrybuj(model, sciezka, language, decode_options,
+                                                                 vad, kotwica)
+                    metrics.licz("bajty_dekodowane", os.path.getsize(sciezka))
+                    if klucz:
+                        wynik = transcription_cache.save(klucz, wynik)
+                
+                transkrypcja = wynik["text"].strip()
+                
+                dlugosc_ms = dlugosc_mp3_ms(sciezka)
+                
+                if not transkrypcja:
+                    metrics.szczegoly(f"   ⚠️  Pusta transkrypcja - POMIJAM")
+                    pominiete_ms += dlugosc_ms
+                    continue
+                
+                metrics.szczegoly(f"   ✅ \"{transkrypcja[:60]}...\"")
+                
+                zwrocone += 1
+                fraza = {
+                    'plik': plik,
+                    'numer': idx + 1,
+                    'transkrypcja': transkrypcja,
+                    'segments': wynik.get('segments', []),
+                    'start_ms': 0,
+                    'end_ms': dlugosc_ms
+                }
+                if pominiete_ms:
+                    fraza['pominiete_ms'], pominiete_ms = pominiete_ms, 0
+                if wynik.get('kotwica'):
+                    fraza['kotwica'] = wynik['kotwica']
+                    fraza['sciezka'] = os.path.abspath(sciezka)
+                yield fraza
+                
+            except Exception as e:
+                print(f"   ❌ Błąd podczas transkrypcji {plik}: {e}")
+                try:
+                    pominiete_ms += dlugosc_mp3_ms(sciezka)
+                except Exception:
+                    pass
+    finally:
+        if z_puli is not None:
+            z_puli.close()
+    
+    if uzyj_cache:
+        transcription_cache.prune()
+    
+    metrics.licz("transkrypcje_z_cache", z_cache)
+    metrics.info(f"✅ Zatranskrybowano {zwrocone} plików ({z_cache} z cache)")
+
+
+def transkrybuj_plik(sciezka, model_name="base", language="pl", decode_options=None, uzyj_cache=True,
+                     vad=None, kotwica=None):
+    """
+    Transkrypcja jednego pliku: z cache, w usłudze transkrypcji, jeśli
+    działa, a w przeciwnym razie modelem w tym procesie.
+
+    Returns:
+        dict: {'text', 'segments'} (i 'kotwica' w trybie kotwic)
+    """
+    decode_options = decode_options or {}
+    klucz = (transcription_cache.cache_key(sciezka, model_name, language,
+                                           anchor_transcription.opcje_klucza(decode_options, vad, kotwica))
+             if uzyj_cache else None)
+    wynik = transcription_cache.load(klucz) if klucz else None
+    
+    if wynik is not None:
+        metrics.szczegoly(f"💾 Z cache: {os.path.basename(sciezka)}")
+        return wynik
+    
+    metrics.szczegoly(f"🎵 Transkrybuję: {os.path.basename(sciezka)}")
+    if transcription_daemon.dostepny():
+        with metrics.etap("transkrypcja"):
+            _, wynik, blad = next(transcription_daemon.transcribe([sciezka], model_name, language,
+                                                                  decode_options, vad=vad, kotwica=kotwica))
+        if blad:
+            raise RuntimeError(blad)
+    else:
+        with _blokada_modelu, metrics.etap("transkrypcja"):
+            model = wczytaj_model(model_name)
+            wynik = anchor_transcription.transkrybuj(model, sciezka, language, decode_options, vad, kotwica)
+    metrics.licz("bajty_dekodowane", os.path.getsize(sciezka))
+    if klucz:
+        wynik = transcription_cache.save(klucz, wynik)
+    return wynik
+
+
+# Argumenty pobierz_frazy_z_mp3 / iter_frazy_z_mp3, które pelna_transkrypcja
+# musi dostać takie same jak transkrypcja kotwic
+OPCJE_TRANSKRYPCJI = ("model_name", "language", "decode_options", "uzyj_cache", "vad")
+
+
+def pelna_transkrypcja(model_name="base", language="pl", decode_options=None, uzyj_cache=True, vad=None):
+    """
+    Funkcja dla dopasowania w trybie kotwic: fraza z kotwic -> fraza
+    z pełnej transkrypcji tego samego pliku (albo None przy błędzie).
+    """
+    def pelna(item):
+        try:
+            wynik = transkrybuj_plik(item['sciezka'], model_name, language, decode_options, uzyj_cache, vad)
         except Exception as e:
-            print(f"   ❌ Błąd podczas transkrypcji {plik}: {e}")
+            print(f"   ❌ Błąd pełnej transkrypcji {item['plik']}: {e}")
+            return None
+        fraza = {k: v for k, v in item.items() if k not in ('kotwica', 'sciezka')}
+        fraza['transkrypcja'] = wynik['text'].strip()
+        fraza['segments'] = wynik.get('segments', [])
+        return fraza
+    return pelna
+
+
+def frazy_z_dlugiego_mp3(plik_mp3, czasy, model_name="base", language="pl", decode_options=None,
+                         uzyj_cache=True, vad=None):
+    """
+    Frazy z jednego nagrania całego rozdziału: plik transkrybowany jest raz
+    (z cache), a segmenty Whisper przydzielane do fragmentów wg czasów -
+    segment należy do fragmentu, w którym leży jego środek.
+
+    Args:
+        plik_mp3 (str): Nagranie rozdziału
+        czasy (list[tuple]): (start, end) fragmentów w sekundach
+                             (empty_srt.wczytaj_czasy)
+        vad (bool|dict): Wycięcie ciszy przed transkrypcją (funkcje.vad)
+
+    Returns:
+        list: Frazy jak z pobierz_frazy_z_mp3; 'plik' to nazwa pliku fragmentu
+              (<nagranie>_NN.mp3), 'start_ms'/'end_ms' - czasy w nagraniu
+    """
+    metrics.info(f"🎵 Całe nagranie: {os.path.basename(plik_mp3)}")
+    wynik = transkrybuj_plik(plik_mp3, model_name, language, decode_options, uzyj_cache, vad)
+    
+    segmenty = wynik.get('segments', [])
+    baza = os.path.splitext(os.path.basename(plik_mp3))[0]
+    frazy = []
+    pominiete_ms = 0
+    
+    for idx, (start, end) in enumerate(czasy):
+        swoje = [seg for seg in segmenty if start <= (seg['start'] + seg['end']) / 2 < end]
+        transkrypcja = ' '.join(seg['text'].strip() for seg in swoje if seg['text'].strip())
+        plik = f"{baza}_{idx+1:02d}.mp3"
+        
+        if not transkrypcja:
+            metrics.szczegoly(f"   ⚠️  [{idx+1}] Brak mowy w {start:.1f}-{end:.1f}s - POMIJAM")
+            pominiete_ms += int(round((end - start) * 1000))
+            continue
+        
+        fraza = {
+            'plik': plik,
+            'numer': idx + 1,
+            'transkrypcja': transkrypcja,
+            'segments': swoje,
+            'start_ms': int(round(start * 1000)),
+            'end_ms': int(round(end * 1000))
+        }
+        if pominiete_ms:
+            fraza['pominiete_ms'], pominiete_ms = pominiete_ms, 0
+        frazy.append(fraza)
     
-    print(f"✅ Zatranskrybowano {len(frazy)} plików")
+    if uzyj_cache:
+        transcription_cache.prune()
+    
+    metrics.info(f"✅ Podzielono transkrypcję na {len(frazy)} fraz")
     return frazy
 
 
-def wstaw_entery_z_podwojna_weryfikacja(text, frazy, prog=40, text_file=None):
+def wstaw_entery_z_podwojna_weryfikacja(text, frazy, prog=40, text_file=None, book=None, tryb="zachlanny",
+                                        snap="pierwsza", pelna=None, uzyj_tempa=True):
     """
     ✅ PRZEPISANA funkcja - lepsza logika dzielenia
+
+    Args:
+        tryb (str): "zachlanny" - każdy fragment szukany od końca poprzedniego
+                    (z ponowieniem dla 10 pierwszych słów);
+                    "globalny" - wszystkie fragmenty dopasowane naraz
+                    z zachowaniem kolejności (dopasuj_globalnie) - tańszy
+                    i nie gubi się po jednym złym dopasowaniu, ale remisy
+                    rozstrzyga bez pozycji poprzedniego fragmentu
+        snap (str): Dosuwanie dopasowań do granic tekstu: "pierwsza",
+                    "zdanie", "akapit" lub "dialog" (funkcje.boundaries)
+        pelna (callable): Dla fraz z kotwic (tryb zachłanny) - pełna
+                          transkrypcja, gdy kotwica da wynik poniżej `prog`
+                          (pelna_transkrypcja)
+        uzyj_tempa (bool): Przewidywanie pozycji z czasu nagrań
+                           (funkcje.position_prior) - szukanie tylko w paśmie
+                           wokół przewidywanej pozycji; bez czasów
+                           (end_ms) nie ma wpływu
     """
-    fragmenty = []
-    last_search_pos = 0
+    return list(wstaw_entery_strumieniowo(text, frazy, prog, text_file, book, tryb, snap, pelna, uzyj_tempa))
+
+
+def wstaw_entery_strumieniowo(text, frazy, prog=40, text_file=None, book=None, tryb="zachlanny",
+                              snap="pierwsza", pelna=None, uzyj_tempa=True):
+    """
+    Jak wstaw_entery_z_podwojna_weryfikacja, ale `frazy` może być dowolnym
+    iteratorem (np. kolejką z transkrypcji), a fragmenty zwracane są po
+    kolei, gdy tylko zostaną dopasowane. Separatory trafiają do pliku
+    na bieżąco - każdy, przed którym nie może już pojawić się żaden
+    następny (patrz MAKS_COFNIECIE).
+
+    W trybie "globalny" frazy są najpierw zbierane w całości. W trybie
+    zachłannym z `uzyj_tempa` szukanie korzysta z pozycji przewidzianej
+    z czasu nagrań (funkcje.position_prior).
+
+    Yields:
+        dict: Fragment jak w wyniku wstaw_entery_z_podwojna_weryfikacja
+    """
+    if tryb == "globalny":
+        frazy = list(frazy)
     
-    print(f"\n{'='*80}")
-    print(f"🔍 ROZPOCZYNAM WYSZUKIWANIE FRAZ")
-    print(f"📊 Długość tekstu: {len(text)} znaków")
-    print(f"📊 Liczba fragmentów MP3: {len(frazy)}")
-    print(f"{'='*80}\n")
+    metrics.info(f"\n{'='*80}")
+    metrics.info(f"🔍 ROZPOCZYNAM WYSZUKIWANIE FRAZ")
+    metrics.info(f"📊 Długość tekstu: {len(text)} znaków")
+    if hasattr(frazy, '__len__'):
+        metrics.info(f"📊 Liczba fragmentów MP3: {len(frazy)}")
+    metrics.info(f"{'='*80}\n")
     
-    if not frazy:
-        print("⚠️  BRAK FRAZ DO WYSZUKANIA")
-        return fragmenty
+    # ✅ Normalizacja, offsety i indeks n-gramów - raz dla całego rozdziału
+    rozdzial = przygotuj_rozdzial(text, book)
+
+    globalne = None
+    if tryb == "globalny" and frazy:
+        metrics.info("🌐 Dopasowanie globalne wszystkich fragmentów...")
+        globalne = dopasuj_globalnie(rozdzial, frazy, threshold=35, snap=snap)
     
-    pozycje_separatorow = []
+    zapis = None
+    if text_file:
+        zapis = otworz_zapis_separatorow(text, text_file.replace('.txt', '_z_enterami.txt'))
+    
+    last_search_pos = 0
+    wszystkie = 0
+    znalezione = 0
+    ostatni_numer = 0
+    # Tempo lektora -> przewidywana pozycja fragmentu (tylko tryb zachłanny)
+    model_pozycji = position_prior.nowy_model() if globalne is None and uzyj_tempa else None
     
     for idx, item in enumerate(frazy):
-        plik = item['plik']
-        transkrypcja = item['transkrypcja']
+        trafienie = globalne[idx] if globalne is not None else None
+        if model_pozycji is not None:
+            position_prior.przed_fragmentem(model_pozycji, item)
+        fragment = dopasuj_fragment(text, rozdzial, item, idx, last_search_pos, snap,
+                                    globalny=globalne is not None, trafienie=trafienie, prog=prog, pelna=pelna,
+                                    model_pozycji=model_pozycji)
+        if model_pozycji is not None:
+            position_prior.aktualizuj(model_pozycji, item, fragment)
+        wszystkie += 1
         
-        # Pomiń zbyt krótkie transkrypcje
-        if len(transkrypcja.split()) < 3:
-            print(f"⚠️  [{idx+1}] {plik} - za krótka transkrypcja, pomijam")
-            fragmenty.append({
+        if fragment['found']:
+            znalezione += 1
+            last_search_pos = fragment['pos_end']
+            if zapis is not None:
+                # Zachłannie kolejne dopasowania nie cofną się dalej niż MAKS_COFNIECIE
+                bezpieczna = last_search_pos - MAKS_COFNIECIE if globalne is None else None
+                # Numer pliku / linii czasów, nie pozycja na liście fraz -
+                # pominięte pliki (pusta transkrypcja) dostają puste bloki
+                numer = item.get('numer', idx + 1)
+                for brakujacy in range(ostatni_numer + 1, numer):
+                    dodaj_separator(zapis, {'numer': brakujacy, 'pozycja': fragment['pos_start'], 'plik': None})
+                dodaj_separator(zapis, {
+                    'numer': numer,
+                    'pozycja': fragment['pos_start'],
+                    'plik': fragment['plik']
+                }, bezpieczna)
+                ostatni_numer = max(ostatni_numer, numer)
+        
+        yield fragment
+    
+    if wszystkie == 0:
+        metrics.info("⚠️  BRAK FRAZ DO WYSZUKANIA")
+    
+    # Pozostałe separatory i reszta tekstu
+    if zapis is not None and zamknij_zapis_separatorow(zapis):
+        metrics.info(f"\n💾 Zapisano tekst z separatorami: {zapis['path']}")
+    
+    # Podsumowanie
+    metrics.licz("fragmenty_znalezione", znalezione)
+    metrics.licz("fragmenty_nieznalezione", wszystkie - znalezione)
+    
+    if wszystkie > 0:
+        procent = znalezione / wszystkie * 100
+        metrics.info(f"\n{'='*80}")
+        metrics.info(f"📊 PODSUMOWANIE: Znaleziono {znalezione}/{wszystkie} fragmentów ({procent:.1f}%)")
+        metrics.info(f"{'='*80}\n")
+
+
+def szukaj_w_pasmach(text, fraza, last_search_pos, threshold, rozdzial, snap="pierwsza", model_pozycji=None):
+    """
+    find_phrase_with_sliding_window z przewidywaniem pozycji z modelu tempa
+    (funkcje.position_prior): kandydaci z indeksu i pełne przeszukanie tylko
+    w paśmie wokół przewidywanej pozycji, remis wygrywa pozycja bliższa
+    przewidywanej. Wynik z pasma musi mieć co najmniej PROG_PASMA - słabszy
+    (np. przy złym czasie pliku) poszerza pasmo, a po ostatnim paśmie
+    szukanie idzie do końca rozdziału z progiem `threshold`, jak bez modelu.
+    """
+    wynik = (None, None), 0
+    for od, do, srodek in position_prior.pasma(model_pozycji, last_search_pos):
+        prog = threshold if do is None else max(threshold, position_prior.PROG_PASMA)
+        wynik = find_phrase_with_sliding_window(text, fraza, od, threshold=prog, rozdzial=rozdzial,
+                                                snap=snap, end_offset=do, przewidywana=srodek)
+        if wynik[0][0] is not None:
+            if do is not None:
+                metrics.licz("trafienia_w_pasmie")
+            return wynik
+        if do is not None:
+            metrics.licz("chybienia_pasma")
+    return wynik
+
+
+def dopasuj_fragment(text, rozdzial, item, idx, last_search_pos, snap="pierwsza", globalny=False, trafienie=None,
+                     prog=40, pelna=None, model_pozycji=None):
+    """
+    Dopasowuje jedną transkrypcję - krok pętli wstaw_entery_strumieniowo.
+
+    Args:
+        item (dict): Fraza z pobierz_frazy_z_mp3
+        idx (int): Numer frazy (od 0)
+        last_search_pos (int): Koniec poprzedniego znalezionego fragmentu
+        globalny (bool): Czy pozycja pochodzi z dopasuj_globalnie (`trafienie`)
+        trafienie (tuple): (pozycja, wynik) z dopasuj_globalnie albo None
+        prog (int): Próg wyniku kotwicy - poniżej pełna transkrypcja (`pelna`)
+        pelna (callable): Fraza z kotwic -> fraza z pełnej transkrypcji
+        model_pozycji (dict): Model tempa (funkcje.position_prior) - zawęża
+                              szukanie do pasma wokół przewidywanej pozycji
+
+    Returns:
+        dict: Fragment {'found': True, 'plik', 'pos_start', 'pos_end', 'score',
+              'start_ms', 'end_ms'} albo {'found': False, 'plik', 'reason'}
+    """
+    if item.get('kotwica') and pelna is not None and not globalny:
+        fragment = dopasuj_fragment(text, rozdzial, item, idx, last_search_pos, snap, model_pozycji=model_pozycji)
+        if fragment['found'] and fragment['score'] >= prog:
+            metrics.licz("kotwice_trafione")
+            return fragment
+        metrics.szczegoly(f"   🔁 [{idx+1}] Kotwica poniżej progu - pełna transkrypcja")
+        pelny = pelna(item)
+        if pelny is None:
+            return fragment
+        metrics.licz("kotwice_pelna_transkrypcja")
+        return dopasuj_fragment(text, rozdzial, pelny, idx, last_search_pos, snap, model_pozycji=model_pozycji)
+
+    plik = item['plik']
+    transkrypcja = item['transkrypcja']
+    
+    # Pomiń zbyt krótkie transkrypcje
+    if len(transkrypcja.split()) < 3:
+        metrics.szczegoly(f"⚠️  [{idx+1}] {plik} - za krótka transkrypcja, pomijam")
+        return {
+            'found': False,
+            'plik': plik,
+            'reason': 'za_krotka_transkrypcja'
+        }
+    
+    metrics.szczegoly(f"🔍 [{idx+1}] {plik}")
+    metrics.szczegoly(f"   📝 \"{transkrypcja[:80]}...\"")
+    
+    if globalny:
+        if trafienie is None:
+            metrics.szczegoly(f"   ❌ Nie znaleziono (dopasowanie globalne)")
+            return {
                 'found': False,
                 'plik': plik,
-                'reason': 'za_krotka_transkrypcja'
-            })
-            continue
-        
-        print(f"🔍 [{idx+1}/{len(frazy)}] {plik}")
-        print(f"   📝 \"{transkrypcja[:80]}...\"")
-        
+                'reason': 'nie_znaleziono'
+            }
+        pos_start, score = trafienie
+    else:
         # ✅ Szukaj CAŁEJ transkrypcji (nie tylko początku/końca)
-        (pos_start, pos_end), score = find_phrase_with_sliding_window(
-            text, transkrypcja, last_search_pos, threshold=35
+        (pos_start, pos_end), score = szukaj_w_pasmach(
+            text, transkrypcja, last_search_pos, 35, rozdzial, snap, model_pozycji
         )
-        
-        if pos_start is None:
-            print(f"   ❌ Nie znaleziono (score: {score:.1f})")
-            
-            # ✅ Spróbuj z pierwszymi 10 słowami
-            shorter = ' '.join(transkrypcja.split()[:10])
-            print(f"   🔄 Próbuję z początkiem (10 słów)...")
-            (pos_start, pos_end), score = find_phrase_with_sliding_window(
-                text, shorter, last_search_pos, threshold=30
-            )
-            
-            if pos_start is None:
-                print(f"   ❌ Nie znaleziono (score: {score:.1f})")
-                fragmenty.append({
-                    'found': False,
-                    'plik': plik,
-                    'reason': 'nie_znaleziono'
-                })
-                continue
-        
-        # ✅ Znaleziono fragment
-        context = text[max(0, pos_start-30):pos_start+80].replace('\n', '↵')
-        print(f"   ✅ Znaleziono na pozycji {pos_start} (score: {score:.1f})")
-        print(f"      Kontekst: \"{context[:70]}...\"")
-        
-        # ✅ Znajdź koniec fragmentu (następny akapit lub szacowana długość)
-        estimated_length = len(transkrypcja) * 3
-        search_end = min(len(text), pos_start + estimated_length)
-        
-        # Szukaj końca akapitu
-        next_para = text.find('\n\n', pos_start + 50, search_end)
-        if next_para != -1:
-            pos_end = next_para
-        else:
-            pos_end = search_end
-        
-        # Zapisz separator
-        pozycje_separatorow.append({
-            'numer': idx + 1,
-            'pozycja': pos_start,
-            'plik': plik
-        })
-        
-        fragmenty.append({
-            'found': True,
-            'plik': plik,
-            'pos_start': pos_start,
-            'pos_end': pos_end,
-            'score': score,
-            'text': text[pos_start:pos_end],
-            'start_ms': item['start_ms'],
-            'end_ms': item['end_ms']
-        })
-        
-        last_search_pos = pos_end
-        print()
     
-    # Wstaw separatory
-    if pozycje_separatorow and text_file:
-        print(f"\n{'='*80}")
-        print(f"📝 WSTAWIAM SEPARATORY W TEKŚCIE")
-        print(f"{'='*80}\n")
+    if pos_start is None:
+        metrics.szczegoly(f"   ❌ Nie znaleziono (score: {score:.1f})")
         
-        pozycje_separatorow.sort(key=lambda x: x['pozycja'], reverse=True)
-        
-        tekst_z_separatorami = text
-        for sep in pozycje_separatorow:
-            separator = f"\n\n[{sep['numer']:02d}] >>>>>>>>>>>>\n\n"
-            tekst_z_separatorami = (
-                tekst_z_separatorami[:sep['pozycja']] + 
-                separator + 
-                tekst_z_separatorami[sep['pozycja']:]
-            )
-            print(f"✅ Wstawiono separator [{sep['numer']:02d}] na pozycji {sep['pozycja']}")
+        # ✅ Spróbuj z pierwszymi 10 słowami
+        shorter = ' '.join(transkrypcja.split()[:10])
+        metrics.licz("ponowienia_10_slow")
+        metrics.szczegoly(f"   🔄 Próbuję z początkiem (10 słów)...")
+        (pos_start, pos_end), score = szukaj_w_pasmach(
+            text, shorter, last_search_pos, 30, rozdzial, snap, model_pozycji
+        )
         
-        output_text_file = text_file.replace('.txt', '_z_enterami.txt')
-        with open(output_text_file, 'w', encoding='utf-8') as f:
-            f.write(tekst_z_separatorami)
-        print(f"\n💾 Zapisano tekst z separatorami: {output_text_file}")
+        if pos_start is None:
+            metrics.szczegoly(f"   ❌ Nie znaleziono (score: {score:.1f})")
+            return {
+                'found': False,
+                'plik': plik,
+                'reason': 'nie_znaleziono'
+            }
     
-    # Podsumowanie
-    znalezione = sum(1 for f in fragmenty if f.get('found', False))
+    # ✅ Znaleziono fragment
+    context = text[max(0, pos_start-30):pos_start+80].replace('\n', '↵')
+    metrics.szczegoly(f"   ✅ Znaleziono na pozycji {pos_start} (score: {score:.1f})")
+    metrics.szczegoly(f"      Kontekst: \"{context[:70]}...\"")
     
-    if len(fragmenty) > 0:
-        procent = znalezione / len(fragmenty) * 100
-        print(f"\n{'='*80}")
-        print(f"📊 PODSUMOWANIE: Znaleziono {znalezione}/{len(fragmenty)} fragmentów ({procent:.1f}%)")
-        print(f"{'='*80}\n")
+    # ✅ Znajdź koniec fragmentu (następny akapit lub szacowana długość)
+    estimated_length = len(transkrypcja) * 3
+    search_from = pos_start + 50
+    kotwica = item.get('kotwica')
+    if kotwica:
+        # Z kotwicy znamy tylko początek - długość z tempa mowy w kotwicy
+        estimated_length = int(estimated_length * max(1.0, item['end_ms'] / 1000 / kotwica['sekundy']))
+        if kotwica.get('koniec'):
+            (pos_konca, _), score_konca = find_phrase_with_sliding_window(
+                text, kotwica['koniec'], pos_start + 1, threshold=35, rozdzial=rozdzial, snap="pierwsza",
+                end_offset=pos_start + estimated_length
+            )
+            if pos_konca is not None:
+                search_from = pos_konca
+                estimated_length = pos_konca - pos_start + len(kotwica['koniec']) * 3
+    search_end = min(len(text), pos_start + estimated_length)
     
-    return fragmenty
+    # Szukaj końca akapitu
+    next_para = next_paragraph_break(rozdzial['granice'], search_from, search_end)
+    if next_para != -1:
+        pos_end = next_para
+    else:
+        pos_end = search_end
+    
+    metrics.szczegoly()
+    return {
+        'found': True,
+        'plik': plik,
+        'pos_start': pos_start,
+        'pos_end': pos_end,
+        'score': score,
+        'start_ms': item['start_ms'],
+        'end_ms': item['end_ms']
+    }
+
+
+def podziel_strumieniowo(text, text_file, book=None, snap="pierwsza", rozmiar_kolejki=4, prog=40, **opcje):
+    """
+    Transkrypcja i dopasowanie jednocześnie: wątek producenta transkrybuje
+    pliki (iter_frazy_z_mp3) i wkłada frazy do ograniczonej kolejki,
+    a dopasowanie (wstaw_entery_strumieniowo) pobiera je w kolejności
+    plików, gdy tylko się pojawią. Czas całości zbliża się do
+    max(transkrypcja, dopasowanie) zamiast ich sumy.
+
+    Whisper (torch) i pula procesów zwalniają GIL, więc wątek wystarcza.
+
+    Args:
+        rozmiar_kolejki (int): Ile gotowych transkrypcji może czekać na dopasowanie
+        prog (int): Próg kotwic - patrz dopasuj_fragment
+        **opcje: Argumenty dla iter_frazy_z_mp3 (model_name, workers, mp3_folder...)
+
+    Yields:
+        dict: Fragmenty jak wstaw_entery_strumieniowo
+    """
+    kolejka = queue.Queue(maxsize=rozmiar_kolejki)
+    stop = threading.Event()
+    koniec = object()
+
+    def wloz(element):
+        while not stop.is_set():
+            try:
+                kolejka.put(element, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def producent():
+        try:
+            for fraza in iter_frazy_z_mp3(text_file, **opcje):
+                if not wloz(fraza):
+                    return
+        except Exception as e:
+            wloz(e)
+        finally:
+            wloz(koniec)
+
+    def z_kolejki():
+        while True:
+            element = kolejka.get()
+            if element is koniec:
+                return
+            if isinstance(element, Exception):
+                raise element
+            yield element
+
+    watek = threading.Thread(target=producent, name="transkrypcja", daemon=True)
+    watek.start()
+    try:
+        pelna = None
+        if opcje.get('kotwica'):
+            # Te same ustawienia Whisper co transkrypcja kotwic w producencie
+            pelna = pelna_transkrypcja(**{k: opcje[k] for k in OPCJE_TRANSKRYPCJI if k in opcje})
+        yield from wstaw_entery_strumieniowo(text, z_kolejki(), prog, text_file=text_file, book=book, snap=snap,
+                                             pelna=pelna)
+    finally:
+        stop.set()
+        watek.join()
+
+
+# Najdalsze cofnięcie pozycji przy dosuwaniu do granicy tekstu
+# (boundaries.snap_to_boundary) - kolejne zachłanne dopasowanie nie może
+# wypaść wcześniej niż koniec poprzedniego fragmentu minus ta wartość
+MAKS_COFNIECIE = 150
+
+
+def otworz_zapis_separatorow(text, output_text_file):
+    """
+    Stan przyrostowego zapisu tekstu z separatorami. Plik tworzony jest
+    dopiero przy pierwszym zapisanym separatorze.
+    """
+    return {'text': text, 'path': output_text_file, 'f': None, 'poprzednia': 0, 'oczekujace': []}
+
+
+def dodaj_separator(zapis, sep, bezpieczna_pozycja=None):
+    """
+    Dodaje separator {'numer', 'pozycja', 'plik'}. Jeśli podano
+    `bezpieczna_pozycja` (przed nią nie pojawi się już żaden separator),
+    oczekujące separatory przed nią od razu trafiają do pliku. Przy
+    równych pozycjach niższy numer trafia wcześniej - puste bloki
+    pominiętych plików stoją przed blokiem następnego.
+    """
+    heapq.heappush(zapis['oczekujace'], (sep['pozycja'], sep['numer']))
+    if bezpieczna_pozycja is not None:
+        _zapisz_oczekujace(zapis, bezpieczna_pozycja)
+
 
+def _zapisz_oczekujace(zapis, do_pozycji=None):
+    oczekujace = zapis['oczekujace']
+    text = zapis['text']
+    while oczekujace and (do_pozycji is None or oczekujace[0][0] < do_pozycji):
+        pozycja, numer = heapq.heappop(oczekujace)
+        if zapis['f'] is None:
+            metrics.info(f"\n{'='*80}")
+            metrics.info(f"📝 WSTAWIAM SEPARATORY W TEKŚCIE")
+            metrics.info(f"{'='*80}\n")
+            zapis['f'] = open(zapis['path'], 'w', encoding='utf-8')
+        with metrics.etap("zapis_separatorow"):
+            zapis['f'].write(text[zapis['poprzednia']:pozycja])
+            zapis['f'].write(f"\n\n[{numer:02d}] >>>>>>>>>>>>\n\n")
+        zapis['poprzednia'] = pozycja
+        metrics.szczegoly(f"✅ Wstawiono separator [{numer:02d}] na pozycji {pozycja}")
 
-def utworz_fragmenty_mp3(audio, fragmenty, output_folder):
+
+def zamknij_zapis_separatorow(zapis):
     """
-    Kopiuje pliki MP3 zamiast wycinać z jednego dużego
+    Zapisuje pozostałe separatory i resztę tekstu.
+
+    Returns:
+        bool: Czy plik został zapisany (był choć jeden separator)
     """
-    print(f"\n{'='*80}")
-    print(f"✂️  KOPIUJĘ FRAGMENTY MP3")
-    print(f"{'='*80}\n")
+    _zapisz_oczekujace(zapis)
+    if zapis['f'] is None:
+        return False
+    with metrics.etap("zapis_separatorow"):
+        zapis['f'].write(zapis['text'][zapis['poprzednia']:])
+        zapis['f'].close()
+    return True
+
+
+def utworz_fragmenty_mp3(plik_mp3, fragmenty, output_folder, mp3_folder=None, dokladnie=False,
+                         materializacja=None):
+    """
+    Zapisuje pliki MP3 znalezionych fragmentów w output_folder.
+
+    Z `plik_mp3` (jedno nagranie rozdziału) fragmenty są wycinane wg
+    'start_ms'/'end_ms' - bezstratnie, na granicach ramek (funkcje.mp3_split),
+    a z dekodowaniem tylko przy `dokladnie`. Bez `plik_mp3` gotowe pliki
+    z `mp3_folder` (domyślnie "mp3" obok output_folder) są dowiązywane
+    zamiast kopiowania - tryb `materializacja`, patrz funkcje.materialize.
+    """
+    metrics.info(f"\n{'='*80}")
+    metrics.info(f"✂️  {'TNĘ' if plik_mp3 else 'KOPIUJĘ'} FRAGMENTY MP3")
+    metrics.info(f"{'='*80}\n")
+    
+    if plik_mp3:
+        ciecia = [
+            (fragment['start_ms'], fragment['end_ms'], os.path.join(output_folder, fragment['plik']))
+            for fragment in fragmenty if fragment.get('found', False)
+        ]
+        for sciezka, start_ms, end_ms in mp3_split.podziel(plik_mp3, ciecia, dokladnie=dokladnie):
+            metrics.szczegoly(f"✅ Wycięto: {os.path.basename(sciezka)} "
+                              f"({start_ms / 1000:.2f}-{end_ms / 1000:.2f}s)")
+        utworzone = len(ciecia)
+        metrics.info(f"\n{'='*80}")
+        metrics.info(f"📊 Wycięto {utworzone} fragmentów MP3")
+        metrics.info(f"{'='*80}\n")
+        return utworzone
     
     utworzone = 0
     
     for idx, fragment in enumerate(fragmenty):
         if not fragment.get('found', False):
-            print(f"⏭️  [{idx+1}] Pomijam {fragment['plik']} - nie znaleziono w tekście")
+            metrics.szczegoly(f"⏭️  [{idx+1}] Pomijam {fragment['plik']} - nie znaleziono w tekście")
             continue
         
-        base_dir = os.path.dirname(output_folder)
-        mp3_source = os.path.join(base_dir, "mp3", fragment['plik'])
+        zrodla = mp3_folder or os.path.join(os.path.dirname(output_folder), "mp3")
+        mp3_source = os.path.join(zrodla, fragment['plik'])
         
         if not os.path.exists(mp3_source):
             print(f"   ❌ Nie znaleziono pliku źródłowego: {mp3_source}")
@@ -435,23 +1093,25 @@ def utworz_fragmenty_mp3(audio, fragmenty, output_folder):
         
         output_path = os.path.join(output_folder, fragment['plik'])
         
-        import shutil
-        shutil.copy2(mp3_source, output_path)
-        
+        metoda = materialize.materializuj(mp3_source, output_path, materializacja)
+
         utworzone += 1
         dlugosc = (fragment['end_ms'] - fragment['start_ms']) / 1000
-        print(f"✅ [{idx+1}] Skopiowano: {fragment['plik']} ({dlugosc:.1f}s)")
+        metrics.szczegoly(f"✅ [{idx+1}] Skopiowano: {fragment['plik']} ({dlugosc:.1f}s, {metoda})")
     
-    print(f"\n{'='*80}")
-    print(f"📊 Skopiowano {utworzone} fragmentów MP3")
-    print(f"{'='*80}\n")
+    metrics.info(f"\n{'='*80}")
+    metrics.info(f"📊 Skopiowano {utworzone} fragmentów MP3")
+    metrics.info(f"{'='*80}\n")
     
     return utworzone
 
 
-def run():
+def run(book=None):
     """
     Główna funkcja uruchamiająca proces podziału MP3 na fragmenty
+
+    Args:
+        book (str): Książka (nazwa lub ścieżka) - wybiera słownik zamienników
     """
     import os
     
@@ -471,7 +1131,7 @@ def run():
         return
     
     text_file = os.path.join(temp_folder, text_files[0])
-    print(f"📄 Plik tekstowy: {text_file}")
+    metrics.info(f"📄 Plik tekstowy: {text_file}")
     
     # Sprawdź folder z MP3
     mp3_folder = os.path.join(temp_folder, "mp3")
@@ -484,26 +1144,30 @@ def run():
         print(f"❌ Brak plików MP3 w folderze: {mp3_folder}")
         return
     
-    print(f"📁 Folder MP3: {mp3_folder} ({len(pliki_mp3)} plików)")
+    metrics.info(f"📁 Folder MP3: {mp3_folder} ({len(pliki_mp3)} plików)")
     
     output_folder = os.path.join(base_dir, "temp", "fragmenty")
-    print(f"📂 Folder wyjściowy: {output_folder}")
+    metrics.info(f"📂 Folder wyjściowy: {output_folder}")
     
-    print(f"\n{'='*80}")
-    print(f"🚀 ROZPOCZYNAM PRZETWARZANIE")
-    print(f"{'='*80}\n")
+    metrics.reset()
+    metrics.info(f"\n{'='*80}")
+    metrics.info(f"🚀 ROZPOCZYNAM PRZETWARZANIE")
+    metrics.info(f"{'='*80}\n")
     
     try:
         fragmenty = podziel_na_fragmenty_z_enterami(
             plik_mp3=None,
             text_file=text_file,
             output_folder=output_folder,
-            prog=35  # ✅ Obniżony próg dla lepszego dopasowania
+            prog=35,  # ✅ Obniżony próg dla lepszego dopasowania
+            book=book
         )
         
-        print(f"\n{'='*80}")
-        print(f"✅ ZAKOŃCZONO POMYŚLNIE")
-        print(f"{'='*80}\n")
+        metrics.info(f"\n{'='*80}")
+        metrics.info(f"✅ ZAKOŃCZONO POMYŚLNIE")
+        metrics.info(f"{'='*80}\n")
+        metrics.podsumowanie()
+        metrics.eksportuj(os.path.join(temp_folder, "metryki.json"))
         
         return fragmenty
         
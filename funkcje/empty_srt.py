@@ -11,6 +11,8 @@ import os
 import glob
 import re
 
+from funkcje import subtitles
+
 TEMP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "temp"))
 os.makedirs(TEMP_DIR, exist_ok=True)
 
@@ -29,48 +31,53 @@ def seconds_to_srt_time(sec):
     milliseconds = total_ms % 1000
     return f"{hours:02}:{minutes:02}:{seconds:02},{milliseconds:03}"
 
-def txt_to_srt(txt_file, srt_file):
+def wczytaj_czasy(txt_file):
+    """
+    Czyta plik z czasami: z każdej linii dwie pierwsze liczby (start, end)
+    w sekundach. Zwraca listę krotek (start, end).
+    """
     with open(txt_file, "r", encoding="utf-8") as f:
         lines = f.readlines()
 
-    with open(srt_file, "w", encoding="utf-8") as f:
-        idx = 1
-        for raw in lines:
-            line = raw.strip()
-            if not line:
-                continue
-            # spróbuj znaleźć dwie liczby (start, end) w linii
-            tokens = line.split()
-            floats = []
-            float_indices = []
-            for i, t in enumerate(tokens):
-                try:
-                    floats.append(float(t.replace(',', '.')))
-                    float_indices.append(i)
-                except Exception:
-                    pass
-                if len(floats) == 2:
-                    break
-            if len(floats) < 2:
-                # jeśli nie ma dwóch liczb, pomiń (możesz zmienić zachowanie)
-                print(f"⚠️ Pomijam linię (nie znaleziono 2 liczb): {line}")
-                continue
-            start, end = floats
-            # Nie pomijamy etykiet ani opisu — każda linia posiadająca dwie liczby
-            # (start i end) będzie zapisana jako pusty wpis SRT. Tekst po liczbach
-            # jest ignorowany przy tworzeniu napisu.
-            # sanity check: end >= start
-            if end < start:
-                print(f"⚠️ Uwaga: end < start w linii: {line} — przełączam miejscami.")
-                start, end = end, start
-
-            start_time = seconds_to_srt_time(start)
-            end_time = seconds_to_srt_time(end)
-
-            f.write(f"{idx}\n")
-            f.write(f"{start_time} --> {end_time}\n")
-            f.write("\n")
-            idx += 1
+    czasy = []
+    for raw in lines:
+        line = raw.strip()
+        if not line:
+            continue
+        # spróbuj znaleźć dwie liczby (start, end) w linii
+        tokens = line.split()
+        floats = []
+        float_indices = []
+        for i, t in enumerate(tokens):
+            try:
+                floats.append(float(t.replace(',', '.')))
+                float_indices.append(i)
+            except Exception:
+                pass
+            if len(floats) == 2:
+                break
+        if len(floats) < 2:
+            # jeśli nie ma dwóch liczb, pomiń (możesz zmienić zachowanie)
+            print(f"⚠️ Pomijam linię (nie znaleziono 2 liczb): {line}")
+            continue
+        start, end = floats
+        # Nie pomijamy etykiet ani opisu — każda linia posiadająca dwie liczby
+        # (start i end) będzie zapisana jako pusty wpis SRT. Tekst po liczbach
+        # jest ignorowany przy tworzeniu napisu.
+        # sanity check: end >= start
+        if end < start:
+            print(f"⚠️ Uwaga: end < start w linii: {line} — przełączam miejscami.")
+            start, end = end, start
+        czasy.append((start, end))
+    return czasy
+
+
+def txt_to_srt(txt_file, srt_file):
+    napisy = (
+        subtitles.Cue(idx, int(round(start * 1000)), int(round(end * 1000)))
+        for idx, (start, end) in enumerate(wczytaj_czasy(txt_file), start=1)
+    )
+    subtitles.zapisz(napisy, srt_file)
 
 def _choose_txt_file():
     """
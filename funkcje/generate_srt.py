@@ -1,6 +1,9 @@
 import re
 import os
 
+from funkcje import metrics
+from funkcje import subtitles
+
 empty_srt = "/content/El-Raphael/temp/empty.srt"
 txt_file = "/content/El-Raphael/temp/z_enterami.txt"
 output_dir = "/content/El-Raphael/"
@@ -16,41 +19,65 @@ def clean_text_block(text: str) -> str:
     return "\n".join(lines)
 
 
-def run():
-    # Wczytaj pusty plik SRT
-    with open(empty_srt, "r", encoding="utf-8") as f:
-        srt_lines = f.read().strip().split("\n\n")
-
-    # Wczytaj teksty z pliku txt
-    with open(txt_file, "r", encoding="utf-8") as f:
-        txt_content = f.read()
-
-    # Podziel na bloki wg [n] >>>>>>>>
-    blocks = re.split(r"\[\d+\]\s*>{5,}", txt_content)
-    blocks = [b.strip() for b in blocks if b.strip()]
-
-    # Ustal nazwę pliku wynikowego na podstawie pierwszego bloku
-    chapter_match = re.search(r"ROZDZIAŁ\s+([IVXLC0-9]+)", txt_content, re.IGNORECASE)
-    if chapter_match:
-        # Zamień spację na "_" w nazwie pliku
-        chapter_name = "ROZDZIAŁ_" + chapter_match.group(1)
-        output_filename = chapter_name + ".srt"
-    else:
-        output_filename = "output.srt"
-
-    output_path = os.path.join(output_dir, output_filename)
-
-    # Łączenie pustego SRT z tekstami
-    final_srt = []
-    for i, srt_block in enumerate(srt_lines):
-        if i < len(blocks):
-            text = clean_text_block(blocks[i])
+def polacz_srt(empty_srt, txt_file, output_dir, rozszerzenie=".srt"):
+    """
+    Łączy pusty SRT z czasami z tekstem podzielonym separatorami [n] >>>>
+    i zapisuje <ROZDZIAŁ_X>.srt (albo .vtt) w output_dir. Zwraca ścieżkę wyniku.
+
+    Blok tekstu po separatorze [n] trafia do napisu nr n - brakujący
+    separator czy dodatkowa pusta linia nie przesuwają kolejnych napisów.
+    """
+    with metrics.etap("scalanie_srt"):
+        return _polacz_srt(empty_srt, txt_file, output_dir, rozszerzenie)
+
+
+def wczytaj_bloki(txt_file):
+    """
+    Bloki tekstu wg numerów separatorów.
+
+    Returns:
+        tuple: ({numer: tekst}, nazwa rozdziału albo None)
+    """
+    bloki = {}
+    wstep = ""
+    chapter_name = None
+    for numer, tekst in subtitles.iter_bloki_tekstu(txt_file):
+        if chapter_name is None:
+            chapter_match = re.search(r"ROZDZIAŁ\s+([IVXLC0-9]+)", tekst, re.IGNORECASE)
+            if chapter_match:
+                chapter_name = "ROZDZIAŁ_" + chapter_match.group(1)
+        if numer is None:
+            # Tekst przed pierwszym separatorem (np. nagłówek) - do pierwszego bloku
+            wstep = tekst
+        elif numer in bloki:
+            bloki[numer] += "\n" + tekst
         else:
-            text = ""
-        final_srt.append(srt_block.strip() + "\n" + text)
+            bloki[numer] = wstep + "\n" + tekst if wstep.strip() else tekst
+            wstep = ""
+    return bloki, chapter_name
+
+
+def _polacz_srt(empty_srt, txt_file, output_dir, rozszerzenie):
+    bloki, chapter_name = wczytaj_bloki(txt_file)
+
+    # Ustal nazwę pliku wynikowego na podstawie nagłówka rozdziału
+    output_path = os.path.join(output_dir, (chapter_name or "output") + rozszerzenie)
+
+    # Napisy czytane i zapisywane strumieniowo - tekst dobierany po numerze
+    def napisy():
+        for napis in subtitles.iter_napisy(empty_srt):
+            napis.text = clean_text_block(bloki.pop(napis.index, ""))
+            yield napis
 
-    # Zapisz wynik
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write("\n\n".join(final_srt))
+    liczba = subtitles.zapisz(napisy(), output_path)
+    metrics.licz("napisy", liczba)
 
-    print("✅ Zapisano plik:", output_path)
+    if bloki:
+        print(f"⚠️ Bloki tekstu bez napisu o tym numerze: {', '.join(map(str, sorted(bloki)))}")
+
+    metrics.info("✅ Zapisano plik:", output_path)
+    return output_path
+
+
+def run():
+    return polacz_srt(empty_srt, txt_file, output_dir)
@@ -0,0 +1,81 @@
+"""
+Globalne, monotoniczne dopasowanie wszystkich fragmentów naraz.
+
+Każdy fragment ma listę kandydatów (pozycja w tekście, wynik dopasowania).
+Szukamy takiego wyboru - najwyżej jednego kandydata na fragment - żeby
+pozycje rosły zgodnie z kolejnością fragmentów, a suma wyników była
+największa. To ważony najdłuższy podciąg rosnący, liczony programowaniem
+dynamicznym z drzewem Fenwicka (maksimum na prefiksie), czyli w czasie
+O(N log N) dla N kandydatów łącznie - bez względu na jakość dopasowań.
+
+Sumowane są wyniki ponad `podloga`, a nie całe wyniki: inaczej dwa słabe,
+przypadkowe dopasowania (po 40-50) przeważają jedno prawdziwe (90+)
+i wypychają je z rosnącego ciągu. Kandydat nie wyżej niż podłoga nie
+jest brany pod uwagę - pominięcie fragmentu kosztuje tyle, co on.
+"""
+
+from bisect import bisect_left
+
+
+def _fenwick_query(tree, i):
+    """Maksimum (wartość, id) na prefiksie [1..i]."""
+    best = (0.0, -1)
+    while i > 0:
+        if tree[i][0] > best[0]:
+            best = tree[i]
+        i -= i & -i
+    return best
+
+
+def _fenwick_update(tree, i, value):
+    while i < len(tree):
+        if value[0] > tree[i][0]:
+            tree[i] = value
+        i += i & -i
+
+
+def monotonic_alignment(candidates, min_gap=1, podloga=0.0):
+    """
+    Wybiera kandydatów tak, by pozycje były ściśle rosnące.
+
+    Args:
+        candidates (list[list[tuple]]): Dla każdego fragmentu lista
+            (pozycja, wynik); pusta lista = fragment bez kandydatów
+        min_gap (int): Minimalny odstęp między kolejnymi pozycjami
+        podloga (float): Do sumy wchodzi tylko wynik ponad podłogę
+
+    Returns:
+        list: Dla każdego fragmentu (pozycja, wynik) albo None (pominięty)
+    """
+    positions = sorted({pos for cands in candidates for pos, _ in cands})
+    tree = [(0.0, -1)] * (len(positions) + 1)
+
+    # Stan: (indeks fragmentu, pozycja, wynik, poprzedni stan)
+    states = []
+    best_end = (0.0, -1)
+
+    for frag_idx, cands in enumerate(candidates):
+        updates = []
+        for pos, score in cands:
+            if score <= podloga:
+                continue
+            # Poprzednik musi leżeć co najmniej min_gap znaków wcześniej
+            rank = bisect_left(positions, pos - min_gap + 1)
+            prev_value, prev_id = _fenwick_query(tree, rank)
+            total = prev_value + score - podloga
+            states.append((frag_idx, pos, score, prev_id))
+            updates.append((bisect_left(positions, pos) + 1, (total, len(states) - 1)))
+            if total > best_end[0]:
+                best_end = (total, len(states) - 1)
+        # Aktualizacja dopiero po całym fragmencie - jeden kandydat na fragment
+        for rank, value in updates:
+            _fenwick_update(tree, rank, value)
+
+    wynik = [None] * len(candidates)
+    state_id = best_end[1]
+    while state_id != -1:
+        frag_idx, pos, score, prev_id = states[state_id]
+        wynik[frag_idx] = (pos, score)
+        state_id = prev_id
+
+    return wynik
@@ -0,0 +1,120 @@
+"""
+Umieszczanie plików w folderach roboczych bez kopiowania danych.
+
+Fragmenty MP3 w temp/fragmenty i wgrane pliki w temp/mp3 to te same bajty
+co źródło - zamiast kopii tworzony jest kolejny wpis katalogu:
+
+ - "link"    - twarde dowiązanie (os.link): ten sam i-węzeł, zero I/O,
+               przeżywa usunięcie źródła; wymaga tego samego systemu plików
+ - "reflink" - klon copy-on-write (ioctl FICLONE: btrfs, XFS, ...): osobny
+               plik, ale bloki danych współdzielone do pierwszej zmiany
+ - "symlink" - dowiązanie symboliczne; tylko na życzenie, bo psuje się po
+               usunięciu źródła (np. delete_temp_folder)
+ - "kopia"   - zwykła kopia (shutil.copy2)
+
+Tryb "auto" (domyślny, ELRAPHAEL_MATERIALIZACJA) próbuje kolejno link,
+reflink i kopię - pierwsza udana metoda wygrywa, więc na innym systemie
+plików (np. /tmp -> /content w Colab) wynik jest taki sam jak dotąd.
+Wybrana metoda, gdy zawiedzie, też kończy się kopią.
+"""
+
+import os
+import shutil
+
+from funkcje import metrics
+
+TRYBY = ("auto", "link", "reflink", "symlink", "kopia")
+TRYB = os.environ.get("ELRAPHAEL_MATERIALIZACJA", "auto")
+
+FICLONE = 0x40049409
+CHUNK_SIZE = 1024 * 1024
+
+
+def _reflink(src, dest):
+    import fcntl
+
+    with open(src, "rb") as s, open(dest, "wb") as d:
+        try:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        except OSError:
+            d.close()
+            os.remove(dest)
+            raise
+    shutil.copystat(src, dest)
+
+
+def _kopia(src, dest):
+    shutil.copy2(src, dest)
+    metrics.licz("bajty_skopiowane", os.path.getsize(dest))
+
+
+_METODY = {
+    "link": os.link,
+    "reflink": _reflink,
+    "symlink": lambda src, dest: os.symlink(os.path.abspath(src), dest),
+    "kopia": _kopia,
+}
+
+
+def materializuj(src, dest, tryb=None):
+    """
+    Umieszcza zawartość `src` pod ścieżką `dest` (istniejący `dest` jest
+    zastępowany).
+
+    Args:
+        tryb (str): Jeden z TRYBY; None - TRYB z konfiguracji
+
+    Returns:
+        str: Użyta metoda ("link", "reflink", "symlink", "kopia";
+             "bez_zmian", gdy src i dest to ta sama ścieżka)
+    """
+    tryb = tryb or TRYB
+    if tryb not in TRYBY:
+        raise ValueError(f"Nieznany tryb materializacji: {tryb} (dostępne: {', '.join(TRYBY)})")
+    if tryb == "auto":
+        metody = ("link", "reflink", "kopia")
+    else:
+        metody = tuple(dict.fromkeys((tryb, "kopia")))
+
+    if os.path.abspath(src) == os.path.abspath(dest):
+        # Usunięcie dest skasowałoby źródło
+        return "bez_zmian"
+    if os.path.lexists(dest):
+        os.remove(dest)
+    for metoda in metody:
+        try:
+            _METODY[metoda](src, dest)
+        except (OSError, ImportError):
+            # Inny system plików / brak obsługi - następna metoda
+            if metoda == metody[-1]:
+                raise
+            continue
+        metrics.licz("pliki_" + metoda)
+        return metoda
+
+
+def przenies(src, dest):
+    """
+    Przenosi plik: zmiana nazwy w obrębie systemu plików, a między systemami
+    plików - kopia (materializuj) i usunięcie źródła.
+    """
+    if os.path.lexists(dest):
+        os.remove(dest)
+    try:
+        os.replace(src, dest)
+        metrics.licz("pliki_przeniesione")
+        return "przeniesienie"
+    except OSError:
+        metoda = materializuj(src, dest)
+        os.remove(src)
+        return metoda
+
+
+def zapisz_bajty(data, dest, chunk_size=CHUNK_SIZE):
+    """Zapisuje bufor kawałkami (memoryview - bez kopii kolejnych wycinków)."""
+    widok = memoryview(data)
+    with open(dest, "wb") as f:
+        for i in range(0, len(widok), chunk_size):
+            f.write(widok[i:i + chunk_size])
+    metrics.licz("bajty_zapisane", len(widok))
+    return dest
@@ -0,0 +1,111 @@
+"""
+Pomiary przebiegu: czasy etapów, liczniki i poziom szczegółowości wypisywania.
+
+Czasy etapów (zegar ścienny i CPU procesu) zbierane są menedżerem
+kontekstu `etap(nazwa)`, liczniki - `licz(nazwa, n)`. Wszystko trafia do
+jednego słownika na uruchomienie, który `eksportuj()` zapisuje jako JSON.
+
+Czas CPU to czas bieżącego procesu - praca procesów puli transkrypcji
+(transcription_pool) widoczna jest tylko w czasie ściennym. Pomiary
+mogą przychodzić z kilku wątków (tryb strumieniowy: wątek transkrypcji
+i dopasowanie), więc zmiany słownika idą pod blokadą.
+
+Poziomy szczegółowości (ELRAPHAEL_VERBOSITY albo ustaw_poziom):
+ - 0 - tylko błędy
+ - 1 - nagłówki i podsumowania etapów
+ - 2 - także komunikaty dla każdego fragmentu / separatora (domyślnie)
+"""
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+CICHY, PODSUMOWANIA, SZCZEGOLY = 0, 1, 2
+
+POZIOM = int(os.environ.get("ELRAPHAEL_VERBOSITY", SZCZEGOLY))
+
+_pomiary = {"etapy": {}, "liczniki": {}, "start": time.time()}
+_blokada = threading.Lock()
+
+
+def ustaw_poziom(poziom):
+    global POZIOM
+    POZIOM = int(poziom)
+
+
+def info(*args):
+    """Komunikat o etapie (poziom >= 1)."""
+    if POZIOM >= PODSUMOWANIA:
+        print(*args)
+
+
+def szczegoly(*args):
+    """Komunikat z wnętrza pętli - per fragment / separator (poziom >= 2)."""
+    if POZIOM >= SZCZEGOLY:
+        print(*args)
+
+
+def licz(nazwa, n=1):
+    """Zwiększa licznik `nazwa` o n."""
+    with _blokada:
+        liczniki = _pomiary["liczniki"]
+        liczniki[nazwa] = liczniki.get(nazwa, 0) + n
+
+
+@contextmanager
+def etap(nazwa):
+    """Mierzy czas ścienny i CPU bloku; wywołania sumują się per nazwa."""
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        with _blokada:
+            wpis = _pomiary["etapy"].setdefault(nazwa, {"wywolania": 0, "wall_s": 0.0, "cpu_s": 0.0})
+            wpis["wywolania"] += 1
+            wpis["wall_s"] += wall
+            wpis["cpu_s"] += cpu
+
+
+def wyniki():
+    """Kopia bieżących pomiarów (czasy zaokrąglone do ms)."""
+    with _blokada:
+        return {
+            "start": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(_pomiary["start"])),
+            "czas_calkowity_s": round(time.time() - _pomiary["start"], 3),
+            "etapy": {
+                nazwa: {"wywolania": w["wywolania"], "wall_s": round(w["wall_s"], 3), "cpu_s": round(w["cpu_s"], 3)}
+                for nazwa, w in _pomiary["etapy"].items()
+            },
+            "liczniki": dict(_pomiary["liczniki"]),
+        }
+
+
+def reset():
+    """Zaczyna nowe uruchomienie - zeruje czasy i liczniki."""
+    with _blokada:
+        _pomiary["etapy"].clear()
+        _pomiary["liczniki"].clear()
+        _pomiary["start"] = time.time()
+
+
+def eksportuj(path):
+    """Zapisuje pomiary uruchomienia do pliku JSON i zwraca je."""
+    dane = wyniki()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(dane, f, ensure_ascii=False, indent=2)
+    info(f"📈 Zapisano pomiary: {path}")
+    return dane
+
+
+def podsumowanie():
+    """Wypisuje tabelę czasów etapów i liczniki (poziom >= 1)."""
+    dane = wyniki()
+    info(f"\n📈 POMIARY ({dane['czas_calkowity_s']:.1f}s)")
+    for nazwa, w in sorted(dane["etapy"].items(), key=lambda x: -x[1]["wall_s"]):
+        info(f"   {nazwa:<20} {w['wall_s']:>9.3f}s wall {w['cpu_s']:>9.3f}s CPU  x{w['wywolania']}")
+    for nazwa, n in sorted(dane["liczniki"].items()):
+        info(f"   {nazwa:<20} {n}")
@@ -0,0 +1,205 @@
+"""
+Odczyt parametrów MP3 z nagłówków ramek - bez dekodowania audio.
+
+Długość liczona jest z tagu Xing/Info albo VBRI (pliki VBR), a dla plików
+CBR z rozmiaru danych i bitrate. Tagi ID3v2 (początek) i ID3v1 (koniec)
+są pomijane. Jeśli nic z tego się nie uda, wywołujący powinien wrócić
+do pełnego dekodowania (pydub).
+"""
+
+import os
+import struct
+
+# Bitrate [kbps] wg (wersja MPEG 1 / 2 i 2.5, warstwa)
+_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],   # MPEG 1
+    2: [22050, 24000, 16000],   # MPEG 2
+    0: [11025, 12000, 8000],    # MPEG 2.5
+}
+
+
+def parse_frame_header(data):
+    """
+    Parsuje 4-bajtowy nagłówek ramki MPEG audio.
+
+    Returns:
+        dict: {'version', 'layer', 'bitrate', 'sample_rate', 'padding',
+               'channels', 'length', 'samples'} albo None (to nie ramka)
+    """
+    if len(data) < 4:
+        return None
+    b0, b1, b2, b3 = data[0], data[1], data[2], data[3]
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+
+    version_bits = (b1 >> 3) & 0x03
+    layer_bits = (b1 >> 1) & 0x03
+    bitrate_idx = (b2 >> 4) & 0x0F
+    sr_idx = (b2 >> 2) & 0x03
+    if version_bits == 1 or layer_bits == 0 or bitrate_idx in (0, 15) or sr_idx == 3:
+        return None
+
+    layer = 4 - layer_bits
+    mpeg1 = version_bits == 3
+    bitrate = _BITRATES[(1 if mpeg1 else 2, layer)][bitrate_idx] * 1000
+    sample_rate = _SAMPLE_RATES[version_bits][sr_idx]
+    padding = (b2 >> 1) & 0x01
+    channels = 1 if ((b3 >> 6) & 0x03) == 3 else 2
+
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 2 or mpeg1:
+        samples = 1152
+        length = 144 * bitrate // sample_rate + padding
+    else:
+        samples = 576
+        length = 72 * bitrate // sample_rate + padding
+
+    return {
+        'version': {3: 1, 2: 2, 0: 2.5}[version_bits],
+        'layer': layer,
+        'bitrate': bitrate,
+        'sample_rate': sample_rate,
+        'padding': padding,
+        'channels': channels,
+        'length': length,
+        'samples': samples,
+    }
+
+
+def id3v2_size(f):
+    """Rozmiar tagu ID3v2 na początku pliku (0 jeśli brak)."""
+    f.seek(0)
+    head = f.read(10)
+    if len(head) < 10 or head[:3] != b"ID3":
+        return 0
+    size = ((head[6] & 0x7F) << 21) | ((head[7] & 0x7F) << 14) | ((head[8] & 0x7F) << 7) | (head[9] & 0x7F)
+    footer = 10 if head[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def find_first_frame(f, start, limit=64 * 1024):
+    """
+    Szuka pierwszej prawdziwej ramki od pozycji `start` - nagłówek musi
+    się potwierdzić kolejną ramką zaraz za nim.
+
+    Returns:
+        tuple: (offset, nagłówek) albo (None, None)
+    """
+    f.seek(start)
+    buf = f.read(limit)
+    i = buf.find(b"\xFF")
+    while i != -1 and i + 4 <= len(buf):
+        header = parse_frame_header(buf[i:i + 4])
+        if header:
+            nxt = i + header['length']
+            if nxt + 4 > len(buf) or parse_frame_header(buf[nxt:nxt + 4]):
+                return start + i, header
+        i = buf.find(b"\xFF", i + 1)
+    return None, None
+
+
+def is_info_frame(frame, header):
+    """Czy ramka to nagłówek Xing/Info/VBRI (bez dźwięku, tylko metadane)."""
+    if header['version'] == 1:
+        side_info = 17 if header['channels'] == 1 else 32
+    else:
+        side_info = 9 if header['channels'] == 1 else 17
+    pos = 4 + side_info
+    return frame[pos:pos + 4] in (b"Xing", b"Info") or frame[36:40] == b"VBRI"
+
+
+def _vbr_frames(frame, header):
+    """Liczba ramek z tagu Xing/Info lub VBRI w pierwszej ramce (albo None)."""
+    if header['version'] == 1:
+        side_info = 17 if header['channels'] == 1 else 32
+    else:
+        side_info = 9 if header['channels'] == 1 else 17
+
+    pos = 4 + side_info
+    tag = frame[pos:pos + 4]
+    if tag in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", frame[pos + 4:pos + 8])[0]
+        if flags & 0x01:
+            return struct.unpack(">I", frame[pos + 8:pos + 12])[0]
+
+    if frame[36:40] == b"VBRI":
+        return struct.unpack(">I", frame[36 + 14:36 + 18])[0]
+
+    return None
+
+
+def iter_frames(path):
+    """
+    Iteruje po ramkach pliku, czytając tylko nagłówki.
+
+    Yields:
+        tuple: (offset, nagłówek ramki)
+    """
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        offset, header = find_first_frame(f, id3v2_size(f))
+        while header and offset + header['length'] <= file_size:
+            yield offset, header
+            offset += header['length']
+            f.seek(offset)
+            header = parse_frame_header(f.read(4))
+
+
+def duration_ms(path, cbr_probe_frames=20):
+    """
+    Długość pliku MP3 w milisekundach - z nagłówków, bez dekodowania.
+
+    Kolejność: tag Xing/Info/VBRI -> CBR (rozmiar danych / bitrate, jeśli
+    pierwsze ramki mają ten sam bitrate) -> zliczenie wszystkich ramek.
+
+    Returns:
+        int: Długość w ms albo None, jeśli plik nie wygląda na MP3
+    """
+    try:
+        file_size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            audio_start, header = find_first_frame(f, id3v2_size(f))
+            if header is None:
+                return None
+
+            f.seek(audio_start)
+            frame = f.read(header['length'])
+            frames = _vbr_frames(frame, header)
+            if frames:
+                return int(round(frames * header['samples'] * 1000 / header['sample_rate']))
+
+            audio_end = file_size
+            f.seek(max(0, file_size - 128))
+            if f.read(3) == b"TAG":
+                audio_end -= 128
+
+            # CBR: wszystkie ramki próbne mają ten sam bitrate
+            offset = audio_start
+            bitrates = set()
+            for _ in range(cbr_probe_frames):
+                f.seek(offset)
+                h = parse_frame_header(f.read(4))
+                if h is None:
+                    break
+                bitrates.add(h['bitrate'])
+                offset += h['length']
+            if len(bitrates) == 1:
+                return int(round((audio_end - audio_start) * 8 * 1000 / header['bitrate']))
+    except OSError:
+        return None
+
+    # VBR bez tagu - policz wszystkie ramki
+    total_ms = 0.0
+    for _, h in iter_frames(path):
+        total_ms += h['samples'] * 1000 / h['sample_rate']
+    return int(round(total_ms)) if total_ms else None
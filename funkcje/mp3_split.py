@@ -0,0 +1,167 @@
+"""
+Bezstratne cięcie długiego pliku MP3 na granicach ramek.
+
+Plik indeksowany jest raz (mp3_info.iter_frames - tylko nagłówki ramek),
+a każdy fragment to skopiowany bajt w bajt ciąg ramek od ramki
+najbliższej czasowi startu do ramki najbliższej czasowi końca - bez
+dekodowania i ponownego kodowania. Dokładność: jedna ramka (~26 ms dla
+MPEG 1 Layer III przy 44,1 kHz).
+
+Uwaga: ramki Layer III mogą korzystać z rezerwuaru bitów poprzedniej
+ramki, więc pierwsza ramka wyciętego fragmentu bywa przez dekoder
+odtwarzana jako cisza - przy cięciu w pauzach między zdaniami jest to
+niesłyszalne.
+
+Gdy potrzebna jest dokładność co do próbki (dokladnie=True) albo plik
+nie daje się sparsować, fragment jest dekodowany przez pydub - ale tylko
+jego zakres (ffmpeg -ss), a nie cały plik - i kodowany w całości od nowa.
+Kopiowanie środka ramkami z ponownym kodowaniem tylko ramek brzegowych
+nie daje cięcia co do próbki: każdy osobno zakodowany kawałek MP3 ma
+własne opóźnienie kodera i dopełnienie ramki (przy LAME ok. 1100 próbek
+ciszy na styku), a pierwsza skopiowana ramka odwołuje się do rezerwuaru
+bitów ramki, której w pliku już nie ma. Sklejony plik miałby więc
+przerwy i trzaski właśnie na granicach, o które chodzi w tym trybie.
+"""
+
+import os
+from array import array
+from bisect import bisect_left
+
+from funkcje import mp3_info
+from funkcje import metrics
+
+
+def indeks_ramek(path):
+    """
+    Offsety bajtowe i czasy startu wszystkich ramek z dźwiękiem.
+
+    Returns:
+        dict: {'offsety': array('q'), 'czasy_ms': array('d'), 'koniec': offset
+               za ostatnią ramką, 'dlugosc_ms'} albo None, jeśli to nie MP3
+    """
+    offsety = array("q")
+    czasy_ms = array("d")
+    czas = 0.0
+    koniec = None
+    pierwsza = True
+
+    with metrics.etap("indeks_ramek"):
+        with open(path, "rb") as f:
+            for offset, header in mp3_info.iter_frames(path):
+                if pierwsza:
+                    pierwsza = False
+                    # Ramka Xing/Info/VBRI nie zawiera dźwięku - pomijamy ją
+                    f.seek(offset)
+                    if mp3_info.is_info_frame(f.read(header['length']), header):
+                        continue
+                offsety.append(offset)
+                czasy_ms.append(czas)
+                czas += header['samples'] * 1000 / header['sample_rate']
+                koniec = offset + header['length']
+
+    if not offsety:
+        return None
+    return {'offsety': offsety, 'czasy_ms': czasy_ms, 'koniec': koniec, 'dlugosc_ms': czas}
+
+
+def _najblizsza_ramka(ramki, czas_ms):
+    """
+    Numer ramki, której początek leży najbliżej `czas_ms`
+    (len(offsety) oznacza koniec pliku).
+    """
+    czasy = ramki['czasy_ms']
+    i = bisect_left(czasy, czas_ms)
+    najlepsza, odleglosc = None, None
+    for k in (i - 1, i):
+        if 0 <= k <= len(czasy):
+            t = czasy[k] if k < len(czasy) else ramki['dlugosc_ms']
+            if odleglosc is None or abs(t - czas_ms) < odleglosc:
+                najlepsza, odleglosc = k, abs(t - czas_ms)
+    return najlepsza
+
+
+def zakres_bajtow(ramki, start_ms, end_ms):
+    """
+    Zakres bajtów [od, do) ramek pokrywających [start_ms, end_ms) oraz
+    rzeczywiste czasy cięcia.
+
+    Returns:
+        tuple: (od, do, start_ms ramki, end_ms ramki)
+    """
+    a = _najblizsza_ramka(ramki, start_ms)
+    b = max(a + 1, _najblizsza_ramka(ramki, end_ms))
+    b = min(b, len(ramki['offsety']))
+    a = min(a, b - 1)
+    offsety, czasy = ramki['offsety'], ramki['czasy_ms']
+    od = offsety[a]
+    do = offsety[b] if b < len(offsety) else ramki['koniec']
+    koniec_ms = czasy[b] if b < len(czasy) else ramki['dlugosc_ms']
+    return od, do, czasy[a], koniec_ms
+
+
+def _kopiuj_bajty(src, od, do, output_path, chunk_size=1024 * 1024):
+    src.seek(od)
+    pozostalo = do - od
+    with open(output_path, "wb") as out:
+        while pozostalo > 0:
+            chunk = src.read(min(chunk_size, pozostalo))
+            if not chunk:
+                break
+            out.write(chunk)
+            pozostalo -= len(chunk)
+    metrics.licz("bajty_skopiowane", do - od)
+
+
+def wytnij_dokladnie(path, start_ms, end_ms, output_path):
+    """
+    Cięcie co do próbki - dekoduje i koduje cały zakres fragmentu (nie
+    da się skleić kopii ramek z zakodowanymi brzegami bez przerw na
+    stykach - patrz opis modułu). Bez dokładności co do próbki podziel()
+    kopiuje ramki bez dekodowania.
+    """
+    from pydub import AudioSegment
+
+    with metrics.etap("ciecie_z_dekodowaniem"):
+        fragment = AudioSegment.from_file(
+            path, format="mp3", start_second=start_ms / 1000, duration=max(end_ms - start_ms, 1) / 1000
+        )
+        fragment.export(output_path, format="mp3")
+    metrics.licz("fragmenty_dekodowane")
+    return output_path
+
+
+def podziel(path, ciecia, dokladnie=False):
+    """
+    Tnie plik MP3 na fragmenty.
+
+    Args:
+        path (str): Długi plik MP3 (np. cały rozdział)
+        ciecia (list[tuple]): (start_ms, end_ms, ścieżka wyjściowa)
+        dokladnie (bool): Cięcie co do próbki (dekodowanie zakresu przez pydub)
+
+    Returns:
+        list[tuple]: (ścieżka, start_ms, end_ms) - rzeczywiste granice cięcia
+    """
+    ramki = None if dokladnie else indeks_ramek(path)
+    if ramki is None and not dokladnie:
+        print(f"⚠️ Nie udało się odczytać ramek MP3 - tnę z dekodowaniem: {os.path.basename(path)}")
+
+    wyniki = []
+    if ramki is None:
+        for start_ms, end_ms, output_path in ciecia:
+            wytnij_dokladnie(path, start_ms, end_ms, output_path)
+            wyniki.append((output_path, start_ms, end_ms))
+        return wyniki
+
+    with metrics.etap("ciecie_bezstratne"):
+        with open(path, "rb") as src:
+            for start_ms, end_ms, output_path in ciecia:
+                od, do, start_ramki, end_ramki = zakres_bajtow(ramki, start_ms, end_ms)
+                _kopiuj_bajty(src, od, do, output_path)
+                wyniki.append((output_path, start_ramki, end_ramki))
+    return wyniki
+
+
+def wytnij(path, start_ms, end_ms, output_path, dokladnie=False):
+    """Wycina jeden fragment - patrz podziel()."""
+    return podziel(path, [(start_ms, end_ms, output_path)], dokladnie)[0]
@@ -0,0 +1,105 @@
+"""
+Indeks odwrócony n-gramów znakowych dla znormalizowanego tekstu rozdziału.
+
+Indeks budowany jest raz na przebieg (dla całego rozdziału) i służy do
+szybkiego wytypowania kilku kandydujących pozycji dla transkrypcji.
+Kosztowne dopasowanie fuzzy liczone jest potem tylko wokół tych pozycji,
+a nie na całym pozostałym tekście.
+"""
+
+from bisect import bisect_left
+from collections import Counter
+
+
+def build_ngram_index(norm_text, n=4):
+    """
+    Buduje indeks: n-gram znakowy -> lista pozycji w znormalizowanym tekście.
+
+    Args:
+        norm_text (str): Tekst po normalize_for_matching
+        n (int): Długość n-gramu
+
+    Returns:
+        dict: {'n', 'text', 'postings', 'word_starts'}
+    """
+    postings = {}
+    for i in range(len(norm_text) - n + 1):
+        gram = norm_text[i:i + n]
+        lista = postings.get(gram)
+        if lista is None:
+            postings[gram] = [i]
+        else:
+            lista.append(i)
+
+    # Początki słów - na nich zaczynamy okna dopasowania kandydatów
+    word_starts = [i for i, c in enumerate(norm_text)
+                   if c != ' ' and (i == 0 or norm_text[i - 1] == ' ')]
+
+    return {
+        'n': n,
+        'text': norm_text,
+        'postings': postings,
+        'word_starts': word_starts,
+    }
+
+
+def find_candidates(index, phrase_norm, start=0, end=None, top_k=5,
+                    bucket=50, max_phrase_chars=400, max_df=None):
+    """
+    Typuje pozycje startowe frazy przez głosowanie n-gramów.
+
+    Każde wystąpienie n-gramu frazy (offset j) na pozycji p tekstu oddaje
+    głos na początek frazy w p - j. Głosy zliczane są w kubełkach po
+    `bucket` znaków; zwracane są środki najlepszych kubełków.
+
+    Args:
+        index (dict): Wynik build_ngram_index
+        phrase_norm (str): Znormalizowana fraza
+        start (int): Najmniejsza dopuszczalna pozycja (w tekście znormalizowanym)
+        end (int): Największa dopuszczalna pozycja (domyślnie koniec tekstu)
+        top_k (int): Maksymalna liczba kandydatów
+        bucket (int): Rozmiar kubełka głosowania w znakach
+        max_phrase_chars (int): Ile początkowych znaków frazy brać pod uwagę
+        max_df (int): Pomijaj n-gramy występujące częściej (zbyt pospolite)
+
+    Returns:
+        list[int]: Pozycje kandydatów, od najlepszego
+    """
+    n = index['n']
+    postings = index['postings']
+    text_len = len(index['text'])
+    if end is None:
+        end = text_len
+    if max_df is None:
+        max_df = max(50, text_len // 200)
+
+    fraza = phrase_norm[:max_phrase_chars]
+    votes = Counter()
+
+    for j in range(len(fraza) - n + 1):
+        lista = postings.get(fraza[j:j + n])
+        if not lista or len(lista) > max_df:
+            continue
+        # Listy pozycji są rosnące - tylko wystąpienia z [start + j, end + j),
+        # więc koszt zależy od zakresu, a nie od długości całego tekstu
+        lo = bisect_left(lista, start + j)
+        hi = bisect_left(lista, end + j, lo)
+        for p in lista[lo:hi]:
+            votes[(p - j) // bucket] += 1
+
+    if not votes:
+        return []
+
+    # Wygładzanie - fraza z błędami rozkłada głosy na sąsiednie kubełki
+    wygladzone = {b: v + votes.get(b - 1, 0) + votes.get(b + 1, 0)
+                  for b, v in votes.items()}
+
+    kandydaci = []
+    for b in sorted(wygladzone, key=lambda k: (-wygladzone[k], k)):
+        if any(abs(b - k) <= 1 for k in kandydaci):
+            continue
+        kandydaci.append(b)
+        if len(kandydaci) >= top_k:
+            break
+
+    return [max(start, b * bucket + bucket // 2) for b in kandydaci]
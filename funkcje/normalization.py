@@ -0,0 +1,166 @@
+"""
+Skompilowany silnik normalizacji tekstu do dopasowywania fraz.
+
+Jedno przejście wyrażenia regularnego robi wszystko naraz: myślniki,
+interpunkcję i wielokrotne spacje zwija do pojedynczej spacji, a typowe
+błędy Whisper podmienia ze słownika (alternatywa najdłuższych kluczy).
+
+Słowniki zamienników są wczytywane per książka z katalogu `slowniki/`:
+ - wspolne.json - formy wspólne dla wszystkich książek
+ - <nazwa-ksiazki>.json - imiona i nazwy własne danej książki
+"""
+
+import os
+import re
+import json
+from array import array
+from functools import lru_cache
+
+SLOWNIKI_DIR = os.path.join(os.path.dirname(__file__), "slowniki")
+DOMYSLNA_KSIAZKA = "w-pustyni-i-w-puszczy"
+
+_SEPARATOR = re.compile(r"\W+")
+
+
+def book_key(book):
+    """
+    Zamienia nazwę książki / ścieżkę do pliku książki na klucz słownika,
+    np. '/content/El-Raphael/w-pustyni-i-w-puszczy.txt' -> 'w-pustyni-i-w-puszczy'.
+    """
+    if not book:
+        return DOMYSLNA_KSIAZKA
+    return os.path.splitext(os.path.basename(book))[0]
+
+
+def replacement_paths(book=None):
+    """Ścieżki słowników zamienników dla książki: wspólny + książki."""
+    paths = [os.path.join(SLOWNIKI_DIR, "wspolne.json")]
+    if book and book.endswith(".json"):
+        paths.append(book)
+    else:
+        paths.append(os.path.join(SLOWNIKI_DIR, book_key(book) + ".json"))
+    return paths
+
+
+def load_replacements(book=None):
+    """
+    Wczytuje zamienniki: wspólne + dla danej książki.
+
+    Args:
+        book (str): Nazwa książki, ścieżka do pliku książki
+                    albo bezpośrednio ścieżka do pliku .json ze słownikiem
+
+    Returns:
+        dict: {błędna forma: poprawna forma}
+    """
+    replacements = {}
+    for path in replacement_paths(book):
+        if not os.path.exists(path):
+            print(f"⚠️ Brak słownika zamienników: {path}")
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            replacements.update(json.load(f))
+
+    return replacements
+
+
+def compile_normalizer(replacements):
+    """
+    Kompiluje słownik zamienników w jeden regex.
+
+    Spacje w kluczach dopasowują dowolny ciąg znaków niebędących literami
+    (tak jak po zwinięciu interpunkcji). Klucz pasuje tylko do całych słów
+    ("chami" nie zmienia "chamis" w "chamiss"). Dłuższe klucze mają
+    pierwszeństwo.
+    Podmiany wykonywane są jednocześnie - wynik jednej podmiany nie jest już
+    ponownie przeszukiwany (w odróżnieniu od kolejnych str.replace).
+
+    Returns:
+        dict: {'pattern', 'replacements'} - silnik dla normalize()
+    """
+    normalized = {}
+    for wrong, correct in replacements.items():
+        key = _SEPARATOR.sub(" ", wrong.lower()).strip()
+        if key:
+            normalized[key] = correct
+
+    alternatives = [
+        r"\W+".join(re.escape(part) for part in key.split(" "))
+        for key in sorted(normalized, key=len, reverse=True)
+    ]
+    if not alternatives:
+        alternatives = [r"(?!)"]
+    # Pojedyncza spacja przed słowem zostaje bez zmian - nie trzeba jej
+    # podmieniać, co oszczędza wywołanie funkcji dla większości separatorów
+    pattern = re.compile(r"(?P<z>(?<!\w)(?:" + "|".join(alternatives) + r")(?!\w))|(?! (?=\w))\W+")
+
+    return {"pattern": pattern, "replacements": normalized}
+
+
+@lru_cache(maxsize=None)
+def get_normalizer(book=None):
+    """Zwraca (i zapamiętuje) skompilowany silnik dla danej książki."""
+    return compile_normalizer(load_replacements(book))
+
+
+def _lower(text):
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        # Rzadkie znaki zmieniające długość przy lower() - zachowaj 1:1
+        lowered = "".join(c.lower()[:1] for c in text)
+    return lowered
+
+
+def normalize(engine, text):
+    """Normalizuje tekst jednym przejściem silnika."""
+    replacements = engine["replacements"]
+
+    def podmien(m):
+        if m.group("z") is not None:
+            return replacements[_SEPARATOR.sub(" ", m.group())]
+        return " "
+
+    return engine["pattern"].sub(podmien, _lower(text)).strip()
+
+
+def normalize_with_offsets(engine, text):
+    """
+    Jak normalize(), ale zwraca też tablicę offsetów: offsets[i] to pozycja
+    w tekście oryginalnym, z której pochodzi i-ty znak wyniku.
+
+    Offsety trzymane są w array('i') - 4 bajty na znak zamiast obiektu int
+    na liście, co dla całej książki oznacza megabajty, a nie dziesiątki MB.
+
+    Returns:
+        tuple: (znormalizowany tekst, array offsetów - niemalejąca)
+    """
+    replacements = engine["replacements"]
+    lowered = _lower(text)
+    czesci = []
+    offsets = array("i")
+    poz = 0
+
+    for m in engine["pattern"].finditer(lowered):
+        start, end = m.span()
+        if start > poz:
+            czesci.append(lowered[poz:start])
+            offsets.extend(range(poz, start))
+        if m.group("z") is not None:
+            correct = replacements[_SEPARATOR.sub(" ", m.group())]
+            czesci.append(correct)
+            offsets.extend(min(start + j, end - 1) for j in range(len(correct)))
+        else:
+            czesci.append(" ")
+            offsets.append(start)
+        poz = end
+
+    if poz < len(lowered):
+        czesci.append(lowered[poz:])
+        offsets.extend(range(poz, len(lowered)))
+
+    norm = "".join(czesci)
+    stripped = norm.strip()
+    if len(stripped) != len(norm):
+        lead = len(norm) - len(norm.lstrip())
+        offsets = offsets[lead:lead + len(stripped)]
+    return stripped, offsets
@@ -0,0 +1,170 @@
+"""
+Przyrostowe wykonywanie etapów - jak make, ale po zawartości plików.
+
+Każdy etap ma wejścia (pliki), parametry i wyjścia. Po wykonaniu etapu
+w manifeście (manifest.json w folderze wyników) zapisywany jest podpis:
+hash zawartości wejść + parametry. Przy kolejnym uruchomieniu etap jest
+pomijany, jeśli podpis się nie zmienił i wszystkie wyjścia istnieją.
+Przed wykonaniem etapu jego stare wyjścia są usuwane, więc "wyjścia
+istnieją" znaczy "zapisał je ten przebieg" - etap, który tym razem nic
+nie zapisze (np. zero dopasowań), nie przejdzie dzięki plikom z
+poprzedniego uruchomienia.
+
+Wyjście jednego etapu jest wejściem następnego, więc np. zmiana `prog`
+uruchamia ponownie dopasowanie, ale nie transkrypcję ani wycinanie
+rozdziału, a jeśli nowe dopasowanie da identyczny tekst - także nie SRT.
+
+Hash pliku liczony jest tylko wtedy, gdy zmienił się jego rozmiar lub
+mtime (jak w book_index) - niezmienione MP3 nie są czytane ponownie.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+
+from funkcje import metrics
+from funkcje.book_index import file_hash
+
+MANIFEST_VERSION = 1
+
+
+def manifest_path(folder):
+    return os.path.join(folder, "manifest.json")
+
+
+def load_manifest(folder):
+    """Wczytuje manifest folderu wyników (pusty, jeśli brak lub inna wersja)."""
+    try:
+        with open(manifest_path(folder), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            manifest["folder"] = folder
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {"version": MANIFEST_VERSION, "folder": folder, "etapy": {}, "pliki": {}}
+
+
+def save_manifest(manifest):
+    """Zapisuje manifest atomowo (plik tymczasowy + os.replace)."""
+    folder = manifest["folder"]
+    os.makedirs(folder, exist_ok=True)
+    dane = {k: v for k, v in manifest.items() if k != "folder"}
+    tmp_path = manifest_path(folder) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(dane, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, manifest_path(folder))
+
+
+def hash_pliku(manifest, path):
+    """
+    Hash zawartości pliku z pamięcią w manifeście - liczony ponownie tylko
+    gdy zmienił się rozmiar lub mtime. Brak pliku -> None.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    klucz = os.path.abspath(path)
+    wpis = manifest["pliki"].get(klucz)
+    if wpis and wpis["size"] == st.st_size and wpis["mtime"] == st.st_mtime:
+        return wpis["sha256"]
+    sha = file_hash(path)
+    manifest["pliki"][klucz] = {"size": st.st_size, "mtime": st.st_mtime, "sha256": sha}
+    return sha
+
+
+def rozwin_wejscia(wejscia):
+    """Folder na wejściu oznacza wszystkie pliki w nim (posortowane)."""
+    pliki = []
+    for path in wejscia:
+        if os.path.isdir(path):
+            pliki.extend(
+                os.path.join(path, nazwa) for nazwa in sorted(os.listdir(path))
+                if os.path.isfile(os.path.join(path, nazwa))
+            )
+        else:
+            pliki.append(path)
+    return pliki
+
+
+def _klucz_wejscia(manifest, path):
+    """Ścieżka wejścia względem folderu wyników (bezwzględna, gdy się nie da)."""
+    try:
+        return os.path.relpath(path, manifest["folder"])
+    except ValueError:
+        # Inny dysk (Windows)
+        return os.path.abspath(path)
+
+
+def podpis(manifest, wejscia, parametry):
+    """
+    Podpis etapu: hashe wejść (po ścieżce względem folderu wyników - pliki
+    o tej samej nazwie w różnych folderach się nie mylą) + parametry.
+    """
+    payload = {
+        "wejscia": {_klucz_wejscia(manifest, p): hash_pliku(manifest, p) for p in rozwin_wejscia(wejscia)},
+        "parametry": parametry,
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def usun_wyjscia(wyjscia):
+    """Usuwa wyjścia poprzedniego wykonania etapu (pliki i foldery)."""
+    for path in wyjscia:
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
+
+
+def etap(manifest, nazwa, funkcja, wejscia=(), parametry=None, wyjscia=(), wymus=False):
+    """
+    Uruchamia `funkcja()` tylko wtedy, gdy etap jest nieaktualny.
+
+    Args:
+        manifest (dict): Wynik load_manifest
+        nazwa (str): Nazwa etapu (klucz w manifeście)
+        funkcja (callable): Wykonanie etapu (bez argumentów)
+        wejscia (list): Pliki/foldery wejściowe
+        parametry (dict): Parametry wpływające na wynik (muszą dać się zapisać w JSON)
+        wyjscia (list): Pliki/foldery, które etap tworzy
+        wymus (bool): Uruchom niezależnie od manifestu
+
+    Returns:
+        bool: True - etap wykonany, False - pominięty (aktualny)
+    """
+    parametry = parametry or {}
+    sygnatura = podpis(manifest, wejscia, parametry)
+    poprzedni = manifest["etapy"].get(nazwa)
+
+    if (not wymus and poprzedni and poprzedni["podpis"] == sygnatura
+            and all(os.path.exists(w) for w in wyjscia)):
+        metrics.info(f"⏭️  Etap '{nazwa}' aktualny - pomijam")
+        metrics.licz("etapy_pominiete")
+        return False
+
+    metrics.info(f"▶️  Etap '{nazwa}'")
+    usun_wyjscia(wyjscia)
+    start = time.time()
+    with metrics.etap("etap_" + nazwa):
+        funkcja()
+
+    # Brak wyjścia po wykonaniu = etap nieudany, nie zapisujemy podpisu
+    if not all(os.path.exists(w) for w in wyjscia):
+        manifest["etapy"].pop(nazwa, None)
+        save_manifest(manifest)
+        return True
+
+    manifest["etapy"][nazwa] = {
+        "podpis": sygnatura,
+        "parametry": parametry,
+        "wyjscia": [os.path.basename(w) for w in wyjscia],
+        "czas": round(time.time() - start, 2),
+        "kiedy": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    save_manifest(manifest)
+    return True
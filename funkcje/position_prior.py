@@ -0,0 +1,116 @@
+"""
+Przewidywanie pozycji fragmentu w rozdziale z czasu nagrania.
+
+Lektor czyta w miarę równym tempem, więc pozycja początku fragmentu
+w tekście to w przybliżeniu: pozycja ostatniego dopasowanego fragmentu
++ tempo (znaki na ms) x czas nagrań od tamtego fragmentu. Tempo
+dopasowywane jest na bieżąco z par kolejnych dopasowanych fragmentów
+(średnia wykładnicza - nadąża za zmianą tempa lektora), a średni błąd
+przewidywań wyznacza szerokość pasma. Czas plików pominiętych przy
+transkrypcji (fraza ma wtedy 'pominiete_ms') też jest doliczany.
+
+Wyszukiwanie frazy (division_mp3.szukaj_w_pasmach) głosuje n-gramami
+i ocenia okna tylko w paśmie wokół przewidywania - koszt zależy od
+szerokości pasma, a nie od tego, ile rozdziału zostało. Okna z tekstem
+całej frazy dostają równe oceny (okno jest kilka razy dłuższe od frazy),
+więc remis wygrywa pozycja bliższa przewidywanej, a nie - jak bez modelu
+- najwcześniejsza. W paśmie zawsze znajdzie się jakieś okno powyżej
+zwykłego progu, więc wynik z pasma przyjmowany jest dopiero od
+PROG_PASMA; słabszy poszerza pasmo, a na końcu zostaje szukanie do
+końca rozdziału.
+"""
+
+# Tempo startowe (znaki tekstu na ms) - ok. 15 znaków/s dla polskiej narracji
+TEMPO_POCZATKOWE = 0.015
+# Waga dotychczasowej historii w średnich wykładniczych
+ZAPOMINANIE = 0.8
+# Najwęższe pasmo (połowa szerokości, znaki) i część przewidywanego przesunięcia
+MIN_PASMO = 1500
+WZGLEDNE_PASMO = 0.25
+# Ile razy poszerzać pasmo (x POSZERZENIE) przed szukaniem bez ograniczeń
+POSZERZENIA = 2
+POSZERZENIE = 3
+# Najniższa ocena dopasowania przyjmowanego z pasma (prawdziwe dopasowania
+# mają zwykle 90+, przypadkowe okna w paśmie 40-60)
+PROG_PASMA = 70
+# Odcinek z tempem dalej niż tyle razy od bieżącego (np. zły czas pliku)
+# nie zmienia tempa ani błędu - dopasowanie tylko przestawia punkt odniesienia
+ODSTAJACE_TEMPO = 2.0
+
+
+def nowy_model(tempo=TEMPO_POCZATKOWE):
+    """Stan modelu tempa dla jednego rozdziału."""
+    return {
+        'tempo': tempo,
+        'suma_znakow': 0.0,
+        'suma_ms': 0.0,
+        'blad': None,           # średni bezwzględny błąd przewidywania (znaki)
+        'czas_ms': 0.0,         # łączny czas fragmentów przed bieżącym
+        'ostatni': None,        # (czas_ms, pozycja) ostatniego dopasowania
+    }
+
+
+def dlugosc_ms(item):
+    return max(0, item.get('end_ms', 0) - item.get('start_ms', 0))
+
+
+def przewiduj(model):
+    """
+    Przewidywana pozycja początku bieżącego fragmentu i połowa szerokości
+    pasma albo None (brak punktu odniesienia).
+    """
+    if model['ostatni'] is None:
+        return None
+    czas, pozycja = model['ostatni']
+    if model['czas_ms'] <= czas:
+        # Fragmenty bez czasów (end_ms) - nie ma z czego przewidywać
+        return None
+    przesuniecie = model['tempo'] * (model['czas_ms'] - czas)
+    pasmo = max(MIN_PASMO, WZGLEDNE_PASMO * przesuniecie, 3 * (model['blad'] or 0))
+    return pozycja + przesuniecie, pasmo
+
+
+def pasma(model, od_pozycji):
+    """
+    Kolejne zakresy szukania dla bieżącego fragmentu: (od, do, srodek) -
+    pasmo, poszerzone pasma, a na końcu (od_pozycji, None, srodek), czyli
+    do końca tekstu. `srodek` to przewidywana pozycja (remisy ocen
+    rozstrzygane na korzyść bliższej) albo None bez przewidywania.
+    """
+    przewidywanie = przewiduj(model) if model is not None else None
+    if przewidywanie is None:
+        yield od_pozycji, None, None
+        return
+    srodek, pasmo = przewidywanie
+    for _ in range(POSZERZENIA + 1):
+        od = max(od_pozycji, int(srodek - pasmo))
+        yield od, max(od + 1, int(srodek + pasmo)), int(srodek)
+        pasmo *= POSZERZENIE
+    yield od_pozycji, None, int(srodek)
+
+
+def przed_fragmentem(model, item):
+    """Dolicza czas plików pominiętych przed bieżącym fragmentem."""
+    model['czas_ms'] += item.get('pominiete_ms', 0)
+
+
+def aktualizuj(model, item, fragment):
+    """Uwzględnia wynik dopasowania fragmentu i przesuwa czas na następny."""
+    if fragment.get('found'):
+        pozycja = fragment['pos_start']
+        przewidywanie = przewiduj(model)
+        znaki, ms = 0, 0
+        if przewidywanie is not None:
+            czas, poprzednia = model['ostatni']
+            znaki, ms = pozycja - poprzednia, model['czas_ms'] - czas
+        # Pierwszy odcinek ustala tempo bez względu na wartość startową
+        if znaki > 0 and ms > 0 and (not model['suma_ms']
+                                     or 1 / ODSTAJACE_TEMPO <= znaki / ms / model['tempo'] <= ODSTAJACE_TEMPO):
+            blad = abs(pozycja - przewidywanie[0])
+            model['blad'] = blad if model['blad'] is None else (
+                ZAPOMINANIE * model['blad'] + (1 - ZAPOMINANIE) * blad)
+            model['suma_znakow'] = ZAPOMINANIE * model['suma_znakow'] + znaki
+            model['suma_ms'] = ZAPOMINANIE * model['suma_ms'] + ms
+            model['tempo'] = model['suma_znakow'] / model['suma_ms']
+        model['ostatni'] = (model['czas_ms'], pozycja)
+    model['czas_ms'] += dlugosc_ms(item)
@@ -0,0 +1,204 @@
+"""
+Strumieniowa segmentacja nagrania po ciszy.
+
+Nagranie rozdziału dekodowane jest przez ffmpeg kawałkami (mono, 16 kHz,
+PCM 16 bit na stdout), a dla każdej ramki (domyślnie 20 ms) NumPy liczy
+energię RMS w dBFS. Ramki poniżej progu tworzą ciszę; cisza dłuższa niż
+`min_cisza_ms` to pauza, a w środku pauzy przebiega granica fragmentów.
+Stan detektora przechodzi między kawałkami, więc zużycie pamięci nie
+zależy od długości nagrania.
+
+Wynik to od razu plik czasów dla empty_srt / batch (format etykiet
+Audacity: start<TAB>koniec<TAB>numer, w sekundach) - bez ręcznego
+wycinania i opisywania fragmentów i bez przepuszczania całości przez Whisper.
+
+Użycie:
+    python -m funkcje.silence rozdzial.mp3 --wyjscie czasy.txt
+"""
+
+import os
+import argparse
+import subprocess
+import numpy as np
+
+from funkcje import metrics
+
+SAMPLE_RATE = 16000
+RAMKA_MS = 20
+PROG_DB = -40.0
+MIN_CISZA_MS = 700
+MIN_FRAGMENT_MS = 3000
+KAWALEK_S = 10
+
+
+def iter_probki(path, sample_rate=SAMPLE_RATE, kawalek_s=KAWALEK_S, start_s=None, czas_s=None):
+    """
+    Dekoduje plik audio przez ffmpeg i zwraca kolejne kawałki próbek.
+    `start_s` / `czas_s` ograniczają dekodowanie do zakresu pliku.
+
+    Yields:
+        np.ndarray: int16, mono, `sample_rate` Hz, do `kawalek_s` sekund
+    """
+    cmd = ["ffmpeg", "-nostdin", "-loglevel", "error"]
+    if start_s:
+        cmd += ["-ss", f"{start_s:.3f}"]
+    if czas_s:
+        cmd += ["-t", f"{czas_s:.3f}"]
+    cmd += ["-i", path, "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "-"]
+    rozmiar = sample_rate * kawalek_s * 2
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        raise RuntimeError("Segmentacja wymaga ffmpeg w PATH")
+
+    reszta = b""
+    try:
+        while True:
+            dane = proc.stdout.read(rozmiar)
+            if not dane:
+                break
+            metrics.licz("bajty_pcm", len(dane))
+            dane = reszta + dane
+            # Nieparzysta liczba bajtów - ostatni bajt czeka na następny kawałek
+            reszta = dane[len(dane) // 2 * 2:]
+            yield np.frombuffer(dane[:len(dane) // 2 * 2], dtype=np.int16)
+    finally:
+        proc.stdout.close()
+        blad = proc.stderr.read().decode("utf-8", "replace").strip()
+        proc.stderr.close()
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg: {blad or 'błąd dekodowania'}")
+
+
+def energia_db(probki):
+    """Energia RMS ramek w dBFS (probki: int16, 2D [ramka, próbka])."""
+    x = probki.astype(np.float32) / 32768.0
+    rms = np.sqrt(np.mean(x * x, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def wykryj_pauzy(kawalki, sample_rate=SAMPLE_RATE, ramka_ms=RAMKA_MS, prog_db=PROG_DB,
+                 min_cisza_ms=MIN_CISZA_MS):
+    """
+    Wykrywa pauzy w strumieniu kawałków próbek.
+
+    Args:
+        kawalki (iterable[np.ndarray]): Próbki int16 (np. iter_probki)
+        prog_db (float): Ramka cichsza niż próg (dBFS) to cisza
+        min_cisza_ms (int): Minimalna długość pauzy
+
+    Returns:
+        tuple: (lista pauz [(start_ms, end_ms)], długość nagrania w ms)
+    """
+    ramka = sample_rate * ramka_ms // 1000
+    pauzy = []
+    bufor = np.zeros(0, dtype=np.int16)
+    nr_ramki = 0            # numer pierwszej ramki bieżącego kawałka
+    cisza_od = None         # numer ramki, od której trwa cisza (przez kawałki)
+    min_ramek = max(1, min_cisza_ms // ramka_ms)
+
+    with metrics.etap("segmentacja"):
+        for kawalek in kawalki:
+            bufor = np.concatenate((bufor, kawalek)) if len(bufor) else kawalek
+            pelne = len(bufor) // ramka
+            if pelne == 0:
+                continue
+            ramki = bufor[:pelne * ramka].reshape(pelne, ramka)
+            bufor = bufor[pelne * ramka:]
+
+            cicha = energia_db(ramki) < prog_db
+            # Początki i końce ciągów ciszy w kawałku (wektorowo)
+            zmiany = np.flatnonzero(np.diff(cicha.astype(np.int8))) + 1
+            granice = np.concatenate(([0], zmiany, [pelne]))
+            for a in granice[:-1].tolist():
+                if cicha[a]:
+                    if cisza_od is None:
+                        cisza_od = nr_ramki + a
+                else:
+                    if cisza_od is not None and nr_ramki + a - cisza_od >= min_ramek:
+                        pauzy.append((cisza_od * ramka_ms, (nr_ramki + a) * ramka_ms))
+                    cisza_od = None
+            nr_ramki += pelne
+
+    dlugosc_ms = nr_ramki * ramka_ms + len(bufor) * 1000 // sample_rate
+    if cisza_od is not None and nr_ramki - cisza_od >= min_ramek:
+        pauzy.append((cisza_od * ramka_ms, dlugosc_ms))
+    metrics.licz("pauzy", len(pauzy))
+    return pauzy, dlugosc_ms
+
+
+def fragmenty_z_pauz(pauzy, dlugosc_ms, min_fragment_ms=MIN_FRAGMENT_MS):
+    """
+    Dzieli nagranie na fragmenty: granica w środku każdej pauzy, cisza na
+    początku i końcu nagrania odcięta. Fragment krótszy niż
+    `min_fragment_ms` łączony jest z następnym.
+
+    Returns:
+        list[tuple]: (start_ms, end_ms) kolejnych fragmentów
+    """
+    start = 0
+    koniec = dlugosc_ms
+    wewnetrzne = []
+    for a, b in pauzy:
+        if a <= 0:
+            start = b
+        elif b >= dlugosc_ms:
+            koniec = a
+        else:
+            wewnetrzne.append((a + b) // 2)
+
+    fragmenty = []
+    poczatek = start
+    for ciecie in wewnetrzne:
+        if ciecie - poczatek >= min_fragment_ms:
+            fragmenty.append((poczatek, ciecie))
+            poczatek = ciecie
+    if koniec > poczatek:
+        if fragmenty and koniec - poczatek < min_fragment_ms:
+            # Zbyt krótka końcówka - dołącz do poprzedniego
+            fragmenty[-1] = (fragmenty[-1][0], koniec)
+        else:
+            fragmenty.append((poczatek, koniec))
+    return fragmenty
+
+
+def zapisz_czasy(fragmenty, path):
+    """Zapisuje plik czasów (etykiety Audacity, sekundy) - czytelny dla empty_srt."""
+    with open(path, "w", encoding="utf-8") as f:
+        for idx, (start, end) in enumerate(fragmenty, start=1):
+            f.write(f"{start / 1000:.3f}\t{end / 1000:.3f}\t{idx}\n")
+    return path
+
+
+def segmentuj(path, plik_czasow=None, prog_db=PROG_DB, min_cisza_ms=MIN_CISZA_MS,
+              min_fragment_ms=MIN_FRAGMENT_MS):
+    """
+    Segmentuje nagranie i (opcjonalnie) zapisuje plik czasów.
+
+    Returns:
+        list[tuple]: (start_ms, end_ms) fragmentów
+    """
+    pauzy, dlugosc_ms = wykryj_pauzy(iter_probki(path), prog_db=prog_db, min_cisza_ms=min_cisza_ms)
+    fragmenty = fragmenty_z_pauz(pauzy, dlugosc_ms, min_fragment_ms)
+    metrics.info(f"🔇 {os.path.basename(path)}: {len(pauzy)} pauz, {len(fragmenty)} fragmentów "
+                 f"({dlugosc_ms / 1000:.1f}s)")
+    if plik_czasow:
+        zapisz_czasy(fragmenty, plik_czasow)
+        metrics.info(f"✅ Zapisano czasy: {plik_czasow}")
+    return fragmenty
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Podział nagrania na fragmenty po ciszy")
+    parser.add_argument("nagranie", help="Plik audio (np. MP3 całego rozdziału)")
+    parser.add_argument("--wyjscie", help="Plik czasów (domyślnie <nagranie>.txt)")
+    parser.add_argument("--prog", type=float, default=PROG_DB, help="Próg ciszy w dBFS")
+    parser.add_argument("--min-cisza", type=int, default=MIN_CISZA_MS, help="Minimalna pauza [ms]")
+    parser.add_argument("--min-fragment", type=int, default=MIN_FRAGMENT_MS, help="Minimalny fragment [ms]")
+    args = parser.parse_args(argv)
+    wyjscie = args.wyjscie or os.path.splitext(args.nagranie)[0] + ".txt"
+    return segmentuj(args.nagranie, wyjscie, args.prog, args.min_cisza, args.min_fragment)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Model napisów i strumieniowy odczyt/zapis SRT oraz WebVTT.
+
+Napis (Cue) to numer, start i koniec w milisekundach oraz tekst - obiekt
+ze __slots__, bez słownika atrybutów. Czytnik idzie po pliku linia po
+linii i oddaje kolejne napisy (generator), zapis przyjmuje dowolny
+iterowalny ciąg napisów - w pamięci nie ma naraz całego pliku.
+
+Czytnik rozpoznaje napis po linii czasu ("-->"), a nie po pustych liniach,
+więc dodatkowe puste linie czy brak numeru nie przesuwają kolejnych napisów.
+Obsługuje oba formaty: SRT (00:00:01,000) i WebVTT (nagłówek WEBVTT,
+bloki NOTE/STYLE, 00:01.000, ustawienia po czasie).
+
+Tekst rozdziału z separatorami "[n] >>>>" (division_mp3) czyta
+iter_bloki_tekstu - blok należy do napisu o numerze n z separatora.
+"""
+
+import re
+
+_CZAS = re.compile(r"(?:(\d+):)?(\d{1,2}):(\d{1,2})[,.](\d{1,3})")
+_SEPARATOR = re.compile(r"^\s*\[(\d+)\]\s*>{5,}\s*$")
+
+
+class Cue:
+    """Jeden napis: numer, start_ms, end_ms, tekst."""
+
+    __slots__ = ("index", "start_ms", "end_ms", "text")
+
+    def __init__(self, index, start_ms, end_ms, text=""):
+        self.index = index
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.text = text
+
+    def __repr__(self):
+        return f"Cue({self.index}, {self.start_ms}, {self.end_ms}, {self.text!r})"
+
+
+def czas_na_ms(tekst):
+    """'HH:MM:SS,mmm' / 'MM:SS.mmm' -> milisekundy."""
+    m = _CZAS.search(tekst)
+    if not m:
+        raise ValueError(f"Niepoprawny czas napisu: {tekst!r}")
+    h, mi, s, ms = m.groups()
+    return ((int(h or 0) * 60 + int(mi)) * 60 + int(s)) * 1000 + int(ms.ljust(3, "0"))
+
+
+def ms_na_czas(ms, separator=","):
+    """Milisekundy -> 'HH:MM:SS,mmm' (SRT) albo 'HH:MM:SS.mmm' (WebVTT)."""
+    ms = max(0, int(ms))
+    return (f"{ms // 3_600_000:02}:{ms % 3_600_000 // 60_000:02}:"
+            f"{ms % 60_000 // 1000:02}{separator}{ms % 1000:03}")
+
+
+def _linia_czasu(linia):
+    if "-->" not in linia:
+        return None
+    poczatek, _, koniec = linia.partition("-->")
+    try:
+        return czas_na_ms(poczatek), czas_na_ms(koniec.strip().split()[0])
+    except (ValueError, IndexError):
+        return None
+
+
+def iter_napisy(path):
+    """
+    Czyta plik SRT lub WebVTT strumieniowo.
+
+    Linia tuż przed linią czasu to numer (identyfikator) napisu, pozostałe
+    niepuste linie - tekst bieżącego napisu. Napis kończy dopiero linia
+    czasu następnego, więc puste linie w tekście niczego nie przesuwają.
+
+    Yields:
+        Cue: kolejne napisy; bez numeru w pliku - numer kolejny
+    """
+    napis = None
+    oczekujaca = None       # może być numerem następnego napisu albo tekstem
+    po_pustej = True
+    pomijaj = False         # blok WEBVTT / NOTE / STYLE / REGION
+    licznik = 0
+
+    def dopisz(linia):
+        napis.text = f"{napis.text}\n{linia}" if napis.text else linia
+
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for raw in f:
+            linia = raw.strip()
+            if not linia:
+                if oczekujaca is not None and napis is not None:
+                    dopisz(oczekujaca)
+                oczekujaca, po_pustej, pomijaj = None, True, False
+                continue
+            if pomijaj:
+                continue
+            if po_pustej and linia.startswith(("WEBVTT", "NOTE", "STYLE", "REGION")):
+                pomijaj = True
+                continue
+            po_pustej = False
+
+            czasy = _linia_czasu(linia)
+            if czasy is None:
+                if oczekujaca is not None and napis is not None:
+                    dopisz(oczekujaca)
+                oczekujaca = linia
+                continue
+
+            if napis is not None:
+                yield napis
+            licznik += 1
+            numer = int(oczekujaca) if oczekujaca and oczekujaca.isdigit() else licznik
+            napis = Cue(numer, czasy[0], czasy[1])
+            oczekujaca = None
+
+    if napis is not None:
+        if oczekujaca is not None:
+            dopisz(oczekujaca)
+        yield napis
+
+
+def zapisz_srt(napisy, path):
+    """Zapisuje napisy jako SRT (numeracja z napisów). Zwraca liczbę napisów."""
+    n = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for napis in napisy:
+            f.write(f"{napis.index}\n{ms_na_czas(napis.start_ms)} --> {ms_na_czas(napis.end_ms)}\n")
+            f.write(f"{napis.text}\n\n" if napis.text else "\n")
+            n += 1
+    return n
+
+
+def zapisz_vtt(napisy, path):
+    """Zapisuje napisy jako WebVTT. Zwraca liczbę napisów."""
+    n = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("WEBVTT\n\n")
+        for napis in napisy:
+            f.write(f"{napis.index}\n{ms_na_czas(napis.start_ms, '.')} --> {ms_na_czas(napis.end_ms, '.')}\n")
+            f.write(f"{napis.text}\n\n" if napis.text else "\n")
+            n += 1
+    return n
+
+
+def zapisz(napisy, path):
+    """Zapis wg rozszerzenia: .vtt - WebVTT, inne - SRT."""
+    if path.lower().endswith(".vtt"):
+        return zapisz_vtt(napisy, path)
+    return zapisz_srt(napisy, path)
+
+
+def iter_bloki_tekstu(path):
+    """
+    Czyta tekst z separatorami "[n] >>>>" linia po linii.
+
+    Yields:
+        tuple: (numer separatora albo None dla tekstu przed pierwszym, tekst bloku)
+    """
+    numer, linie = None, []
+    with open(path, "r", encoding="utf-8") as f:
+        for linia in f:
+            m = _SEPARATOR.match(linia)
+            if m:
+                yield numer, "".join(linie)
+                numer, linie = int(m.group(1)), []
+            else:
+                linie.append(linia)
+    yield numer, "".join(linie)
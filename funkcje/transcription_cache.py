@@ -0,0 +1,131 @@
+"""
+Trwały cache transkrypcji Whisper adresowany zawartością pliku audio.
+
+Klucz = hash zawartości MP3 + nazwa modelu + język + opcje dekodowania,
+więc zmiana progu dopasowania czy słownika nie wymusza ponownej
+transkrypcji, a podmiana pliku audio - tak. Wpis przechowuje tekst
+i segmenty. Cache leży poza temp/ (delete_temp_folder go nie usuwa)
+i jest przycinany po wieku i łącznym rozmiarze.
+"""
+
+import os
+import json
+import time
+import hashlib
+
+CACHE_DIR = os.environ.get(
+    "ELRAPHAEL_CACHE_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "cache", "whisper")),
+)
+MAX_BYTES = 500 * 1024 * 1024
+MAX_AGE_DAYS = 90
+
+# Pola segmentów Whisper, które zapisujemy (tokeny itp. pomijamy)
+SEGMENT_FIELDS = ("id", "start", "end", "text", "avg_logprob", "no_speech_prob")
+
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """SHA-256 zawartości pliku, czytany kawałkami."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_key(path, model_name, language, options=None):
+    """Klucz wpisu: hash audio + model + język + opcje dekodowania."""
+    payload = {
+        "audio": file_hash(path),
+        "model": model_name,
+        "language": language,
+        "options": options or {},
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _entry_path(key, cache_dir=None):
+    cache_dir = cache_dir or CACHE_DIR
+    return os.path.join(cache_dir, key[:2], key + ".json")
+
+
+def load(key, cache_dir=None):
+    """Zwraca zapisany wynik {'text', 'segments'} albo None."""
+    path = _entry_path(key, cache_dir)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # Odśwież czas dostępu - przycinanie usuwa najdawniej używane wpisy
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+    return entry
+
+
+def save(key, result, cache_dir=None):
+    """Zapisuje tekst i segmenty transkrypcji (zapis atomowy)."""
+    path = _entry_path(key, cache_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    entry = {
+        "text": result.get("text", ""),
+        "segments": [
+            {k: seg[k] for k in SEGMENT_FIELDS if k in seg}
+            for seg in result.get("segments", [])
+        ],
+        "created": time.time(),
+    }
+    if "kotwica" in result:
+        # Transkrypcja samych kotwic (funkcje.anchor_transcription)
+        entry["kotwica"] = result["kotwica"]
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return entry
+
+
+def prune(max_bytes=MAX_BYTES, max_age_days=MAX_AGE_DAYS, cache_dir=None):
+    """
+    Usuwa wpisy starsze niż max_age_days, a potem najdawniej używane,
+    aż łączny rozmiar spadnie poniżej max_bytes.
+
+    Returns:
+        int: Liczba usuniętych wpisów
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    if not os.path.isdir(cache_dir):
+        return 0
+
+    entries = []
+    for root, _, files in os.walk(cache_dir):
+        for name in files:
+            if name.endswith(".json"):
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+
+    removed = 0
+    now = time.time()
+    total = sum(size for _, size, _ in entries)
+    entries.sort()  # najstarsze (najdawniej używane) najpierw
+
+    for mtime, size, path in entries:
+        too_old = max_age_days is not None and now - mtime > max_age_days * 86400
+        too_big = max_bytes is not None and total > max_bytes
+        if not (too_old or too_big):
+            continue
+        try:
+            os.remove(path)
+            total -= size
+            removed += 1
+        except OSError:
+            pass
+
+    return removed
@@ -0,0 +1,230 @@
+"""
+Stała usługa transkrypcji Whisper na gnieździe Unix.
+
+Proces usługi ładuje model raz i trzyma go w pamięci - kolejne krótkie
+zadania (rozdziały z kilkoma fragmentami, uruchamiane jedno po drugim)
+nie płacą za whisper.load_model przy każdym starcie.
+
+Protokół: jedna linia JSON na wiadomość. Klient wysyła
+{"sciezki": [...], "model", "language", "options", "vad", "kotwica"}, usługa odsyła po
+linii {"sciezka", "wynik", "blad"} dla każdego pliku - w kolejności
+ścieżek, zaraz po transkrypcji - i {"koniec": true} na końcu.
+
+division_mp3 korzysta z usługi sam, jeśli działa (gniazdo istnieje
+i odpowiada), a w przeciwnym razie ładuje model u siebie.
+ELRAPHAEL_DAEMON=0 wyłącza korzystanie z usługi.
+
+Gniazdo leży w $XDG_RUNTIME_DIR (katalog 0700 użytkownika), a bez niego
+we wspólnym katalogu tymczasowym - tam ktoś inny mógłby podstawić własne
+gniazdo pod przewidywalną nazwą, więc klient łączy się tylko z gniazdem
+należącym do bieżącego użytkownika i niedostępnym dla grupy i innych.
+
+Użycie:
+    python -m funkcje.transcription_daemon --model base     # start
+    python -m funkcje.transcription_daemon --zatrzymaj      # stop
+"""
+
+import os
+import json
+import stat
+import socket
+import argparse
+import tempfile
+import socketserver
+
+from funkcje import anchor_transcription
+
+SOCKET_PATH = os.environ.get(
+    "ELRAPHAEL_DAEMON_SOCKET",
+    os.path.join(os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir(),
+                 f"elraphael-whisper-{os.getuid() if hasattr(os, 'getuid') else 0}.sock"),
+)
+WLACZONY = os.environ.get("ELRAPHAEL_DAEMON", "1") != "0"
+
+# Modele rezydentne w procesie usługi
+_modele = {}
+
+
+def _model(model_name):
+    if model_name not in _modele:
+        import whisper
+        print(f"🎤 Ładuję model Whisper: {model_name}")
+        _modele[model_name] = whisper.load_model(model_name)
+    return _modele[model_name]
+
+
+def _wyslij(plik, wiadomosc):
+    plik.write((json.dumps(wiadomosc, ensure_ascii=False, default=float) + "\n").encode("utf-8"))
+    plik.flush()
+
+
+class _Obsluga(socketserver.StreamRequestHandler):
+    def handle(self):
+        linia = self.rfile.readline()
+        if not linia:
+            return
+        zadanie = json.loads(linia)
+        polecenie = zadanie.get("polecenie")
+        if polecenie == "ping":
+            _wyslij(self.wfile, {"ok": True, "modele": sorted(_modele)})
+            return
+        if polecenie == "stop":
+            _wyslij(self.wfile, {"ok": True})
+            self.server.zatrzymaj = True
+            return
+
+        language = zadanie.get("language", "pl")
+        options = zadanie.get("options") or {}
+        try:
+            model = _model(zadanie.get("model", "base"))
+        except Exception as e:
+            model, blad_modelu = None, str(e)
+        for sciezka in zadanie.get("sciezki", []):
+            if model is None:
+                wiadomosc = {"sciezka": sciezka, "wynik": None, "blad": blad_modelu}
+            else:
+                try:
+                    wynik = anchor_transcription.transkrybuj(model, sciezka, language, options,
+                                                             zadanie.get("vad"), zadanie.get("kotwica"))
+                    wiadomosc = {"sciezka": sciezka, "blad": None,
+                                 "wynik": {k: wynik[k] for k in ("text", "segments", "kotwica") if k in wynik}}
+                except Exception as e:
+                    wiadomosc = {"sciezka": sciezka, "wynik": None, "blad": str(e)}
+            try:
+                _wyslij(self.wfile, wiadomosc)
+            except OSError:
+                # Klient się rozłączył - reszta paczki nie jest już potrzebna
+                return
+        _wyslij(self.wfile, {"koniec": True})
+
+
+def serwuj(model_name="base", socket_path=SOCKET_PATH):
+    """Uruchamia usługę (blokuje do polecenia stop / Ctrl+C)."""
+    if os.path.exists(socket_path):
+        if dostepny(socket_path):
+            print(f"⚠️ Usługa już działa: {socket_path}")
+            return
+        os.remove(socket_path)      # gniazdo po zakończonym procesie
+
+    _model(model_name)
+    # Gniazdo od razu tylko dla właściciela (0600) - chmod po bind zostawiałby
+    # chwilę, w której mogą się połączyć inni użytkownicy
+    stara_umask = os.umask(0o177)
+    try:
+        serwer = socketserver.UnixStreamServer(socket_path, _Obsluga)
+    finally:
+        os.umask(stara_umask)
+    serwer.zatrzymaj = False
+    print(f"✅ Usługa transkrypcji gotowa: {socket_path}")
+    try:
+        while not serwer.zatrzymaj:
+            serwer.handle_request()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        serwer.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        print("🛑 Usługa transkrypcji zatrzymana")
+
+
+def sprawdz_gniazdo(socket_path):
+    """
+    Gniazdo musi należeć do bieżącego użytkownika i nie może być dostępne
+    dla grupy ani innych - inaczej PermissionError (jak każdy OSError
+    oznacza "usługa niedostępna").
+    """
+    st = os.stat(socket_path)
+    if not stat.S_ISSOCK(st.st_mode):
+        raise PermissionError(f"{socket_path} nie jest gniazdem")
+    if st.st_uid != os.getuid():
+        raise PermissionError(f"gniazdo {socket_path} należy do innego użytkownika (uid {st.st_uid})")
+    if st.st_mode & 0o077:
+        raise PermissionError(f"gniazdo {socket_path} dostępne dla innych ({stat.filemode(st.st_mode)})")
+
+
+def _polacz(socket_path, timeout=None):
+    sprawdz_gniazdo(socket_path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def _polecenie(socket_path, polecenie, timeout=2):
+    with _polacz(socket_path, timeout) as sock:
+        sock.sendall((json.dumps({"polecenie": polecenie}) + "\n").encode("utf-8"))
+        with sock.makefile("rb") as f:
+            return json.loads(f.readline() or "null")
+
+
+def dostepny(socket_path=SOCKET_PATH):
+    """Czy usługa działa i odpowiada (brak gniazda = od razu False)."""
+    if not WLACZONY or not hasattr(socket, "AF_UNIX") or not os.path.exists(socket_path):
+        return False
+    try:
+        return bool(_polecenie(socket_path, "ping"))
+    except (OSError, ValueError):
+        return False
+
+
+def zatrzymaj(socket_path=SOCKET_PATH):
+    try:
+        _polecenie(socket_path, "stop")
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+def transcribe(sciezki, model_name="base", language="pl", decode_options=None, socket_path=SOCKET_PATH,
+               vad=None, kotwica=None):
+    """
+    Transkrybuje pliki w usłudze - interfejs jak transcription_pool.transcribe_parallel.
+
+    Yields:
+        tuple: (sciezka, wynik {'text', 'segments'} lub None, błąd lub None)
+               - w kolejności `sciezki`; po zerwaniu połączenia pozostałe
+               pliki dostają błąd
+    """
+    sciezki = [os.path.abspath(s) for s in sciezki]
+    if not sciezki:
+        return
+    zadanie = {"sciezki": sciezki, "model": model_name, "language": language, "options": decode_options or {},
+               "vad": vad, "kotwica": kotwica}
+    odebrane = 0
+    try:
+        with _polacz(socket_path) as sock:
+            sock.sendall((json.dumps(zadanie, ensure_ascii=False) + "\n").encode("utf-8"))
+            with sock.makefile("rb") as f:
+                for linia in f:
+                    wiadomosc = json.loads(linia)
+                    if wiadomosc.get("koniec"):
+                        break
+                    odebrane += 1
+                    yield wiadomosc["sciezka"], wiadomosc["wynik"], wiadomosc["blad"]
+    except (OSError, ValueError) as e:
+        blad = f"usługa transkrypcji: {e}"
+    else:
+        blad = "usługa transkrypcji przerwała zadanie"
+    for sciezka in sciezki[odebrane:]:
+        yield sciezka, None, blad
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Usługa transkrypcji Whisper z modelem w pamięci")
+    parser.add_argument("--model", default="base", help="Model Whisper ładowany na starcie")
+    parser.add_argument("--socket", default=SOCKET_PATH, help="Ścieżka gniazda Unix")
+    parser.add_argument("--zatrzymaj", action="store_true", help="Zatrzymaj działającą usługę")
+    args = parser.parse_args(argv)
+    if args.zatrzymaj:
+        print("🛑 Zatrzymano" if zatrzymaj(args.socket) else "⚠️ Usługa nie działa")
+        return
+    serwuj(args.model, args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Równoległa transkrypcja Whisper w puli procesów.
+
+Każdy proces roboczy ładuje model raz (w inicjalizatorze) i pobiera
+kolejne ścieżki MP3 z kolejki zadań puli. Wyniki wracają w kolejności
+plików wejściowych.
+"""
+
+import os
+import multiprocessing
+
+from funkcje import anchor_transcription
+
+# Model rezydentny w procesie roboczym
+_model = None
+
+
+def _init_worker(model_name, torch_threads):
+    global _model
+    import torch
+    import whisper
+
+    if torch_threads:
+        torch.set_num_threads(torch_threads)
+    _model = whisper.load_model(model_name)
+
+
+def _transcribe(zadanie):
+    sciezka, language, options, vad, kotwica = zadanie
+    try:
+        wynik = anchor_transcription.transkrybuj(_model, sciezka, language, options, vad, kotwica)
+        return sciezka, {k: wynik[k] for k in ("text", "segments", "kotwica") if k in wynik}, None
+    except Exception as e:
+        return sciezka, None, str(e)
+
+
+def default_torch_threads(workers):
+    """Dzieli rdzenie CPU po równo między procesy robocze."""
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def transcribe_parallel(sciezki, model_name="base", language="pl", decode_options=None,
+                        workers=2, torch_threads=None, vad=None, kotwica=None):
+    """
+    Transkrybuje pliki w `workers` procesach.
+
+    Args:
+        sciezki (list[str]): Pliki MP3
+        model_name (str): Nazwa modelu Whisper
+        language (str): Język transkrypcji
+        decode_options (dict): Dodatkowe opcje dla model.transcribe
+        workers (int): Liczba procesów roboczych
+        torch_threads (int): Wątki torch na proces (domyślnie rdzenie / workers)
+        vad: Wycięcie ciszy przed transkrypcją - patrz funkcje.vad
+        kotwica: Tylko początek/koniec plików - patrz funkcje.anchor_transcription
+
+    Yields:
+        tuple: (sciezka, wynik {'text', 'segments'} lub None, błąd lub None)
+               - w kolejności `sciezki`
+    """
+    if not sciezki:
+        return
+    workers = max(1, min(workers, len(sciezki)))
+    if torch_threads is None:
+        torch_threads = default_torch_threads(workers)
+
+    zadania = [(s, language, decode_options or {}, vad, kotwica) for s in sciezki]
+
+    # spawn - torch nie lubi fork po zainicjalizowaniu wątków
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(workers, initializer=_init_worker, initargs=(model_name, torch_threads)) as pool:
+        for wynik in pool.imap(_transcribe, zadania, chunksize=1):
+            yield wynik
@@ -1,5 +1,6 @@
 import os
-import shutil
+
+from funkcje import materialize
 
 BASE_DIR = "/content/El-Raphael"
 mp3_dir = os.path.join(BASE_DIR, "temp", "mp3")
@@ -7,32 +8,43 @@ os.makedirs(mp3_dir, exist_ok=True)
 
 def upload_mp3_to_chapter(mp3_files):
     """
-    Zapisuje pliki do BASE_DIR/temp/mp3.
-    Dla lokalnych ścieżek: kopiuje i (jeśli pochodzi z BASE_DIR) usuwa oryginał.
-    Dla upload z Colab (tuple filename, bytes): zapisuje do mp3_dir.
+    Zapisuje pliki do BASE_DIR/temp/mp3 - bez kopiowania danych, gdy się da
+    (funkcje.materialize).
+    Dla lokalnych ścieżek: dowiązuje/kopiuje, a plik z BASE_DIR przenosi.
+    Dla upload z Colab (tuple filename, bytes): przenosi kopię, którą Colab
+    zapisał w /tmp, a bez niej zapisuje bajty kawałkami.
     """
     count = 0
     for mp3_file in mp3_files:
         if isinstance(mp3_file, tuple) and len(mp3_file) == 2:
             filename, data = mp3_file
             dest_path = os.path.join(mp3_dir, filename)
-            with open(dest_path, "wb") as f:
-                f.write(data)
+            tmp_path = os.path.join("/tmp", filename)
+            if os.path.isfile(tmp_path) and os.path.getsize(tmp_path) == len(data):
+                materialize.przenies(tmp_path, dest_path)
+            else:
+                materialize.zapisz_bajty(data, dest_path)
             count += 1
         else:
             # lokalna ścieżka
             src = mp3_file
             dest_path = os.path.join(mp3_dir, os.path.basename(src))
-            shutil.copy2(src, dest_path)
-            count += 1
+            if os.path.abspath(src) == os.path.abspath(dest_path):
+                count += 1
+                continue
 
-            # jeśli plik pochodził z BASE_DIR, usuń oryginał żeby nie było kopii
+            # jeśli plik pochodzi z BASE_DIR, przenosimy go, żeby nie było kopii
             try:
-                if os.path.commonpath([os.path.abspath(src), os.path.abspath(BASE_DIR)]) == os.path.abspath(BASE_DIR):
-                    os.remove(src)
-            except Exception:
-                # commonpath może rzucić, więc ignorujemy błędy usuwania
-                pass
+                z_base_dir = os.path.commonpath([os.path.abspath(src), os.path.abspath(BASE_DIR)]) == os.path.abspath(BASE_DIR)
+            except ValueError:
+                # commonpath rzuca dla ścieżek z różnych dysków
+                z_base_dir = False
+
+            if z_base_dir:
+                materialize.przenies(src, dest_path)
+            else:
+                materialize.materializuj(src, dest_path)
+            count += 1
 
     print(f"🎵 Wgrano {count} plików do: {mp3_dir}")
 
@@ -0,0 +1,152 @@
+"""
+Wykrywanie mowy (VAD) po energii - wstępne przycięcie audio przed Whisper.
+
+Plik dekodowany jest tak jak przy segmentacji (silence.iter_probki,
+16 kHz mono), pauzy wykrywa silence.wykryj_pauzy, a do Whisper trafia
+tylko mowa: cisza na początku i końcu oraz długie pauzy w środku są
+wycinane (z marginesem `margines_ms` przy każdej granicy). Plik bez mowy
+w ogóle nie jest transkrybowany.
+
+Czas Whispera rośnie z długością audio, a cisza dodatkowo daje
+"halucynacje" psujące dopasowanie. Czasy segmentów przeliczane są z
+powrotem na czasy w oryginalnym pliku (mapa odcinków), więc
+start_ms/end_ms i podział segmentów wg czasów działają jak bez VAD.
+"""
+
+import os
+import numpy as np
+from bisect import bisect_left, bisect_right
+
+from funkcje import metrics
+from funkcje import silence
+
+DOMYSLNE = {"prog_db": silence.PROG_DB, "min_cisza_ms": 500, "margines_ms": 200}
+
+
+def parametry(vad):
+    """
+    Parametry VAD: None/False - wyłączony, True - domyślne, dict - domyślne
+    nadpisane podanymi.
+    """
+    if not vad:
+        return None
+    p = dict(DOMYSLNE)
+    if isinstance(vad, dict):
+        p.update(vad)
+    return p
+
+
+def opcje_klucza(decode_options, vad):
+    """Opcje do klucza cache - z parametrami VAD tylko, gdy jest włączony."""
+    p = parametry(vad)
+    opcje = dict(decode_options or {})
+    if p:
+        opcje["vad"] = p
+    return opcje
+
+
+def odcinki_mowy(pauzy, dlugosc_ms, margines_ms):
+    """
+    Odcinki [start_ms, end_ms) do zachowania - dopełnienie pauz, każda
+    pauza skrócona o margines z obu stron (przy brzegach pliku - z jednej).
+    """
+    odcinki = []
+    poczatek = 0
+    for a, b in pauzy:
+        koniec = a + margines_ms if a > 0 else 0
+        nowy_poczatek = b - margines_ms if b < dlugosc_ms else dlugosc_ms
+        if nowy_poczatek <= koniec:
+            # Pauza krótsza niż dwa marginesy - nic do wycięcia
+            continue
+        if koniec > poczatek:
+            odcinki.append((poczatek, koniec))
+        poczatek = nowy_poczatek
+    if dlugosc_ms > poczatek:
+        odcinki.append((poczatek, dlugosc_ms))
+    return odcinki
+
+
+def wczytaj_mowe(sciezka, p, sample_rate=silence.SAMPLE_RATE):
+    """
+    Dekoduje plik i zostawia tylko mowę.
+
+    Returns:
+        tuple: (audio float32 do Whisper, mapa [(ms w przyciętym, ms w oryginale)],
+                długość oryginału w ms)
+    """
+    kawalki = []
+
+    def zbieraj():
+        for kawalek in silence.iter_probki(sciezka, sample_rate):
+            kawalki.append(kawalek)
+            yield kawalek
+
+    pauzy, dlugosc_ms = silence.wykryj_pauzy(zbieraj(), sample_rate, prog_db=p["prog_db"],
+                                             min_cisza_ms=p["min_cisza_ms"])
+    probki = np.concatenate(kawalki) if kawalki else np.zeros(0, dtype=np.int16)
+
+    mapa = []
+    czesci = []
+    przyciete_ms = 0
+    for a, b in odcinki_mowy(pauzy, dlugosc_ms, p["margines_ms"]):
+        mapa.append((przyciete_ms, a))
+        czesci.append(probki[a * sample_rate // 1000:b * sample_rate // 1000])
+        przyciete_ms += b - a
+
+    metrics.licz("vad_ms_mowy", przyciete_ms)
+    metrics.licz("vad_ms_usuniete", dlugosc_ms - przyciete_ms)
+    if not czesci:
+        return np.zeros(0, dtype=np.float32), mapa, dlugosc_ms
+    audio = np.concatenate(czesci).astype(np.float32) / 32768.0
+    return audio, mapa, dlugosc_ms
+
+
+def na_oryginal(czas_s, mapa, koniec=False):
+    """
+    Czas (s) w przyciętym audio -> czas (s) w oryginalnym pliku. Czas
+    końca leżący dokładnie na styku odcinków należy do wcześniejszego.
+    """
+    ms = czas_s * 1000
+    if koniec:
+        i = max(0, bisect_left(mapa, (ms, float("-inf"))) - 1)
+    else:
+        i = max(0, bisect_right(mapa, (ms, float("inf"))) - 1)
+    przyciete, oryginal = mapa[i]
+    return (oryginal + ms - przyciete) / 1000
+
+
+def przesun_czasy(wynik, mapa):
+    """Przelicza czasy segmentów (i słów) Whisper na czasy w oryginale."""
+    for seg in wynik.get("segments", []):
+        for obiekt in [seg] + list(seg.get("words", [])):
+            for pole in ("start", "end"):
+                if pole in obiekt:
+                    obiekt[pole] = na_oryginal(obiekt[pole], mapa, koniec=pole == "end")
+    return wynik
+
+
+def transkrybuj(model, sciezka, language="pl", options=None, vad=None):
+    """
+    model.transcribe z wstępnym wycięciem ciszy (gdy `vad` włączony).
+
+    Returns:
+        dict: Wynik Whisper z czasami względem oryginalnego pliku;
+              bez mowy - {'text': '', 'segments': []}
+    """
+    options = options or {}
+    p = parametry(vad)
+    if p is None:
+        return model.transcribe(sciezka, language=language, **options)
+
+    try:
+        with metrics.etap("vad"):
+            audio, mapa, dlugosc_ms = wczytaj_mowe(sciezka, p)
+    except RuntimeError as e:
+        metrics.info(f"⚠️ VAD niedostępny dla {os.path.basename(sciezka)} ({e}) - transkrybuję całość")
+        return model.transcribe(sciezka, language=language, **options)
+
+    if not mapa:
+        metrics.licz("vad_pliki_bez_mowy")
+        return {"text": "", "segments": []}
+    metrics.szczegoly(f"   🔇 VAD: {len(audio) / silence.SAMPLE_RATE:.1f}s mowy z {dlugosc_ms / 1000:.1f}s")
+    return przesun_czasy(model.transcribe(audio, language=language, **options), mapa)
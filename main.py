@@ -1,6 +1,8 @@
 import funkcje.empty_srt as empty_srt
 import funkcje.cut_chapter as cut_chapter
 import funkcje.upload_mp3 as upload_mp3
+import funkcje.batch as batch
+import sys
 
 # Program wymaga pliku w-pustyni-i-w-puszczy.txt w tym samym katalogu
 
@@ -29,4 +31,8 @@ def menu():
 
 
 if __name__ == "__main__":
-    menu()
+    # Z argumentami - tryb wsadowy dla całej książki (patrz funkcje/batch.py)
+    if len(sys.argv) > 1:
+        batch.main(sys.argv[1:])
+    else:
+        menu()
@@ -0,0 +1,54 @@
+"""score_windows daje te same wyniki co dawna ocena okno po oknie (fuzzywuzzy)."""
+
+import os
+import random
+
+import numpy as np
+from fuzzywuzzy import fuzz
+
+from funkcje import normalization
+from funkcje.batch_scoring import score_windows, partial_ratios
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _tekst():
+    with open(os.path.join(REPO, "w-pustyni-i-w-puszczy.txt"), "r", encoding="utf-8") as f:
+        return normalization.normalize(normalization.get_normalizer(None), f.read()[:30000])
+
+
+def _zepsuj(fraza, rng):
+    slowa = fraza.split()
+    for _ in range(len(slowa) // 6):
+        k = rng.randrange(len(slowa))
+        slowa[k] = slowa[k][::-1]
+    return " ".join(slowa).replace("ą", "a").replace("ł", "l")
+
+
+def _po_kolei(fraza, tekst, starts, okno):
+    slowa = fraza.split()
+    return np.array([
+        fuzz.partial_ratio(fraza, tekst[i:i + okno]) * 0.7 + fuzz.token_set_ratio(fraza, tekst[i:i + okno]) * 0.3
+        + (10 if tekst.startswith(slowa[0], i) else 0)
+        for i in starts
+    ])
+
+
+def test_zgodnosc_z_fuzzywuzzy():
+    tekst = _tekst()
+    rng = random.Random(7)
+    for start, dlugosc in ((5000, 300), (12000, 700), (len(tekst) - 400, 350)):
+        fraza = _zepsuj(tekst[start:start + dlugosc], rng)
+        okno = max(len(fraza) * 5, 500)
+        # Okna nakładające się (jak wokół kandydata), dalekie i przy końcu tekstu
+        starts = list(range(max(0, start - 300), start + 300, 7)) + [0, 20000, len(tekst) - 100, len(tekst)]
+        assert np.array_equal(score_windows(fraza, tekst, starts, okno), _po_kolei(fraza, tekst, starts, okno))
+
+
+def test_partial_ratios_przypadki_brzegowe():
+    tekst = "ala ma kota a kot ma ale"
+    for fraza in ("ala ma kota a kot ma ale", "kot ma", "x", "zupelnie inne slowa tutaj"):
+        starts = range(len(tekst) + 1)
+        for okno in (3, 10, 100):
+            oczekiwane = [fuzz.partial_ratio(fraza, tekst[i:i + okno]) for i in starts]
+            assert list(partial_ratios(fraza, tekst, starts, okno)) == oczekiwane
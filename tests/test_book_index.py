@@ -0,0 +1,118 @@
+"""
+Indeks książki i strumieniowy tokenizer dają te same rozdziały,
+podrozdziały i tytuły co dawne cięcie w cut_chapter (re.split dla
+"W pustyni i w puszczy", parse_chapters_with_titles / parse_subchapters
+dla "O krasnoludkach..."), a indeks jest przebudowywany tylko po zmianie
+zawartości książki.
+"""
+
+import io
+import os
+import re
+import shutil
+
+import pytest
+
+from funkcje import book_index
+from funkcje import chapter_tokenizer
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+W_PUSTYNI = os.path.join(REPO, "w-pustyni-i-w-puszczy.txt")
+KRASNOLUDKI = os.path.join(REPO, "o-krasnoludkach-i-sierotce-marysi.txt")
+
+
+# Dawne cięcie z cut_chapter - punkt odniesienia
+
+def _stare_proste(text):
+    czesci = re.split(r'(ROZDZIAŁ [IVXLCDM]+)', text)
+    return [(czesci[i].strip(), czesci[i] + "\n" + czesci[i + 1]) for i in range(1, len(czesci), 2)]
+
+
+def _stare_zakresy(pattern, text, klucze):
+    wyniki = []
+    for m in re.finditer(pattern, text):
+        wyniki.append(dict(zip(klucze, (m.group(1).strip(), m.group(2).strip())), start=m.start()))
+    for i in range(len(wyniki)):
+        wyniki[i]["end"] = wyniki[i + 1]["start"] if i + 1 < len(wyniki) else len(text)
+    return wyniki
+
+
+def _stare_z_tytulami(text):
+    rozdzialy = _stare_zakresy(r"(ROZDZIAŁ\s+[IVXLCDM]+)\s*\n([^\n]+)", text, ("header", "title"))
+    for ch in rozdzialy:
+        tekst = text[ch["start"]:ch["end"]]
+        ch["text"] = tekst
+        ch["subs"] = [(s["roman"], s["title"], tekst[s["start"]:s["end"]])
+                      for s in _stare_zakresy(r"\n([IVXLCDM]+)\s*\n([^\n]+)", tekst, ("roman", "title"))]
+    return rozdzialy
+
+
+@pytest.fixture
+def ksiazka(tmp_path):
+    """Kopia książki w tmp_path - indeks (.index.json) nie trafia do repozytorium."""
+    def kopia(path):
+        cel = tmp_path / os.path.basename(path)
+        shutil.copy(path, cel)
+        return str(cel)
+    return kopia
+
+
+def test_proste_jak_re_split(ksiazka):
+    path = ksiazka(W_PUSTYNI)
+    with open(path, "r", encoding="utf-8") as f:
+        stare = _stare_proste(f.read())
+    index = book_index.load_index(path, "proste")
+    assert len(index["chapters"]) == len(stare) > 20
+    for ch, (header, tekst) in zip(index["chapters"], stare):
+        assert ch["header"] == header
+        assert book_index.chapter_text(path, index, ch) == tekst
+
+
+def test_z_tytulami_jak_parse_chapters(ksiazka):
+    path = ksiazka(KRASNOLUDKI)
+    with open(path, "r", encoding="utf-8") as f:
+        stare = _stare_z_tytulami(f.read())
+    index = book_index.load_index(path, "z_tytulami")
+    assert len(index["chapters"]) == len(stare) > 5
+    for ch, stary in zip(index["chapters"], stare):
+        assert (ch["header"], ch["title"]) == (stary["header"], stary["title"])
+        assert book_index.chapter_text(path, index, ch) == stary["text"]
+        assert [(s["roman"], s["title"], book_index.read_range(path, s["start"], s["end"]))
+                for s in ch["subchapters"]] == stary["subs"]
+    assert any(ch["subchapters"] for ch in index["chapters"])
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+def test_linie_niezalezne_od_kawalkow(chunk_size):
+    dane = "ROZDZIAŁ I\nZażółć\n\ngęślą jaźń\r\nbez końca".encode("utf-8")
+    linie = list(chapter_tokenizer.iter_lines(io.BytesIO(dane), chunk_size))
+    assert linie == list(chapter_tokenizer.iter_lines(io.BytesIO(dane)))
+    # Offsety bajtowe wskazują początki linii
+    assert all(dane[off:off + len(linia)] == linia for off, linia in linie)
+    assert b"\n".join(linia for _, linia in linie) == dane
+
+
+def test_indeks_przebudowywany_po_zmianie(ksiazka, capsys):
+    path = ksiazka(W_PUSTYNI)
+    book_index.load_index(path, "proste")
+    assert "Buduję indeks" in capsys.readouterr().out
+
+    # Sam mtime (np. świeży clone) - zawartość ta sama, indeks z pliku
+    st = os.stat(path)
+    os.utime(path, (st.st_atime, st.st_mtime + 100))
+    book_index.load_index(path, "proste")
+    assert "Buduję indeks" not in capsys.readouterr().out
+
+    # Inny format - nowy indeks
+    book_index.load_index(path, "z_tytulami")
+    assert "Buduję indeks" in capsys.readouterr().out
+
+    # Zmiana treści - nowy indeks z nowymi offsetami
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    text = "Przedmowa wydawcy.\n\n" + text
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    index = book_index.load_index(path, "proste")
+    assert "Buduję indeks" in capsys.readouterr().out
+    assert book_index.chapter_text(path, index, index["chapters"][0]) == _stare_proste(text)[0][1]
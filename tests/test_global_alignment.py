@@ -0,0 +1,59 @@
+"""
+monotonic_alignment (Fenwick, O(N log N)) daje tę samą najlepszą sumę co
+przegląd wszystkich wyborów, a wybrane pozycje rosną z odstępem min_gap.
+"""
+
+import random
+from itertools import product
+
+import pytest
+
+from funkcje.global_alignment import monotonic_alignment
+
+
+def _najlepsza_suma(candidates, min_gap, podloga):
+    """Wszystkie wybory: po jednym kandydacie albo None na fragment."""
+    najlepsza = 0.0
+    for wybor in product(*[[None] + list(c) for c in candidates]):
+        wybrane = [k for k in wybor if k is not None]
+        if any(k[1] <= podloga for k in wybrane):
+            continue
+        if all(b[0] - a[0] >= min_gap for a, b in zip(wybrane, wybrane[1:])):
+            najlepsza = max(najlepsza, sum(k[1] - podloga for k in wybrane))
+    return najlepsza
+
+
+def _suma(wynik, podloga):
+    return sum(k[1] - podloga for k in wynik if k is not None)
+
+
+@pytest.mark.parametrize("min_gap,podloga", [(1, 0.0), (1, 60.0), (30, 0.0), (30, 80.0)])
+def test_jak_pelny_przeglad(min_gap, podloga):
+    rng = random.Random(min_gap + int(podloga))
+    for _ in range(200):
+        candidates = [
+            [(rng.randrange(0, 300), rng.choice([rng.uniform(35, 100), rng.randrange(35, 101)]))
+             for _ in range(rng.randrange(0, 4))]
+            for _ in range(rng.randrange(1, 6))
+        ]
+        wynik = monotonic_alignment(candidates, min_gap=min_gap, podloga=podloga)
+
+        assert len(wynik) == len(candidates)
+        for k, cands in zip(wynik, candidates):
+            assert k is None or (k in cands and k[1] > podloga)
+        wybrane = [k[0] for k in wynik if k is not None]
+        assert all(b - a >= min_gap for a, b in zip(wybrane, wybrane[1:]))
+        assert _suma(wynik, podloga) == pytest.approx(_najlepsza_suma(candidates, min_gap, podloga))
+
+
+def test_jeden_kandydat_na_fragment():
+    # Dwie pozycje jednego fragmentu nie mogą obie trafić do ciągu
+    assert monotonic_alignment([[(10, 90), (20, 90)]]) in ([(10, 90)], [(20, 90)])
+
+
+def test_podloga_chroni_mocne_dopasowanie():
+    # Fragment 4 ma prawdziwe dopasowanie (95) przed przypadkowymi, słabymi
+    # dopasowaniami fragmentów 1-3; bez podłogi trzy słabe (3 x 45) przeważają
+    candidates = [[(500, 45)], [(510, 45)], [(520, 45)], [(100, 95)]]
+    assert monotonic_alignment(candidates) == [(500, 45), (510, 45), (520, 45), None]
+    assert monotonic_alignment(candidates, podloga=60) == [None, None, None, (100, 95)]
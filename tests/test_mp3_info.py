@@ -0,0 +1,87 @@
+"""
+Długość MP3 z nagłówków ramek na syntetycznych plikach: CBR, tag Xing,
+VBR bez tagu, tagi ID3 i fałszywe bajty synchronizacji.
+"""
+
+import struct
+
+from funkcje import mp3_info
+
+# MPEG 1 Layer III, 44100 Hz, stereo: 128 kbps -> ramka 417 B, 160 kbps -> 522 B
+NAGLOWEK_128 = b"\xFF\xFB\x90\x00"
+NAGLOWEK_160 = b"\xFF\xFB\xA0\x00"
+MS_RAMKI = 1152 * 1000 / 44100
+
+
+def _ramka(naglowek):
+    return naglowek + b"\x00" * (mp3_info.parse_frame_header(naglowek)['length'] - 4)
+
+
+def _zapisz(tmp_path, dane, nazwa="a.mp3"):
+    path = tmp_path / nazwa
+    path.write_bytes(dane)
+    return str(path)
+
+
+def _id3v2(rozmiar):
+    # Rozmiar w tagu ID3v2 zapisany po 7 bitów na bajt
+    syncsafe = bytes((rozmiar >> s) & 0x7F for s in (21, 14, 7, 0))
+    return b"ID3\x03\x00\x00" + syncsafe + b"\x00" * rozmiar
+
+
+def test_naglowek_ramki():
+    h = mp3_info.parse_frame_header(NAGLOWEK_128)
+    assert (h['version'], h['layer'], h['bitrate'], h['sample_rate']) == (1, 3, 128000, 44100)
+    assert (h['channels'], h['samples'], h['length']) == (2, 1152, 417)
+    # Z paddingiem ramka dłuższa o bajt
+    assert mp3_info.parse_frame_header(b"\xFF\xFB\x92\x00")['length'] == 418
+    # Niedozwolony bitrate / częstotliwość i brak synchronizacji
+    assert mp3_info.parse_frame_header(b"\xFF\xFB\xF0\x00") is None
+    assert mp3_info.parse_frame_header(b"\xFF\xFB\x9C\x00") is None
+    assert mp3_info.parse_frame_header(b"\x00\xFB\x90\x00") is None
+
+
+def test_cbr(tmp_path):
+    path = _zapisz(tmp_path, _ramka(NAGLOWEK_128) * 200)
+    # CBR liczone z rozmiaru danych: 200 x 417 B x 8 / 128 kbps
+    assert mp3_info.duration_ms(path) == round(200 * 417 * 8 / 128)
+    assert abs(mp3_info.duration_ms(path) - 200 * MS_RAMKI) < 0.01 * 200 * MS_RAMKI
+
+
+def test_tagi_id3_pomijane(tmp_path):
+    bez_tagow = mp3_info.duration_ms(_zapisz(tmp_path, _ramka(NAGLOWEK_128) * 200, "bez.mp3"))
+    dane = _id3v2(3000) + _ramka(NAGLOWEK_128) * 200 + b"TAG" + b"\x00" * 125
+    assert mp3_info.duration_ms(_zapisz(tmp_path, dane)) == bez_tagow
+
+
+def test_xing(tmp_path):
+    # Pierwsza ramka: 32 B side info, potem "Xing", flagi (bit 0 = liczba ramek) i liczba ramek
+    xing = bytearray(_ramka(NAGLOWEK_128))
+    xing[36:48] = b"Xing" + struct.pack(">II", 1, 5000)
+    dane = bytes(xing) + _ramka(NAGLOWEK_128) * 10
+    path = _zapisz(tmp_path, dane)
+    # Długość z tagu, nie z rozmiaru pliku
+    assert mp3_info.duration_ms(path) == round(5000 * MS_RAMKI)
+    assert mp3_info.is_info_frame(bytes(xing), mp3_info.parse_frame_header(NAGLOWEK_128))
+
+
+def test_vbr_bez_tagu(tmp_path):
+    dane = (_ramka(NAGLOWEK_128) + _ramka(NAGLOWEK_160)) * 60
+    path = _zapisz(tmp_path, dane)
+    # Różne bitrate w pierwszych ramkach -> zliczenie wszystkich ramek
+    assert mp3_info.duration_ms(path) == round(120 * MS_RAMKI)
+    assert len(list(mp3_info.iter_frames(path))) == 120
+
+
+def test_falszywa_synchronizacja(tmp_path):
+    # Bajty 0xFF wyglądające na nagłówek, ale bez kolejnej ramki za nimi
+    smieci = b"\x00" * 10 + NAGLOWEK_160 + b"\x00" * 30
+    dane = smieci + _ramka(NAGLOWEK_128) * 50
+    with open(_zapisz(tmp_path, dane), "rb") as f:
+        offset, header = mp3_info.find_first_frame(f, 0)
+    assert offset == len(smieci) and header['bitrate'] == 128000
+
+
+def test_nie_mp3(tmp_path):
+    assert mp3_info.duration_ms(_zapisz(tmp_path, b"RIFF" + b"\x00" * 5000, "a.wav")) is None
+    assert mp3_info.duration_ms(str(tmp_path / "brak.mp3")) is None
@@ -0,0 +1,27 @@
+"""Zamienniki ze słownika podmieniają tylko całe słowa."""
+
+from funkcje import normalization
+
+
+def _silnik():
+    return normalization.get_normalizer("w-pustyni-i-w-puszczy")
+
+
+def test_klucz_nie_zmienia_dluzszego_slowa():
+    silnik = _silnik()
+    assert normalization.normalize(silnik, "Chamis") == "chamis"
+    assert normalization.normalize(silnik, "Idrys, Chamis.") == "idrys chamis"
+
+
+def test_klucz_podmienia_cale_slowo():
+    silnik = _silnik()
+    assert normalization.normalize(silnik, "hamis i idry") == "chamis i idrys"
+
+
+def test_offsety_zgodne_z_normalize():
+    silnik = _silnik()
+    tekst = "— Idrys! — zawołał Chamis, a hamiz milczał."
+    norm, offsets = normalization.normalize_with_offsets(silnik, tekst)
+    assert norm == normalization.normalize(silnik, tekst)
+    assert len(offsets) == len(norm)
+    assert tekst[offsets[norm.index("chamis")]] == "C"
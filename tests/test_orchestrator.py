@@ -0,0 +1,45 @@
+"""
+Etap uruchomiony ponownie nie może zostać uznany za udany dzięki
+wyjściom z poprzedniego przebiegu.
+"""
+
+import os
+
+from funkcje import metrics
+from funkcje import orchestrator
+
+
+def test_stare_wyjscie_nie_przechodzi(tmp_path):
+    metrics.ustaw_poziom(metrics.CICHY)
+    folder = str(tmp_path)
+    wyjscie = os.path.join(folder, "rozdzial_z_enterami.txt")
+    manifest = orchestrator.load_manifest(folder)
+
+    def zapisz():
+        with open(wyjscie, "w", encoding="utf-8") as f:
+            f.write("[01] >>>>>>>>>>>>\n")
+
+    assert orchestrator.etap(manifest, "dopasowanie", zapisz, parametry={"prog": 35}, wyjscia=[wyjscie])
+    assert "dopasowanie" in manifest["etapy"]
+
+    # Nowe parametry, zero dopasowań - etap nic nie zapisuje
+    assert orchestrator.etap(manifest, "dopasowanie", lambda: None, parametry={"prog": 90}, wyjscia=[wyjscie])
+    assert not os.path.exists(wyjscie)
+    assert "dopasowanie" not in orchestrator.load_manifest(folder)["etapy"]
+
+
+def test_aktualny_etap_pominiety(tmp_path):
+    metrics.ustaw_poziom(metrics.CICHY)
+    folder = str(tmp_path)
+    wyjscie = os.path.join(folder, "wynik.txt")
+    manifest = orchestrator.load_manifest(folder)
+    wywolania = []
+
+    def zapisz():
+        wywolania.append(1)
+        with open(wyjscie, "w", encoding="utf-8") as f:
+            f.write("x")
+
+    orchestrator.etap(manifest, "etap", zapisz, wyjscia=[wyjscie])
+    assert not orchestrator.etap(manifest, "etap", zapisz, wyjscia=[wyjscie])
+    assert wywolania == [1] and os.path.exists(wyjscie)
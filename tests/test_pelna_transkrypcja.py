@@ -0,0 +1,34 @@
+"""
+Pełna transkrypcja słabych fragmentów (tryb kotwic) używa tych samych
+ustawień Whisper co transkrypcja kotwic - model, język, opcje, cache, VAD.
+"""
+
+from funkcje import division_mp3
+
+USTAWIENIA = dict(model_name="small", language="en", decode_options={"beam_size": 5}, uzyj_cache=False,
+                  vad={"prog_db": -35})
+
+
+def test_te_same_ustawienia(tmp_path, monkeypatch):
+    text_file = tmp_path / "ROZDZIAŁ_I.txt"
+    text_file.write_text("Zima była tęga.", encoding="utf-8")
+    wywolania = {}
+
+    def pobierz(text_file, **kwargs):
+        wywolania["kotwice"] = kwargs
+        return []
+
+    def pelna(**kwargs):
+        wywolania["pelna"] = kwargs
+        return lambda item: None
+
+    monkeypatch.setattr(division_mp3, "pobierz_frazy_z_mp3", pobierz)
+    monkeypatch.setattr(division_mp3, "pelna_transkrypcja", pelna)
+    monkeypatch.setattr(division_mp3, "wstaw_entery_z_podwojna_weryfikacja", lambda *a, **k: [])
+    monkeypatch.setattr(division_mp3, "utworz_fragmenty_mp3", lambda *a, **k: None)
+
+    division_mp3.podziel_na_fragmenty_z_enterami(None, str(text_file), output_folder=str(tmp_path / "out"),
+                                                 kotwica=5, **USTAWIENIA)
+    assert wywolania["pelna"] == USTAWIENIA
+    assert {k: wywolania["kotwice"][k] for k in USTAWIENIA} == USTAWIENIA
+    assert wywolania["kotwice"]["kotwica"] == 5
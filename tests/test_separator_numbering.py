@@ -0,0 +1,54 @@
+"""
+Numery separatorów "[n] >>>>" to numery plików/linii czasów, nie pozycje
+na liście fraz - plik pominięty przez pustą transkrypcję nie przesuwa
+tekstu kolejnych napisów.
+"""
+
+import os
+
+from funkcje import metrics
+from funkcje import subtitles
+from funkcje.division_mp3 import wstaw_entery_z_podwojna_weryfikacja
+from funkcje.generate_srt import polacz_srt
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KSIAZKA = os.path.join(REPO, "w-pustyni-i-w-puszczy.txt")
+
+
+def _akapity(liczba, min_dlugosc=300):
+    with open(KSIAZKA, "r", encoding="utf-8") as f:
+        text = f.read()[:40000]
+    akapity = [a for a in text.split("\n\n") if len(a) >= min_dlugosc]
+    return akapity[:liczba]
+
+
+def test_pominiety_plik_zostawia_pusty_blok(tmp_path):
+    metrics.ustaw_poziom(metrics.CICHY)
+    akapity = _akapity(4)
+    text = "\n\n".join(akapity)
+    text_file = str(tmp_path / "rozdzial.txt")
+
+    # Plik 003 miał pustą transkrypcję - nie ma go na liście fraz
+    frazy = [
+        {'plik': f"{n:03d}.mp3", 'numer': n, 'transkrypcja': akapity[n - 1][:250],
+         'segments': [], 'start_ms': 0, 'end_ms': 0}
+        for n in (1, 2, 4)
+    ]
+    fragmenty = wstaw_entery_z_podwojna_weryfikacja(text, frazy, text_file=text_file)
+    assert all(f['found'] for f in fragmenty)
+
+    bloki = {numer: tekst for numer, tekst in subtitles.iter_bloki_tekstu(text_file.replace('.txt', '_z_enterami.txt'))
+             if numer is not None}
+    assert sorted(bloki) == [1, 2, 3, 4]
+    assert bloki[3].strip() == ""
+    assert bloki[4].strip().startswith(akapity[3][:40])
+
+    srt = str(tmp_path / "empty.srt")
+    subtitles.zapisz_srt([subtitles.Cue(n, (n - 1) * 1000, n * 1000) for n in range(1, 6)], srt)
+    wynik = polacz_srt(srt, text_file.replace('.txt', '_z_enterami.txt'), str(tmp_path))
+
+    teksty = {napis.index: napis.text for napis in subtitles.iter_napisy(wynik)}
+    assert teksty[2].startswith(akapity[1][:40])
+    assert teksty[3] == ""
+    assert teksty[4].startswith(akapity[3][:40])
+    assert teksty[5] == ""
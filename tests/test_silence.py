@@ -0,0 +1,62 @@
+"""
+Wykrywanie pauz na syntetycznym sygnale: wynik nie zależy od podziału
+strumienia na kawałki, a granice fragmentów wypadają w środku pauz.
+"""
+
+import numpy as np
+
+from funkcje import silence
+
+SR = silence.SAMPLE_RATE
+
+
+def _sygnal(odcinki):
+    """odcinki: [(ms, głośny?)] -> próbki int16 (szum ok. -10 dBFS lub cisza)."""
+    rng = np.random.default_rng(0)
+    czesci = []
+    for ms, glosny in odcinki:
+        n = SR * ms // 1000
+        czesci.append((rng.normal(0, 10000, n) if glosny else rng.normal(0, 30, n)).astype(np.int16))
+    return np.concatenate(czesci)
+
+
+def _kawalki(probki, rozmiar):
+    return [probki[i:i + rozmiar] for i in range(0, len(probki), rozmiar)]
+
+
+ODCINKI = [(300, False), (4000, True), (1000, False), (2500, True), (400, False),
+           (3000, True), (900, False), (5000, True), (800, False)]
+
+
+def test_pauzy():
+    pauzy, dlugosc = silence.wykryj_pauzy([_sygnal(ODCINKI)])
+    assert dlugosc == sum(ms for ms, _ in ODCINKI)
+    # Cisza 300 i 400 ms jest krótsza niż MIN_CISZA_MS - nie jest pauzą,
+    # cisza na końcu nagrania tak
+    assert pauzy == [(4300, 5300), (11200, 12100), (17100, 17900)]
+
+
+def test_niezalezne_od_kawalkow():
+    probki = _sygnal(ODCINKI)
+    calosc = silence.wykryj_pauzy([probki])
+    # Kawałki krótsze od ramki, nierówne ramkom i dłuższe od pauz
+    for rozmiar in (100, 321, 4999, SR, 3 * SR + 7):
+        assert silence.wykryj_pauzy(_kawalki(probki, rozmiar)) == calosc
+
+
+def test_fragmenty_z_pauz():
+    pauzy = [(0, 500), (6300, 7300), (9800, 10700), (15700, 16300)]
+    # Cisza na początku i końcu odcięta, cięcia w środku pauz
+    assert silence.fragmenty_z_pauz(pauzy, 16300) == [(500, 6800), (6800, 10250), (10250, 15700)]
+
+
+def test_krotkie_fragmenty_laczone():
+    pauzy = [(5000, 5200), (6000, 6200), (12000, 12200)]
+    # 5100-6100 za krótki - dołączony do następnego; końcówka 12100-13000 do poprzedniego
+    assert silence.fragmenty_z_pauz(pauzy, 13000) == [(0, 5100), (5100, 13000)]
+
+
+def test_zapis_czasow(tmp_path):
+    path = silence.zapisz_czasy([(500, 6800), (6800, 10250)], str(tmp_path / "czasy.txt"))
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "0.500\t6.800\t1\n6.800\t10.250\t2\n"
@@ -0,0 +1,83 @@
+"""
+Klucz cache transkrypcji: ten sam plik i parametry -> ten sam wpis,
+zmiana zawartości audio lub opcji dekodowania -> nowy wpis.
+"""
+
+import os
+import time
+
+from funkcje import anchor_transcription
+from funkcje import transcription_cache
+
+
+def _plik(tmp_path, nazwa, zawartosc):
+    path = tmp_path / nazwa
+    path.write_bytes(zawartosc)
+    return str(path)
+
+
+def test_klucz_zalezy_od_zawartosci_nie_nazwy(tmp_path):
+    a = _plik(tmp_path, "001.mp3", b"\xff\xfb" + b"a" * 5000)
+    b = _plik(tmp_path, "kopia.mp3", b"\xff\xfb" + b"a" * 5000)
+    klucz = transcription_cache.cache_key(a, "base", "pl")
+    assert transcription_cache.cache_key(b, "base", "pl") == klucz
+
+    # Podmiana audio (nawet o jeden bajt) unieważnia wpis
+    _plik(tmp_path, "001.mp3", b"\xff\xfb" + b"a" * 4999 + b"b")
+    assert transcription_cache.cache_key(a, "base", "pl") != klucz
+
+
+def test_klucz_zalezy_od_parametrow(tmp_path):
+    a = _plik(tmp_path, "001.mp3", b"audio")
+    klucz = transcription_cache.cache_key(a, "base", "pl")
+    assert transcription_cache.cache_key(a, "small", "pl") != klucz
+    assert transcription_cache.cache_key(a, "base", "en") != klucz
+    assert transcription_cache.cache_key(a, "base", "pl", {"beam_size": 5}) != klucz
+    # Brak opcji i puste opcje to ten sam wpis; kolejność opcji bez znaczenia
+    assert transcription_cache.cache_key(a, "base", "pl", {}) == klucz
+    assert (transcription_cache.cache_key(a, "base", "pl", {"beam_size": 5, "temperature": 0})
+            == transcription_cache.cache_key(a, "base", "pl", {"temperature": 0, "beam_size": 5}))
+
+
+def test_vad_i_kotwice_tylko_gdy_wlaczone(tmp_path):
+    a = _plik(tmp_path, "001.mp3", b"audio")
+    bez = transcription_cache.cache_key(a, "base", "pl", anchor_transcription.opcje_klucza({}, None, None))
+    assert bez == transcription_cache.cache_key(a, "base", "pl")
+    assert bez == transcription_cache.cache_key(a, "base", "pl", anchor_transcription.opcje_klucza({}, False, None))
+    z_vad = transcription_cache.cache_key(a, "base", "pl", anchor_transcription.opcje_klucza({}, True, None))
+    assert z_vad != bez
+    inny_vad = transcription_cache.cache_key(a, "base", "pl",
+                                             anchor_transcription.opcje_klucza({}, {"prog_db": -30}, None))
+    assert inny_vad not in (bez, z_vad)
+
+
+def test_zapis_i_odczyt(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    a = _plik(tmp_path, "001.mp3", b"audio")
+    klucz = transcription_cache.cache_key(a, "base", "pl")
+    assert transcription_cache.load(klucz, cache_dir) is None
+
+    transcription_cache.save(klucz, {
+        "text": "Zima była tęga",
+        "segments": [{"id": 0, "start": 0.0, "end": 1.5, "text": "Zima była tęga", "tokens": [1, 2, 3]}],
+    }, cache_dir)
+    wpis = transcription_cache.load(klucz, cache_dir)
+    assert wpis["text"] == "Zima była tęga"
+    # Tokeny i inne pola spoza SEGMENT_FIELDS nie trafiają do cache
+    assert wpis["segments"] == [{"id": 0, "start": 0.0, "end": 1.5, "text": "Zima była tęga"}]
+
+
+def test_przycinanie(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    klucze = [f"{n:02d}" + "0" * 62 for n in range(4)]
+    for n, klucz in enumerate(klucze):
+        transcription_cache.save(klucz, {"text": "x" * 1000, "segments": []}, cache_dir)
+        # Kolejne wpisy używane coraz później
+        path = transcription_cache._entry_path(klucz, cache_dir)
+        os.utime(path, (time.time() - 100 + n, time.time() - 100 + n))
+
+    rozmiar = os.path.getsize(transcription_cache._entry_path(klucze[0], cache_dir))
+    usuniete = transcription_cache.prune(max_bytes=2 * rozmiar, max_age_days=None, cache_dir=cache_dir)
+    assert usuniete == 2
+    # Zostają ostatnio używane
+    assert [transcription_cache.load(k, cache_dir) is not None for k in klucze] == [False, False, True, True]
@@ -0,0 +1,87 @@
+"""
+VAD: odcinki mowy z pauz i przeliczanie czasów z przyciętego audio
+z powrotem na czasy w oryginalnym pliku.
+"""
+
+import numpy as np
+
+from funkcje import silence
+from funkcje import vad
+
+SR = silence.SAMPLE_RATE
+
+
+def _mapa(odcinki):
+    mapa, przyciete = [], 0
+    for a, b in odcinki:
+        mapa.append((przyciete, a))
+        przyciete += b - a
+    return mapa
+
+
+def test_odcinki_mowy():
+    pauzy = [(0, 1000), (5000, 6000), (8000, 8300), (12000, 13000)]
+    # Cisza na brzegach obcięta z marginesem od strony mowy, pauza 300 ms
+    # krótsza niż dwa marginesy zostaje
+    assert vad.odcinki_mowy(pauzy, 13000, 200) == [(800, 5200), (5800, 12200)]
+    assert vad.odcinki_mowy([], 4000, 200) == [(0, 4000)]
+    # Sama cisza - nic do transkrypcji
+    assert vad.odcinki_mowy([(0, 4000)], 4000, 200) == []
+
+
+def test_na_oryginal():
+    odcinki = [(800, 5200), (5800, 12200)]
+    mapa = _mapa(odcinki)
+    # Każdy czas wewnątrz odcinka trafia w to samo miejsce oryginału
+    przyciete = 0
+    for a, b in odcinki:
+        for t in range(0, b - a, 250):
+            assert vad.na_oryginal((przyciete + t) / 1000, mapa) == (a + t) / 1000
+        przyciete += b - a
+
+    # Styk odcinków (4400 ms po przycięciu): początek należy do następnego,
+    # koniec do poprzedniego
+    assert vad.na_oryginal(4.4, mapa) == 5.8
+    assert vad.na_oryginal(4.4, mapa, koniec=True) == 5.2
+
+
+def test_przesun_czasy():
+    mapa = _mapa([(800, 5200), (5800, 12200)])
+    wynik = {"text": "a b", "segments": [
+        {"start": 0.0, "end": 4.4, "words": [{"start": 0.5, "end": 1.0}]},
+        {"start": 4.4, "end": 6.0, "words": [{"start": 4.4, "end": 5.0}]},
+    ]}
+    vad.przesun_czasy(wynik, mapa)
+    assert [(s["start"], s["end"]) for s in wynik["segments"]] == [(0.8, 5.2), (5.8, 7.4)]
+    assert [(w["start"], w["end"]) for s in wynik["segments"] for w in s["words"]] == [(1.3, 1.8), (5.8, 6.4)]
+
+
+class _Model:
+    """Zapamiętuje długość audio i zwraca segment na całą przyciętą długość."""
+
+    def transcribe(self, audio, language=None, **options):
+        self.sekundy = len(audio) / SR
+        return {"text": "mowa", "segments": [{"start": 0.0, "end": self.sekundy}]}
+
+
+def test_transkrybuj(monkeypatch):
+    rng = np.random.default_rng(0)
+    odcinki = [(1500, False), (3000, True), (1200, False), (2000, True), (1000, False)]
+    probki = np.concatenate([
+        (rng.normal(0, 10000, SR * ms // 1000) if glosny else rng.normal(0, 30, SR * ms // 1000)).astype(np.int16)
+        for ms, glosny in odcinki
+    ])
+    monkeypatch.setattr(silence, "iter_probki", lambda path, sample_rate=SR: iter([probki[:SR], probki[SR:]]))
+
+    model = _Model()
+    wynik = vad.transkrybuj(model, "a.mp3", vad=True)
+    # Mowa 1500-4500 i 5700-7700 ms, z marginesem 200 ms
+    assert model.sekundy == (3400 + 2400) / 1000
+    assert (wynik["segments"][0]["start"], wynik["segments"][0]["end"]) == (1.3, 7.9)
+
+
+def test_bez_mowy(monkeypatch):
+    monkeypatch.setattr(silence, "iter_probki", lambda path, sample_rate=SR: iter([np.zeros(2 * SR, np.int16)]))
+    model = _Model()
+    assert vad.transkrybuj(model, "a.mp3", vad=True) == {"text": "", "segments": []}
+    assert not hasattr(model, "sekundy")